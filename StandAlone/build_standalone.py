@@ -17,7 +17,7 @@ built into an installer some other way.
 import sys
 from os import chdir
 from shutil import copytree, rmtree
-from subprocess import run, Popen
+from subprocess import run
 from pathlib import Path
 
 
@@ -31,7 +31,10 @@ parser.add_argument("--nodeps", '-n',
                          'conda and npm')
 parser.add_argument('--nodatabase', '-d',
                     action="store_true",
-                    help="don't rebuild the mongo database")
+                    help="don't rebuild the SQLite database")
+parser.add_argument('--datapath', '-p',
+                    default="../noaa-oil-data",
+                    help="the noaa-oil-data repo to build the database from")
 parser.add_argument('--noconda', '-c',
                     action="store_true",
                     help="don't build the standalone conda environment")
@@ -106,25 +109,11 @@ chdir("../StandAlone")
 
 
 if not nodatabase:
-
-    # mongod needs to be running to do this
-    # start up mongo:
-    p = Path("mongo_files")
-    if p.exists():
-        rmtree(p, ignore_errors=True)
-    p.mkdir()
-    mongo = Popen(['mongod',
-                   '--port', '27017',  # using the standard mongo port,
-                                       # as that's hardcoded elsewhere :-(
-                   '--dbpath', 'mongo_files',
-                   ])
-
-    run(["oil_db_init"])
-
-    run(["oil_db_import --all"], shell=True)
-
-    # and kill it
-    mongo.terminate()
+    # The stand alone serves a read-only catalog from a single SQLite
+    # file, so it doesn't need to run mongod.
+    run(["adios_db_build_sqlite",
+         "--path", args.datapath,
+         "--output", "oil_database.sqlite"])
 
 
 if not noconda:
@@ -0,0 +1,316 @@
+"""
+Properties derived from the data of an oil record
+
+Validating a record, making a GNOME oil from it, suggesting labels for it,
+and scoring its completeness all need the same things: the density and
+viscosity data tables, and the curves fit to them.  Rather than each of
+them computing these again, they are computed the first time they are
+needed, and kept with the Oil object, (see ``Oil.derived``).
+
+The record can be changed after they are computed, so the data they are
+computed from is checked every time one is asked for -- if it has
+changed, they are all computed again.
+
+The fits of the density and viscosity curves can also be stored with
+the record in the database, (see ``fits()``), so a batch job that reads
+the records with them, (``Session.query(derived_fields=True)``, as the
+GNOME export does), can use them, rather than fitting the data again.
+A stored fit is only used if the hash of the data it was fit to matches.
+
+The density and kinematic viscosity on a fixed grid of temperatures are
+stored with the record as well, (see ``property_grid()``), so the records
+can be searched by them, (e.g. "kvis at 15C between 100 and 500 cSt"),
+with an indexed query.
+
+NOTE: the values are shared by everyone that asks for them, so don't
+      change them.
+"""
+import copy
+import math
+
+import nucos as uc
+
+from .physical_properties import (Density,
+                                  KinematicViscosity,
+                                  get_density_data,
+                                  get_kinematic_viscosity_data)
+
+# the attribute of the oil object the derived properties are kept in
+CACHE_ATTR = '_derived_properties'
+
+# the field of a record (in the database) the fits are stored in
+FITS_FIELD = '_fits'
+
+# the field of a record (in the database) the property grid is stored in
+GRID_FIELD = '_property_grid'
+
+# the temperatures (C) of the property grid
+GRID_TEMPS = (0, 5, 10, 15, 20, 25, 30, 40, 50)
+
+# the properties of the grid: density in kg/m^3, kinematic viscosity in cSt
+GRID_PROPERTIES = ('density', 'kvis')
+
+
+def grid_name(prop, temp):
+    """
+    The name of a value of the property grid, e.g. ``kvis_15C``
+    """
+    return f'{prop}_{temp}C'
+
+
+GRID_NAMES = tuple(grid_name(prop, temp)
+                   for prop in GRID_PROPERTIES
+                   for temp in GRID_TEMPS)
+
+
+def derived_properties(oil):
+    """
+    The DerivedProperties of an oil object, made if it doesn't have them
+    yet.
+    """
+    try:
+        return oil.__dict__[CACHE_ATTR]
+    except KeyError:
+        derived = DerivedProperties(oil)
+
+        # oil objects don't allow setting anything but their fields
+        oil.__dict__[CACHE_ATTR] = derived
+
+        return derived
+
+
+def _measurement_key(measurement):
+    if measurement is None:
+        return None
+
+    return (measurement.value,
+            measurement.min_value,
+            measurement.max_value,
+            measurement.unit,
+            measurement.unit_type)
+
+
+def _points_key(points, value_attr):
+    return tuple((_measurement_key(getattr(p, value_attr)),
+                  _measurement_key(p.ref_temp),
+                  _measurement_key(getattr(p, 'shear_rate', None)))
+                 for p in points)
+
+
+def data_key(oil):
+    """
+    The data that the derived properties are computed from.
+
+    If this changes, they all need to be computed again.
+    """
+    try:
+        phys_props = oil.sub_samples[0].physical_properties
+    except IndexError:
+        return (oil.metadata.product_type,)
+
+    return (oil.metadata.product_type,
+            _points_key(phys_props.densities, 'density'),
+            _points_key(phys_props.kinematic_viscosities, 'viscosity'),
+            _points_key(phys_props.dynamic_viscosities, 'viscosity'))
+
+
+class DerivedProperties:
+    """
+    The properties derived from the data of an oil record, computed as
+    they are needed.
+
+    If the computation of one fails, a copy of the Exception is kept, and
+    a copy of it raised again for everyone that asks for it.
+    """
+    def __init__(self, oil):
+        self.oil = oil
+
+        self._key = None
+        self._values = {}  # name: (value, exception)
+
+        self.stored_fits = {}  # name: stored fit (see fits())
+
+    def _get(self, name, compute):
+        key = data_key(self.oil)
+
+        if key != self._key:
+            # the data have changed (or this is the first time)
+            self._values.clear()
+            self._key = key
+
+        try:
+            value, error = self._values[name]
+        except KeyError:
+            try:
+                value = compute()
+            except Exception as err:
+                # a copy is kept, without the traceback, so the frames
+                # of the callers aren't kept with the oil
+                self._values[name] = (None, copy.copy(err))
+                raise
+
+            self._values[name] = (value, None)
+
+            return value
+
+        if error is not None:
+            # a new one every time, so the tracebacks don't pile up
+            raise copy.copy(error)
+
+        return value
+
+    def clear(self):
+        """
+        Drop all the computed values
+        """
+        self._values.clear()
+        self._key = None
+
+    def load_fits(self, fits):
+        """
+        Use the fits stored with the record, (from fits()), if they are
+        for the same data.
+        """
+        self.stored_fits = dict(fits)
+        self.clear()
+
+    def fits(self):
+        """
+        The fits of the density and kinematic viscosity curves, in a JSON
+        compatible form, to be stored with the record.
+
+        Only the curves that can be computed are included.
+        """
+        fits = {}
+
+        for name in ('density', 'kinematic_viscosity'):
+            try:
+                fits[name] = getattr(self, name).fit_coefficients()
+            except Exception:
+                pass
+
+        return fits
+
+    def property_grid(self):
+        """
+        The density (kg/m^3) and kinematic viscosity (cSt) at the
+        temperatures of GRID_TEMPS, in a JSON compatible form, to be
+        stored with the record::
+
+            {'density_15C': 912.3, 'kvis_15C': 245.1, ...}
+
+        Only the properties that can be computed are included.
+        """
+        grid = {}
+
+        for prop, compute in (
+            ('density',
+             lambda: self.density.at_temp(GRID_TEMPS, unit='C')),
+            ('kvis',
+             lambda: self.kinematic_viscosity.at_temp(GRID_TEMPS,
+                                                      kvis_units='cSt',
+                                                      temp_units='C')),
+        ):
+            try:
+                values = compute()
+            except Exception:
+                continue
+
+            for temp, value in zip(GRID_TEMPS, values):
+                if math.isfinite(value):
+                    grid[grid_name(prop, temp)] = float(value)
+
+        return grid
+
+    @property
+    def density_data(self):
+        """
+        The (density, temp) pairs of the fresh oil, in kg/m^3 and K
+        (see physical_properties.get_density_data())
+        """
+        return self._get('density_data',
+                         lambda: get_density_data(self.oil,
+                                                  units='kg/m^3',
+                                                  temp_units='K'))
+
+    @property
+    def kinematic_viscosity_data(self):
+        """
+        The (viscosity, temp) pairs of the fresh oil, in m^2/s and K
+        (see physical_properties.get_kinematic_viscosity_data())
+        """
+        return self._get('kinematic_viscosity_data',
+                         lambda: get_kinematic_viscosity_data(self.oil,
+                                                              units='m^2/s',
+                                                              temp_units='K'))
+
+    @property
+    def density(self):
+        """
+        The Density curve of the oil
+        """
+        return self._get('density',
+                         lambda: Density(self.density_data,
+                                         fit=self.stored_fits.get('density')))
+
+    @property
+    def kinematic_viscosity(self):
+        """
+        The KinematicViscosity curve of the oil
+        """
+        def compute():
+            k_v2 = KinematicViscosity.default_kvs.get(
+                self.oil.metadata.product_type,
+                KinematicViscosity.DEFAULT_KV2
+            )
+
+            return KinematicViscosity(
+                self.kinematic_viscosity_data,
+                k_v2=k_v2,
+                fit=self.stored_fits.get('kinematic_viscosity')
+            )
+
+        return self._get('kinematic_viscosity', compute)
+
+    @property
+    def api(self):
+        """
+        The API gravity computed from the density at 60F
+        """
+        return self._get('api',
+                         lambda: uc.convert('kg/m^3', 'API',
+                                            self.density.at_temp(288.7)))
+
+    @property
+    def density_ref_temps(self):
+        """
+        The reference temperatures (in C) of the fresh oil densities
+        """
+        def compute():
+            densities = self.oil.sub_samples[0].physical_properties.densities
+
+            return self._ref_temps(densities)
+
+        return self._get('density_ref_temps', compute)
+
+    @property
+    def viscosity_ref_temps(self):
+        """
+        The reference temperatures (in C) of the fresh oil viscosities,
+        both kinematic and dynamic
+        """
+        def compute():
+            phys_props = self.oil.sub_samples[0].physical_properties
+
+            return self._ref_temps(list(phys_props.kinematic_viscosities)
+                                   + list(phys_props.dynamic_viscosities))
+
+        return self._get('viscosity_ref_temps', compute)
+
+    @staticmethod
+    def _ref_temps(points):
+        temps = [p.ref_temp.converted_to('C').value
+                 for p in points
+                 if p.ref_temp is not None]
+
+        return [t for t in temps if t is not None]
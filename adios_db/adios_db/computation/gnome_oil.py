@@ -6,23 +6,17 @@ See the PyGNOME code for more about GNOME's requirements
 NOTE: This make s JSON compatible Python structure from which to build
 a GnomeOil
 """
-import copy
-
 import numpy as np
 
-import nucos as uc
-
 from adios_db.models.oil.validation.warnings import WARNINGS
 from adios_db.models.oil.validation.errors import ERRORS
 
 from adios_db.computation import estimations as est
-from .physical_properties import (get_density_data,
-                                  get_kinematic_viscosity_data,
-                                  get_distillation_cuts,
+from .physical_properties import (get_distillation_cuts,
                                   get_frac_recovered)
 from .physical_properties import (bullwinkle_fraction,
                                   max_water_fraction_emulsion)
-from .physical_properties import Density, KinematicViscosity
+from .derived_properties import derived_properties
 from .estimations import pour_point_from_kvis
 
 
@@ -55,10 +49,24 @@ def get_empty_dict():
             "adios_oil_id": None}
 
 
-def make_gnome_oil(oil):
+# the data of a GnomeOil that are arrays
+DENSITY_FIELDS = ('densities', 'density_ref_temps', 'density_weathering')
+KVIS_FIELDS = ('kvis', 'kvis_ref_temps', 'kvis_weathering')
+COMPONENT_FIELDS = ('mass_fraction', 'boiling_point', 'molecular_weight',
+                    'component_density', 'sara_type')
+
+ARRAY_FIELDS = DENSITY_FIELDS + KVIS_FIELDS + COMPONENT_FIELDS
+
+
+def make_gnome_oil(oil, arrays=False):
     """
     Make a dict that a GnomeOil can be built from
 
+    :param arrays=False: If True, the data that are arrays (ARRAY_FIELDS)
+                         are numpy arrays, rather than lists -- for Python
+                         code that will use them as arrays anyway.
+                         The result is then not JSON compatible.
+
     A GnomeOil needs:
 
               "name,
@@ -84,19 +92,34 @@ def make_gnome_oil(oil):
               "sara_type,
               "adios_oil_id=None,
     """
-    # make sure we don't change the original oil object
-    oil = copy.deepcopy(oil)
+    # NOTE: the oil object is not changed, or copied -- the API from the
+    #       density is passed to the functions that need it.
+    go = gnome_oil_properties(oil)
+
+    components = pseudo_components_batch([component_inputs(oil, go['api'])])
+
+    return add_pseudo_components(go, *components[0], arrays=arrays)
+
+
+def gnome_oil_properties(oil):
+    """
+    The part of make_gnome_oil() that is done one oil at a time: all of
+    the GNOME oil but the pseudo-components, which can be made for a
+    number of oils at once, (see pseudo_components_batch())
+
+    :raises ValueError: if the oil is not suitable for use in GNOME
+    """
+    # the density and viscosity curves, etc. are shared by everything
+    # that needs them
+    derived = derived_properties(oil)
 
     # metadata:
     go = get_empty_dict()
     go['name'] = oil.metadata.name
     go['adios_oil_id'] = oil.oil_id
 
-    dens = Density(oil)
-    ref_density = dens.at_temp(288.7)  # 60F in K
-    go['api'] = uc.convert('kg/m^3', 'API', ref_density)
     # for gnome_oil we don't treat api as data, only api from density
-    oil.metadata.API = go['api']
+    api = go['api'] = derived.api  # from the density at 60F
 
     # Physical properties
     phys_props = oil.sub_samples[0].physical_properties
@@ -116,13 +139,12 @@ def make_gnome_oil(oil):
             go['pour_point'] = None
 
     # fixme: We need to get the weathered densities, if they are there.
-    densities = get_density_data(oil, units="kg/m^3", temp_units="K")
+    densities = derived.density_data
 
     go['densities'], go['density_ref_temps'] = zip(*densities)
     go['density_weathering'] = [0.0] * len(go['densities'])
 
-    viscosities = get_kinematic_viscosity_data(oil, units="m^2/s",
-                                               temp_units="K")
+    viscosities = derived.kinematic_viscosity_data
 
     if viscosities:
         go['kvis'], go['kvis_ref_temps'] = zip(*viscosities)
@@ -149,7 +171,7 @@ def make_gnome_oil(oil):
             frac_evaporated = None
 
     if bullwinkle is None:
-        go['bullwinkle_fraction'] = bullwinkle_fraction(oil)
+        go['bullwinkle_fraction'] = bullwinkle_fraction(oil, api)
     else:
         go['bullwinkle_fraction'] = bullwinkle
 
@@ -158,10 +180,8 @@ def make_gnome_oil(oil):
         if (oil.metadata.product_type == 'Crude Oil NOS' or
                 oil.metadata.product_type == 'Bitumen Blend'):
             #return 0.9
-            dens = Density(oil)
-            density = dens.at_temp(288.15)
-            kvis = KinematicViscosity(oil)
-            viscosity = kvis.at_temp(288.15)
+            density = derived.density.at_temp(288.15)
+            viscosity = derived.kinematic_viscosity.at_temp(288.15)
             go['emulsion_water_fraction_max'] = est.emul_water(density,viscosity)	# estimate the value
         else:
             go['emulsion_water_fraction_max'] = 0.0
@@ -174,10 +194,64 @@ def make_gnome_oil(oil):
     # k0y is not currently used -- not sure what it is?
     # go['k0y'] = 2.024e-06 #do we want this included?
 
-    # pseudocomponents
-    cut_temps, _frac_evap = normalized_cut_values(oil)
+    return go
+
+
+def component_inputs(oil, api):
+    """
+    What the pseudo-components of an oil are made from: its distillation
+    cuts, (see cut_table()), and the SARA totals.  The saturates are NaN
+    if they weren't measured.
+
+    :param api: The API gravity to use.
+
+    :raises ValueError: if the oil is not suitable for use in GNOME
+    """
+    table = cut_table(oil, api)
+
+    measured_sat = oil.sub_samples[0].SARA.saturates
+    sat, _arom, res, asph = sara_totals(oil)
+
+    if measured_sat is None:
+        sat = np.nan
+
+    return table, (sat, res, asph)
+
+
+def pseudo_components_batch(inputs):
+    """
+    The pseudo-components of a number of oils at once, with the array
+    operations of normalized_cut_values_batch() and
+    component_mass_fractions_batch()
+
+    :param inputs: The component_inputs() of the oils
+
+    :returns: a list of (cut_temps, mass_fraction) pairs, one for each oil
+    """
+    tables, sara = zip(*inputs)
+    sat, res, asph = zip(*sara)
+
+    cut_temps, fmass, counts = normalized_cut_values_batch(
+        *stack_cut_tables(tables)
+    )
+
+    mass_fractions = component_mass_fractions_batch(cut_temps, fmass, counts,
+                                                    sat, res, asph)
+
+    return [(cut_temps[i, :n], mass_fractions[i, :n * 4])
+            for i, n in enumerate(counts)]
+
 
-    mass_fraction = component_mass_fractions(oil)
+def add_pseudo_components(go, cut_temps, mass_fraction, arrays=False):
+    """
+    Add the pseudo-components to a GNOME oil from gnome_oil_properties()
+
+    :param cut_temps, mass_fraction: The pseudo-components of the oil,
+                                     (from pseudo_components_batch())
+    :param arrays=False: as for make_gnome_oil()
+
+    :returns: the GNOME oil
+    """
     mask = np.where(mass_fraction == 0)
     mol_wt = np.delete(component_mol_wt(cut_temps), mask)
     comp_dens = np.delete(component_densities(cut_temps), mask)
@@ -185,11 +259,18 @@ def make_gnome_oil(oil):
     sara_type = np.delete(np.array(component_types(cut_temps)), mask)
     mass_frac = np.delete(mass_fraction, mask)
 
-    go['molecular_weight'] = mol_wt.tolist()
-    go['component_density'] = comp_dens.tolist()
-    go['mass_fraction'] = mass_frac.tolist()
-    go['boiling_point'] = boiling_pt.tolist()
-    go['sara_type'] = sara_type.tolist()
+    go['molecular_weight'] = mol_wt
+    go['component_density'] = comp_dens
+    go['mass_fraction'] = mass_frac
+    go['boiling_point'] = boiling_pt
+    go['sara_type'] = sara_type
+
+    if arrays:
+        for name in DENSITY_FIELDS + KVIS_FIELDS:
+            go[name] = np.array(go[name], dtype=np.float64)
+    else:
+        for name in COMPONENT_FIELDS:
+            go[name] = go[name].tolist()
 
     return go
 
@@ -199,7 +280,7 @@ def estimate_pour_point(oil):
     estimate pour point from kinematic viscosity
     """
     pour_point = None
-    kvis = get_kinematic_viscosity_data(oil)
+    kvis = derived_properties(oil).kinematic_viscosity_data
     c_v1 = 5000.0
 
     if kvis:
@@ -279,10 +360,9 @@ def inert_fractions(oil, density=None, viscosity=None):
     if f_res is not None and f_asph is not None:
         return f_res, f_asph, estimated_res, estimated_asph
     else:
-        dens = Density(oil)
-        density = dens.at_temp(288.15)
-        kvis = KinematicViscosity(oil)
-        viscosity = kvis.at_temp(288.15)
+        derived = derived_properties(oil)
+        density = derived.density.at_temp(288.15)
+        viscosity = derived.kinematic_viscosity.at_temp(288.15)
 
     if f_res is None:
         f_res = est.resin_fraction(density, viscosity)
@@ -370,10 +450,30 @@ def normalized_cut_values_adios(oil):
     return np.asarray(BP), est.fmasses_from_cuts(fevap)
 
 
-def normalized_cut_values(oil):
+# the temperatures (K) the pseudo-components are cut at
+SET_TEMPS = np.array([266, 310, 353, 483, 563, 650, 800, 950, 1050],
+                     dtype=np.float64)
+
+
+def cut_table(oil, api=None):
+    """
+    The distillation cuts that the pseudo-components are made from
+
+    If there is no distillation data, the cuts are estimated from the API
+    (crude oils only)
+
+    :param api: The API gravity to use.  If None, the API in the
+                metadata of the oil is used.
+
+    :returns: BP_i, fevap_i, iBP, tBP: the boiling points of the cuts,
+              their (cumulative) fractions evaporated, and the initial
+              and final boiling points.
+
+    :raises ValueError: if the oil is not suitable for use in GNOME
+    """
     f_res = f_asph = 0  # for now, we are including the resins and asphaltenes
     cuts = get_distillation_cuts(oil)
-    oil_api = oil.metadata.API
+    oil_api = oil.metadata.API if api is None else api
     iBP = 266
     tBP = 1050
 
@@ -385,8 +485,6 @@ def normalized_cut_values(oil):
 
     if len(cuts) == 0:
         # should be a warning if api < 50 or not a crude
-        oil_api = oil.metadata.API
-
         if oil.metadata.product_type != 'Crude Oil NOS':
             # Maybe this should be a log message?
             raise ValueError(f"Distillation data required for {oil.metadata.product_type}. "
@@ -422,86 +520,231 @@ def normalized_cut_values(oil):
     iBP = max(266, iBP)
     tBP = min(1050, tBP)
 
-    set_temp = [266, 310, 353, 483, 563, 650, 800, 950, 1050]
+    return BP_i, fevap_i, iBP, tBP
 
-    N = len(BP_i)
 
-    new_fevap = fevap_i
-    new_BP = BP_i
+def stack_cut_tables(tables):
+    """
+    Stack the cut tables of a number of oils (from cut_table()) into 2-D
+    arrays, one row per oil, for normalized_cut_values_batch()
 
-    if not fevap_i[N-1] == 1:
-        new_BP = np.append(BP_i, tBP)
-        new_fevap = np.append(fevap_i, 1.0)
+    The rows are padded out with zeros.
 
-    if not fevap_i[0] == 0:
-        new_BP = np.insert(new_BP, 0, iBP)
-        new_fevap = np.insert(new_fevap, 0, 0)
-    new_evap = np.interp(set_temp, new_BP, new_fevap)
+    :returns: BP, fevap, counts, iBP, tBP
+    """
+    counts = np.array([len(t[0]) for t in tables], dtype=int)
+    width = max(1, counts.max(initial=0))
 
-    if new_evap[-1] < 1:
-        new_evap[-1] = 1  # put all the extra mass in the last cut
+    BP = np.zeros((len(tables), width))
+    fevap = np.zeros((len(tables), width))
 
-    avg_evap_i = np.asarray(new_evap[1:])
-    avg_temp_i = np.asarray([(set_temp[i] + set_temp[i + 1]) / 2
-                             for i in range(0, len(set_temp) - 1)])
+    for i, (BP_i, fevap_i, _iBP, _tBP) in enumerate(tables):
+        BP[i, :len(BP_i)] = BP_i
+        fevap[i, :len(fevap_i)] = fevap_i
 
-    avg_temp_i = avg_temp_i[avg_evap_i != 0]
-    avg_evap_i = avg_evap_i[avg_evap_i != 0]
+    iBP = np.array([t[2] for t in tables], dtype=np.float64)
+    tBP = np.array([t[3] for t in tables], dtype=np.float64)
 
-    num_ones = 0
-    for i in range(len(avg_evap_i)):
-        if avg_evap_i[i] == 1:
-            num_ones += 1
+    return BP, fevap, counts, iBP, tBP
 
-    if num_ones > 1:
-        for i in range(num_ones-1):
-            avg_temp_i = np.delete(avg_temp_i, len(avg_evap_i) - 1)
-            avg_evap_i = np.delete(avg_evap_i, len(avg_evap_i) - 1)
 
-    return np.asarray(avg_temp_i), est.fmasses_from_cuts(avg_evap_i)
+def _compact(used, *arrays):
+    """
+    Move the used values of each row of the arrays to the start of the row,
+    keeping their order.
+
+    :returns: the number used in each row, and the compacted arrays
+    """
+    order = np.argsort(~used, axis=1, kind='stable')
 
+    return ((used.sum(axis=1),)
+            + tuple(np.take_along_axis(a, order, axis=1) for a in arrays))
 
-def component_mass_fractions(oil):
+
+def _batch_interp(x, xp, fp, counts):
     """
-    estimate pseudocomponent mass fractions
+    np.interp(x, xp[i, :counts[i]], fp[i, :counts[i]]) for each row
+
+    The rows of xp must be increasing, as for np.interp
     """
-    cut_temps, fmass_i = normalized_cut_values(oil)
-    measured_sat = oil.sub_samples[0].SARA.saturates
-    sat, _arom, res, asph = sara_totals(oil)
+    rows = np.arange(len(counts))
+    last = np.maximum(counts - 1, 0)
 
-    if measured_sat is not None:
-        f_sat_i = est.saturate_mass_fraction(fmass_i, cut_temps, sat)
-    else:
-        f_sat_i = est.saturate_mass_fraction(fmass_i, cut_temps)
+    first_x, first_f = xp[:, :1], fp[:, :1]
+    last_x = xp[rows, last][:, np.newaxis]
+    last_f = fp[rows, last][:, np.newaxis]
+
+    # outside the range
+    result = np.where(x < first_x, first_f, last_f)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(xp.shape[1] - 1):
+            x0, x1 = xp[:, j:j + 1], xp[:, j + 1:j + 2]
+            f0, f1 = fp[:, j:j + 1], fp[:, j + 1:j + 2]
+
+            slope = (f1 - f0) / (x1 - x0)
+
+            result = np.where((j + 1 < counts[:, np.newaxis])
+                              & (x0 <= x) & (x < x1),
+                              slope * (x - x0) + f0,
+                              result)
+
+    return np.where(x == last_x, last_f, result)
+
+
+def normalized_cut_values_batch(BP, fevap, counts, iBP, tBP):
+    """
+    normalized_cut_values() for a number of oils at once
+
+    :param BP, fevap, counts, iBP, tBP: the stacked cut tables of the oils,
+                                        (see stack_cut_tables())
+
+    :returns: cut_temps, fmass, counts: 2-D arrays of the temperatures and
+              mass fractions of the pseudo-components, one row per oil,
+              padded out with zeros, and the number of each oil's
+              pseudo-components.
+    """
+    num, width = BP.shape
+    rows = np.arange(num)
+
+    # add the initial and final boiling points, if they aren't there,
+    # and move them into place
+    prepend = fevap[:, 0] != 0
+    append = fevap[rows, np.maximum(counts - 1, 0)] != 1
+
+    xp = np.zeros((num, width + 2))
+    fp = np.zeros((num, width + 2))
+    used = np.zeros((num, width + 2), dtype=bool)
+
+    xp[:, 1:-1], fp[:, 1:-1] = BP, fevap
+    used[:, 1:-1] = np.arange(width) < counts[:, np.newaxis]
+
+    xp[:, 0], fp[:, 0], used[:, 0] = iBP, 0.0, prepend
+    xp[rows, counts + 1], fp[rows, counts + 1] = tBP, 1.0
+    used[rows, counts + 1] = append
+
+    n_points, xp, fp = _compact(used, xp, fp)
+
+    new_evap = _batch_interp(SET_TEMPS, xp, fp, n_points)
+
+    # put all the extra mass in the last cut
+    new_evap[:, -1] = np.where(new_evap[:, -1] < 1, 1.0, new_evap[:, -1])
+
+    avg_evap = new_evap[:, 1:]
+    avg_temp = np.broadcast_to((SET_TEMPS[:-1] + SET_TEMPS[1:]) / 2,
+                               avg_evap.shape)
+
+    # drop the empty cuts
+    nonzero = avg_evap != 0
+    counts, avg_temp, avg_evap = _compact(nonzero, avg_temp, avg_evap)
+    used = np.arange(avg_evap.shape[1]) < counts[:, np.newaxis]
+
+    # only one cut with everything evaporated
+    num_ones = ((avg_evap == 1) & used).sum(axis=1)
+    counts = counts - np.maximum(num_ones - 1, 0)
+    used = np.arange(avg_evap.shape[1]) < counts[:, np.newaxis]
+
+    fmass = avg_evap.copy()
+    fmass[:, 1:] = np.diff(avg_evap, axis=1)
 
-    f_arom_i = fmass_i - f_sat_i
+    return (np.where(used, avg_temp, 0.0),
+            np.where(used, fmass, 0.0),
+            counts)
+
+
+def normalized_cut_values(oil, api=None):
+    """
+    The temperatures and mass fractions of the pseudo-components, from
+    the distillation cuts normalized to a standard set of cut temperatures
+
+    :param api: The API gravity to use.  If None, the API in the
+                metadata of the oil is used.
+    """
+    cut_temps, fmass, counts = normalized_cut_values_batch(
+        *stack_cut_tables([cut_table(oil, api)])
+    )
+
+    return cut_temps[0, :counts[0]], fmass[0, :counts[0]]
+
+
+def component_mass_fractions_batch(cut_temps, fmass, counts,
+                                   saturates, resins, asphaltenes):
+    """
+    component_mass_fractions() for a number of oils at once
+
+    :param cut_temps, fmass, counts: the pseudo-components of the oils,
+                                     (from normalized_cut_values_batch())
+    :param saturates, resins, asphaltenes: the SARA totals of the oils.
+                                           saturates is NaN for the oils
+                                           that don't have it measured.
+
+    :returns: the saturates, aromatics, resins, and asphaltenes mass
+              fractions of the pseudo-components of each oil, in a 2-D
+              array, one row per oil, padded out with zeros.
+    """
+    num, width = fmass.shape
+    rows = np.arange(num)
+    last = np.maximum(counts - 1, 0)
+    used = np.arange(width) < counts[:, np.newaxis]
+
+    saturates = np.asarray(saturates, dtype=np.float64)
+    resins = np.asarray(resins, dtype=np.float64)
+    asphaltenes = np.asarray(asphaltenes, dtype=np.float64)
+
+    # est.saturate_mass_fraction(), with the measured saturates or not
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.where(np.isnan(saturates),
+                     .0877,
+                     ((124.1069 * fmass.sum(axis=1) - saturates * 100)
+                      / (fmass * cut_temps).sum(axis=1)))
+
+    sat_pct_i = 124.1069 - k[:, np.newaxis] * cut_temps
+    f_sat_i = np.clip(fmass * sat_pct_i / 100., 0.0, fmass)
+
+    f_arom_i = fmass - f_sat_i
+
+    # something went wrong
+    too_much = asphaltenes + resins > f_arom_i.sum(axis=1)
+    resins = np.where(too_much, 0.0, resins)
+    asphaltenes = np.where(too_much, 0.0, asphaltenes)
 
     f_res_i = np.zeros_like(f_sat_i)
     f_asph_i = np.zeros_like(f_sat_i)
 
-    if asph + res > f_arom_i.sum():  # something went wrong
-        res = 0
-        asph = 0
-
-    f_res_i[len(f_res_i) - 1] = res
-    f_asph_i[len(f_asph_i) - 1] = asph
-    f_inert = asph + res
-
-    for i in range(len(f_arom_i) - 1, -1, -1):
-        if f_inert > 0:
-            if f_arom_i[i] > f_inert:
-                f_arom_i[i] = f_arom_i[i] - f_inert
-                f_inert = 0
-            else:
-                f_inert = f_inert - f_arom_i[i]
-                f_arom_i[i] = 0
-        else:
-            f_inert = f_inert * 1
+    f_res_i[rows, last] = resins
+    f_asph_i[rows, last] = asphaltenes
+
+    # the inerts replace the aromatics, starting with the last cut:
+    # what is left of them before each cut is subtracted in the same
+    # order as one at a time would.
+    f_inert = np.subtract.accumulate(
+        np.concatenate(((asphaltenes + resins)[:, np.newaxis],
+                        f_arom_i[:, ::-1]), axis=1),
+        axis=1
+    )[:, -2::-1]
+
+    f_arom_i = np.where(f_inert > 0,
+                        np.where(f_arom_i > f_inert, f_arom_i - f_inert, 0.0),
+                        f_arom_i)
+
+    mass_fractions = np.stack((f_sat_i, f_arom_i, f_res_i, f_asph_i), axis=2)
 
-    # will want to zip all 4 together
-    mf_list = list(zip(f_sat_i, f_arom_i, f_res_i, f_asph_i))
+    return np.where(used[:, :, np.newaxis], mass_fractions,
+                    0.0).reshape((num, width * 4))
+
+
+def component_mass_fractions(oil, api=None):
+    """
+    estimate pseudocomponent mass fractions
+
+    :param api: The API gravity to use.  If None, the API in the
+                metadata of the oil is used.
+    """
+    [(_cut_temps, mass_fraction)] = pseudo_components_batch(
+        [component_inputs(oil, api)]
+    )
 
-    return (np.asarray(mf_list)).flatten()
+    return mass_fraction
 
 
 def sara_totals(oil):
@@ -514,10 +757,9 @@ def sara_totals(oil):
     resins = oil.sub_samples[0].SARA.resins
     asphaltenes = oil.sub_samples[0].SARA.asphaltenes
 
-    dens = Density(oil)
-    density = dens.at_temp(288.15)
-    kvis = KinematicViscosity(oil)
-    viscosity = kvis.at_temp(288.15)
+    derived = derived_properties(oil)
+    density = derived.density.at_temp(288.15)
+    viscosity = derived.kinematic_viscosity.at_temp(288.15)
 
     if resins is None:
         resins_total = est.resin_fraction(density, viscosity)
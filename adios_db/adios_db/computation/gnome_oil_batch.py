@@ -0,0 +1,320 @@
+"""
+Making the GNOME oils of a whole catalog at once
+
+Whenever the estimation code changes, the GNOME oils of all the records
+need to be made again.  This fans the work of make_gnome_oil() out over
+a pool of worker processes, sending them the records in chunks, and
+collects the results -- including the records that aren't suitable for
+GNOME, and why.
+
+The pseudo-components of the oils of a chunk are made all at once, with
+the array operations of gnome_oil.pseudo_components_batch().
+
+The records are passed around as JSON-compatible Python (py_json), which
+is cheap to send to the worker processes, and each worker builds the Oil
+object itself.
+
+The results are (oil_id, gnome_oil, error) tuples: gnome_oil is the dict
+from make_gnome_oil(), or None if it failed, in which case error is the
+message: the same W100 warning that Oil.validate() gives for an oil that
+isn't suitable for GNOME, or an E097 error for a record that couldn't be
+loaded at all.
+
+They can be written to a JSON Lines file, or to a numpy .npz file, which
+keeps the array data of all the GNOME oils in a few flat arrays.  That is
+much quicker to load than the JSON, for code that wants the arrays.
+"""
+import os
+import json
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+
+from ..models.oil.oil import Oil
+from ..models.oil.validation.errors import ERRORS
+from ..models.oil.validation.warnings import WARNINGS
+from .gnome_oil import (gnome_oil_properties,
+                        component_inputs,
+                        pseudo_components_batch,
+                        add_pseudo_components,
+                        get_empty_dict,
+                        ARRAY_FIELDS,
+                        DENSITY_FIELDS,
+                        KVIS_FIELDS,
+                        COMPONENT_FIELDS)
+
+
+# the code of the errors of the records that couldn't be loaded
+LOAD_ERROR = 'E097'
+
+
+def is_load_error(error):
+    """
+    Whether the error of a result is for a record that couldn't be loaded,
+    rather than an oil that isn't suitable for GNOME
+    """
+    return error is not None and error.startswith(LOAD_ERROR)
+
+
+def _make_chunk(records, arrays=False):
+    """
+    Make the GNOME oils of a chunk of records (py_json), with the
+    pseudo-components of all of them made at once.
+
+    This is what the worker processes run, so it must not raise.
+
+    :returns: a list of (oil_id, gnome_oil, error) tuples
+    """
+    results = []
+    pending = []  # (index in results, gnome oil so far, component inputs)
+
+    for record in records:
+        oil_id = record.get('oil_id')
+
+        try:
+            oil = Oil.from_py_json(record)
+        except Exception as ex:
+            # a bad record -- not the same as an oil GNOME can't use
+            results.append((oil_id, None, ERRORS[LOAD_ERROR].format(str(ex))))
+            continue
+
+        try:
+            go = gnome_oil_properties(oil)
+            inputs = component_inputs(oil, go['api'])
+        except Exception as ex:
+            results.append((oil_id, None, WARNINGS["W100"].format(str(ex))))
+            continue
+
+        pending.append((len(results), go, inputs))
+        results.append((oil_id, None, None))
+
+    if len(pending) == 0:
+        return results
+
+    try:
+        components = pseudo_components_batch([p[2] for p in pending])
+    except Exception:
+        # one bad oil spoils the chunk -- make them one at a time, so only
+        # it fails
+        components = [None] * len(pending)
+
+    for (i, go, inputs), comps in zip(pending, components):
+        oil_id = results[i][0]
+
+        try:
+            if comps is None:
+                [comps] = pseudo_components_batch([inputs])
+
+            results[i] = (oil_id,
+                          add_pseudo_components(go, *comps, arrays=arrays),
+                          None)
+        except Exception as ex:
+            results[i] = (oil_id, None, WARNINGS["W100"].format(str(ex)))
+
+    return results
+
+
+def _chunks(records, chunksize):
+    """
+    The records, in lists of chunksize
+    """
+    records = iter(records)
+
+    while True:
+        chunk = list(islice(records, chunksize))
+
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
+def make_gnome_oils(records, processes=None, chunksize=16, arrays=False):
+    """
+    Make the GNOME oils of a number of records
+
+    This is a generator -- the results are returned in the same order as
+    the records, as they are made.
+
+    :param records: An iterable of oil records (py_json).  They are read
+                    as they are needed, so this can be a generator.
+    :param processes=None: The number of worker processes.
+                           If None, the number of CPUs is used.
+                           If 1, the oils are made in this process,
+                           with no pool at all.
+    :param chunksize=16: The number of records sent to a worker at once,
+                         and made into GNOME oils together.
+    :param arrays=False: If True, the array data of the GNOME oils are
+                         numpy arrays, (see make_gnome_oil())
+
+    :returns: (oil_id, gnome_oil, error) tuples -- one of gnome_oil or
+              error is None.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    make_chunk = partial(_make_chunk, arrays=arrays)
+    chunks = _chunks(records, max(int(chunksize), 1))
+
+    if processes == 1:
+        for chunk in map(make_chunk, chunks):
+            yield from chunk
+    else:
+        with Pool(processes) as pool:
+            for chunk in pool.imap(make_chunk, chunks):
+                yield from chunk
+
+
+def write_jsonl(results, outfile):
+    """
+    Write the results of make_gnome_oils() to a JSON Lines file
+
+    Each line is an object with the oil_id, and either the gnome_oil or
+    the error.
+
+    :param results: An iterable of (oil_id, gnome_oil, error) tuples.
+    :param outfile: An open (text) file, or the path of the file to write.
+
+    :returns: the number of GNOME oils written, and the number of errors
+    """
+    if isinstance(outfile, (str, os.PathLike)):
+        with open(outfile, 'w', encoding='utf-8') as outfile:
+            return write_jsonl(results, outfile)
+
+    num_oils = num_errors = 0
+
+    for oil_id, gnome_oil, error in results:
+        if error is None:
+            line = {'oil_id': oil_id, 'gnome_oil': gnome_oil}
+            num_oils += 1
+        else:
+            line = {'oil_id': oil_id, 'error': error}
+            num_errors += 1
+
+        outfile.write(json.dumps(line, default=_json_default))
+        outfile.write('\n')
+
+    return num_oils, num_errors
+
+
+def _json_default(obj):
+    """
+    numpy scalars and arrays that make it into a GNOME oil
+    """
+    try:
+        return obj.tolist()
+    except AttributeError:
+        raise TypeError(f'Object of type {type(obj).__name__} '
+                        'is not JSON serializable')
+
+
+# the GNOME oil data that are kept in the .npz file
+STRING_FIELDS = ('name', 'adios_oil_id')
+SCALAR_FIELDS = tuple(name for name in get_empty_dict()
+                      if name not in STRING_FIELDS + ARRAY_FIELDS)
+
+# the array data are kept in groups, with the same lengths
+ARRAY_GROUPS = {'density': DENSITY_FIELDS,
+                'kvis': KVIS_FIELDS,
+                'component': COMPONENT_FIELDS}
+
+SARA_TYPES = ('Saturates', 'Aromatics', 'Resins', 'Asphaltenes')
+
+
+def write_npz(results, outfile):
+    """
+    Write the results of make_gnome_oils() to a numpy .npz file
+
+    The array data of all the GNOME oils are kept end to end, in one array
+    per field, with an ``<group>_offsets`` array for each group of arrays
+    with the same lengths (see ARRAY_GROUPS): the data of the i-th oil
+    are ``field[offsets[i]:offsets[i + 1]]``.  The scalar data are
+    kept in one array per field, with NaN for None.  The sara_type is kept
+    as an index into ``sara_types``.
+
+    The records that aren't suitable for GNOME are kept in the
+    ``error_oil_id`` and ``error`` arrays.
+
+    :param results: An iterable of (oil_id, gnome_oil, error) tuples.
+    :param outfile: An open (binary) file, or the path of the file to write.
+
+    :returns: the number of GNOME oils written, and the number of errors
+    """
+    oil_ids, gnome_oils = [], []
+    error_ids, errors = [], []
+
+    for oil_id, gnome_oil, error in results:
+        if error is None:
+            oil_ids.append(oil_id)
+            gnome_oils.append(gnome_oil)
+        else:
+            error_ids.append(oil_id)
+            errors.append(error)
+
+    data = {'oil_id': np.array(oil_ids, dtype=np.str_),
+            'error_oil_id': np.array(error_ids, dtype=np.str_),
+            'error': np.array(errors, dtype=np.str_),
+            'sara_types': np.array(SARA_TYPES)}
+
+    for name in STRING_FIELDS:
+        data[name] = np.array([go[name] for go in gnome_oils], dtype=np.str_)
+
+    for name in SCALAR_FIELDS:
+        data[name] = np.array([np.nan if go[name] is None else go[name]
+                               for go in gnome_oils],
+                              dtype=np.float64)
+
+    for group, fields in ARRAY_GROUPS.items():
+        lengths = [len(go[fields[0]]) for go in gnome_oils]
+        data[f'{group}_offsets'] = np.cumsum([0] + lengths, dtype=np.int64)
+
+        for name in fields:
+            if len(gnome_oils) == 0:
+                data[name] = np.zeros((0,))
+            else:
+                data[name] = np.concatenate([np.asarray(go[name])
+                                             for go in gnome_oils])
+
+    sara_codes = {sara_type: i for i, sara_type in enumerate(SARA_TYPES)}
+    data['sara_type'] = np.array([sara_codes[t] for t in data['sara_type']],
+                                 dtype=np.uint8)
+
+    np.savez(outfile, **data)
+
+    return len(gnome_oils), len(errors)
+
+
+def read_npz(infile):
+    """
+    Read the GNOME oils from a .npz file written by write_npz()
+
+    :param infile: An open (binary) file, or the path of the file to read.
+
+    :returns: a list of GNOME oil dicts, with the array data as numpy
+              arrays, (as from make_gnome_oil(oil, arrays=True))
+    """
+    with np.load(infile) as data:
+        data = dict(data)
+
+    data['sara_type'] = data['sara_types'][data['sara_type']]
+
+    gnome_oils = [get_empty_dict() for _oil_id in data['oil_id']]
+
+    for name in STRING_FIELDS:
+        for go, value in zip(gnome_oils, data[name].tolist()):
+            go[name] = value
+
+    for name in SCALAR_FIELDS:
+        for go, value in zip(gnome_oils, data[name].tolist()):
+            go[name] = None if np.isnan(value) else value
+
+    for group, fields in ARRAY_GROUPS.items():
+        splits = data[f'{group}_offsets'][1:-1]
+
+        for name in fields:
+            for go, value in zip(gnome_oils, np.split(data[name], splits)):
+                go[name] = value
+
+    return gnome_oils
@@ -2,12 +2,15 @@
 utilities for doing computation on the physical properties of an
 oil record
 """
+import hashlib
+from math import isnan
 from operator import itemgetter
 import numpy as np
 
 import nucos as uc
 
 from adios_db.util import sigfigs
+from adios_db.models.common.measurement import measurements_to_array
 
 def _is_oil(obj):
     """
@@ -20,6 +23,35 @@ def _is_oil(obj):
             )
 
 
+# The version of the curve fitting.  It is part of the fit_hash(), so
+# bump it whenever the fit algorithms change, and the fits stored with
+# the records will no longer be used.
+FIT_VERSION = 1
+
+
+def fit_hash(*values):
+    """
+    A hash of the data a curve is fit to, (the columns of the data table,
+    as sequences of numbers), any parameters of the fit, and the version
+    of the fitting code.
+
+    Used to check that a stored fit is for the same data, and the same
+    fit.  It is a digest of the data as 64 bit floats, so it is the same
+    on every platform.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f'fit_version:{FIT_VERSION}'.encode('ascii'))
+
+    for v in values:
+        v = np.asarray(v, dtype=np.float64)
+
+        # the shape, so the columns can't run into each other
+        digest.update(np.asarray(v.shape, dtype=np.int64).tobytes())
+        digest.update(v.tobytes())
+
+    return digest.hexdigest()
+
+
 class Density:
     """
     class to hold and do calculations on density
@@ -29,7 +61,7 @@ class Density:
     density in kg/m^3
     """
 
-    def __init__(self, oil):
+    def __init__(self, oil, fit=None):
         """
         Initialize a density calculator
 
@@ -41,6 +73,10 @@ class Density:
                     ``[(980.0, 288.15), (990.0, 273.15)])``
 
         If data pairs, units must be kg/m^3 and K
+
+        :param fit=None: A stored fit (from fit_coefficients()).  If it is
+                         for the same data, it is used, rather than fitting
+                         the data again.
         """
         if _is_oil(oil):
             data = get_density_data(oil, units='kg/m^3', temp_units="K")
@@ -56,13 +92,17 @@ class Density:
             self.densities = []
             self.temps = []
 
-        self.initialize()
+        self._fit_hash = None
 
-    def initialize(self):
+        self.initialize(fit)
+
+    def initialize(self, fit=None):
         """
         Initialize the expansion coefficient
 
         For outside the measured range
+
+        :param fit=None: A stored fit, used if it is for the same data
         """
 
         if not np.all(np.diff(self.temps) > 0):
@@ -70,6 +110,8 @@ class Density:
 
         if len(self.densities) == 0:
             raise ValueError("Cannot initialize a Density object with no data")
+        elif fit is not None and fit.get('hash') == self.fit_hash():
+            self.k_rho_default = fit['k_rho_default']
         elif len(self.densities) == 1:
             # if there is only one density, use a default
             # Note: no idea where these values came from
@@ -91,6 +133,25 @@ class Density:
         else:
             raise ValueError("Density needs at least one density value")
 
+    def fit_hash(self):
+        """
+        The hash of the data the expansion coefficient is computed from
+        """
+        if self._fit_hash is None:
+            self._fit_hash = fit_hash(tuple(self.densities),
+                                      tuple(self.temps))
+
+        return self._fit_hash
+
+    def fit_coefficients(self):
+        """
+        The fit to the data, in a JSON compatible form that can be stored,
+        and passed in to a new Density object for the same data.
+        """
+        return {'hash': self.fit_hash(),
+                'k_rho_default': float(self.k_rho_default),
+                'temp_range': [float(self.temps[0]), float(self.temps[-1])]}
+
     def at_temp(self, temp, unit='K'):
         """
         density(s) at the provided temperature(s)
@@ -148,7 +209,7 @@ class KinematicViscosity:
     # if product type is unknown.
     DEFAULT_KV2 = 2100.0  # K
 
-    def __init__(self, oil_or_data, k_v2=None):
+    def __init__(self, oil_or_data, k_v2=None, fit=None):
         """
         Initialize from an Oil object or data table.
 
@@ -169,6 +230,10 @@ class KinematicViscosity:
                           and only one data point, 2100.0K is used, derived
                           from typical data for crude oils.
         :type k_v2: float
+
+        :param fit=None: A stored fit (from fit_coefficients()).  If it is
+                         for the same data (and k_v2), it is used, rather
+                         than fitting the data again.
         """
         if _is_oil(oil_or_data):
             data = get_kinematic_viscosity_data(oil_or_data,
@@ -192,7 +257,11 @@ class KinematicViscosity:
             self.temps = []
 
         self._k_v2 = k_v2
-        self.initialize()
+        # the fit changes _k_v2, but the hash is of the default one
+        self._default_k_v2 = k_v2
+        self._fit_hash = None
+
+        self.initialize(fit)
 
     def at_temp(self, temp, kvis_units='m^2/s', temp_units="K"):
         """
@@ -214,7 +283,7 @@ class KinematicViscosity:
 
         return kvisc
 
-    def initialize(self):
+    def initialize(self, fit=None):
         '''
         viscosity as a function of temp is given by:
 
@@ -228,6 +297,9 @@ class KinematicViscosity:
         If two data points, the two constants are directly computed
 
         If three or more, the constants are computed by a least squares fit.
+
+        If a stored fit is passed in, and it is for the same data, the
+        constants are taken from it, (and there are no residuals).
         '''
 
         # # this sets:
@@ -240,6 +312,9 @@ class KinematicViscosity:
 
         if len(kvis) == 0:
             raise ValueError("Cannot initialize a KinematicViscosity object with no data")
+        elif fit is not None and fit.get('hash') == self.fit_hash():
+            self._k_v2 = fit['k_v2']
+            self._visc_A = fit['visc_A']
         elif len(kvis) == 1:  # use default k_v2
             # if self._k_v2 is None:
             #     self._k_v2 = self.DEFAULT_KV2
@@ -256,6 +331,306 @@ class KinematicViscosity:
             self._visc_A = np.exp(x[0])
         return
 
+    def fit_hash(self):
+        """
+        The hash of the data (and default k_v2) the constants are
+        computed from
+        """
+        if self._fit_hash is None:
+            self._fit_hash = fit_hash(tuple(self.kviscs), tuple(self.temps),
+                                      self._default_k_v2)
+
+        return self._fit_hash
+
+    def fit_coefficients(self):
+        """
+        The fit to the data, in a JSON compatible form that can be stored,
+        and passed in to a new KinematicViscosity object for the same data.
+        """
+        return {'hash': self.fit_hash(),
+                'k_v2': float(self._k_v2),
+                'visc_A': float(self._visc_A),
+                'temp_range': [float(self.temps[0]), float(self.temps[-1])]}
+
+
+def _stack_tables(tables):
+    """
+    Stack data tables of (value, temp) pairs into 2-D arrays, one row per
+    table, sorted by temperature.
+
+    The rows are padded out with the last pair of the table, so the
+    padding is zero-width at the high end of the temperature range.
+
+    :returns: values, temps, counts
+    """
+    counts = np.array([len(t) for t in tables], dtype=int)
+    width = max(1, counts.max(initial=0))
+
+    values = np.full((len(tables), width), np.nan)
+    temps = np.full((len(tables), width), np.nan)
+
+    for i, table in enumerate(tables):
+        if len(table) > 0:
+            vals, tmps = zip(*sorted(table, key=itemgetter(1)))
+
+            values[i, :len(vals)] = vals
+            values[i, len(vals):] = vals[-1]
+            temps[i, :len(tmps)] = tmps
+            temps[i, len(tmps):] = tmps[-1]
+
+    return values, temps, counts
+
+
+def _batch_slope(x, y, counts):
+    """
+    The least squares slopes of y vs x, for each row of the stacked data
+
+    (only the first count values of each row are used)
+
+    :returns: slope, mean of x, mean of y
+    """
+    used = np.arange(x.shape[1]) < counts[:, np.newaxis]
+    n = np.where(counts > 0, counts, 1)
+
+    x_mean = np.where(used, x, 0.0).sum(axis=1) / n
+    y_mean = np.where(used, y, 0.0).sum(axis=1) / n
+
+    dx = np.where(used, x - x_mean[:, np.newaxis], 0.0)
+    dy = np.where(used, y - y_mean[:, np.newaxis], 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+
+    return slope, x_mean, y_mean
+
+
+class DensityBatch:
+    """
+    class to do the calculations of the Density class, for many oils at once
+
+    The data for all the oils are stacked into arrays, so the densities of
+    all the oils, at any number of temperatures, are computed with a few
+    array operations, rather than a loop over the oils.
+
+    data is stored internally in standard units:
+    temperature in Kelvin
+    density in kg/m^3
+
+    Oils that a Density object can't be made for (no data, or repeated
+    temperatures) get NaN densities.  The ``valid`` attribute flags the
+    oils that have results.
+    """
+
+    def __init__(self, oils):
+        """
+        Initialize a density calculator for a number of oils
+
+        :param oils: Sequence of Oil objects, and/or density/temperature
+                     pairs tables, as the Density class takes.
+
+        If data pairs, units must be kg/m^3 and K
+        """
+        tables = [get_density_data(oil, units='kg/m^3', temp_units="K")
+                  if _is_oil(oil) else oil
+                  for oil in oils]
+
+        self.densities, self.temps, self.counts = _stack_tables(tables)
+
+        self.initialize()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def initialize(self):
+        """
+        Initialize the expansion coefficients, as Density.initialize() does
+
+        For outside the measured range
+        """
+        counts = self.counts
+
+        in_range = (np.arange(self.temps.shape[1] - 1)
+                    < (counts - 1)[:, np.newaxis])
+        discreet = np.all(~in_range | (np.diff(self.temps) > 0), axis=1)
+
+        self.valid = (counts > 0) & discreet
+
+        # if there is only one density, use a default
+        d = self.densities[:, 0]
+        t = self.temps[:, 0]
+
+        one_point = np.where(np.abs(t - 288.16) < 5.0,
+                             np.where(d < 875, -0.0009, -0.0008),
+                             -0.00085)
+
+        # otherwise, a linear fit to the points
+        slope, _t_mean, _d_mean = _batch_slope(self.temps, self.densities,
+                                               counts)
+
+        self.k_rho_default = np.where(counts == 1, one_point, slope)
+        self.k_rho_default[~self.valid] = np.nan
+
+    def at_temp(self, temp, unit='K'):
+        """
+        densities of all the oils at the provided temperature(s)
+
+        :param temp: scalar or sequence of temps
+
+        :param unit='K': unit of temperature
+
+        densities will be returned as kg/m^3, in an array of shape
+        (number of oils,) for a scalar temp, or
+        (number of oils, number of temps) for a sequence of temps.
+        """
+        temp = np.asarray(temp, dtype=np.float64)
+        scaler = True if temp.shape == () else False
+        temp = temp.reshape((1, -1))
+
+        if unit != 'K':
+            temp = np.asarray(uc.convert(unit, 'K', temp))
+
+        temps, dens = self.temps, self.densities
+        k_rho = self.k_rho_default[:, np.newaxis]
+
+        first_t, first_d = temps[:, :1], dens[:, :1]
+        last_t, last_d = temps[:, -1:], dens[:, -1:]
+
+        # outside the measured range
+        densities = np.where(temp < first_t,
+                             first_d + (k_rho * (temp - first_t)),
+                             last_d + (k_rho * (temp - last_t)))
+
+        # within the measured range -- interpolated the way np.interp does
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j in range(temps.shape[1] - 1):
+                t0, t1 = temps[:, j:j + 1], temps[:, j + 1:j + 2]
+                d0, d1 = dens[:, j:j + 1], dens[:, j + 1:j + 2]
+
+                slope = (d1 - d0) / (t1 - t0)
+
+                densities = np.where((t0 <= temp) & (temp < t1),
+                                     slope * (temp - t0) + d0,
+                                     densities)
+
+        densities = np.where(temp == last_t, last_d, densities)
+        densities[~self.valid] = np.nan
+
+        return densities[:, 0] if scaler else densities
+
+
+class KinematicViscosityBatch:
+    """
+    Class to do the calculations of the KinematicViscosity class, for many
+    oils at once
+
+    The curves of all the oils are fit at once, into arrays of the
+    constants, so the viscosities of all the oils, at any number of
+    temperatures, are computed in a single array expression.
+
+    Data is stored internally in standard units:
+    temperature in Kelvin
+    viscosity in m^2/s
+
+    Oils that a KinematicViscosity object can't be made for (e.g. no data)
+    get NaN viscosities.  The ``valid`` attribute flags the oils that have
+    results.
+    """
+    default_kvs = KinematicViscosity.default_kvs
+    DEFAULT_KV2 = KinematicViscosity.DEFAULT_KV2
+
+    def __init__(self, oils, k_v2=None):
+        """
+        Initialize from a sequence of Oil objects and/or data tables, as
+        the KinematicViscosity class takes.
+
+        :param k_v2=None: The "Slope" parameter of the curve, used for the
+                          oils with only one data point.  If not specified,
+                          the same defaults as KinematicViscosity are used.
+        :type k_v2: float
+        """
+        tables = []
+        k_v2s = []
+
+        for oil in oils:
+            if _is_oil(oil):
+                try:
+                    data = get_kinematic_viscosity_data(oil,
+                                                        units='m^2/s',
+                                                        temp_units="K")
+                except ValueError:
+                    # e.g. only dynamic viscosities, and no densities
+                    data = []
+
+                default = self.default_kvs.get(oil.metadata.product_type,
+                                               self.DEFAULT_KV2)
+            else:
+                data = oil
+                default = self.DEFAULT_KV2
+
+            tables.append(data)
+            k_v2s.append(default if k_v2 is None else k_v2)
+
+        self.kviscs, self.temps, self.counts = _stack_tables(tables)
+        self._default_k_v2 = np.array(k_v2s, dtype=np.float64)
+
+        self.initialize()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def initialize(self):
+        """
+        viscosity as a function of temp is given by:
+
+        v = A exp(k_v2 / T)
+
+        The constants, A and k_v2 are determined from the viscosity data,
+        as in KinematicViscosity.initialize()
+        """
+        counts = self.counts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope, inv_t_mean, log_v_mean = _batch_slope(1.0 / self.temps,
+                                                         np.log(self.kviscs),
+                                                         counts)
+
+            one_point = self.kviscs[:, 0] * np.exp(-self._default_k_v2
+                                                   / self.temps[:, 0])
+
+            self._k_v2 = np.where(counts == 1, self._default_k_v2, slope)
+            self._visc_A = np.where(counts == 1,
+                                    one_point,
+                                    np.exp(log_v_mean - slope * inv_t_mean))
+
+        self.valid = ((counts > 0)
+                      & np.isfinite(self._k_v2)
+                      & np.isfinite(self._visc_A))
+
+        self._k_v2[~self.valid] = np.nan
+        self._visc_A[~self.valid] = np.nan
+
+    def at_temp(self, temp, kvis_units='m^2/s', temp_units="K"):
+        """
+        Compute the kinematic viscosities of all the oils as a function of
+        temperature
+
+        :param temp: temperatures to compute at: can be scalar or
+                     a sequence of values.
+
+        The result is an array of shape (number of oils,) for a scalar
+        temp, or (number of oils, number of temps) for a sequence of temps.
+        """
+        temp = np.asarray(temp, dtype=np.float64)
+        scaler = True if temp.shape == () else False
+        temp = np.asarray(uc.convert('temperature', temp_units, 'K',
+                                     temp.reshape((1, -1))))
+
+        kvisc = (self._visc_A[:, np.newaxis]
+                 * np.exp(self._k_v2[:, np.newaxis] / temp))
+        kvisc = uc.convert('kinematic viscosity', 'm^2/s', kvis_units, kvisc)
+
+        return kvisc[:, 0] if scaler else kvisc
+
 
 def get_density_data(oil, units="kg/m^3", temp_units="K"):
     """
@@ -269,37 +644,43 @@ def get_density_data(oil, units="kg/m^3", temp_units="K"):
 
     :param temp_units="K": units you want the density in
     """
-    densities = [d for d in oil.sub_samples[0].physical_properties.densities
-                 if d.density is not None
-                 and d.ref_temp is not None]
+    densities = oil.sub_samples[0].physical_properties.densities
 
-    # create normalized list of densities
-    density_table = []
-    for density_point in densities:
-        try:
-            d = density_point.density.converted_to(units).value
-            t = density_point.ref_temp.converted_to(temp_units).value
-            density_table.append((d, t))
-        except (TypeError, ValueError):
-            # Data not good -- moving on
-            pass
+    # the points that are missing data, or can't be converted are dropped
+    return _data_table(*densities.to_arrays(units, temp_units))
 
-    return density_table
+
+def _data_table(values, temps):
+    """
+    The (value, temp) pairs of the values and temps arrays, without the
+    ones that are missing (NaN)
+    """
+    return [(v, t) for v, t in zip(values.tolist(), temps.tolist())
+            if not (isnan(v) or isnan(t))]
 
 
 def _get_visc_data(visc, units, temp_units, shear_rate):
+    # the points that are missing data are dropped, but bad units raise
+    values, temps = visc.to_arrays(units, temp_units, strict=True)
+    shear_rates = measurements_to_array([p.shear_rate for p in visc], "1/s",
+                                        strict=True)
+
     visc_table = []
 
-    for visc_point in visc:
-        d = visc_point.viscosity.converted_to(units).value
-        t = visc_point.ref_temp.converted_to(temp_units).value
-        sr = visc_point.shear_rate
-        if sr is not None:
-            sr = sr.converted_to("1/s").value
-            if shear_rate is None:
-                shear_rate = sr
+    for d, t, sr in zip(values.tolist(),
+                        temps.tolist(),
+                        shear_rates.tolist()):
+        if isnan(d) or isnan(t):
+            continue
+
+        if isnan(sr):
+            sr = None
+        elif shear_rate is None:
+            shear_rate = sr
+
         if sr is None or sr == shear_rate:
             visc_table.append((d, t))
+
     return visc_table
 
 
@@ -321,14 +702,13 @@ def get_kinematic_viscosity_data(oil, units="m^2/s", temp_units="K", shear_rate=
     :type shear_rate: float or int
     """
     try:
-        kvisc = [k for k in (oil.sub_samples[0]
-                             .physical_properties.kinematic_viscosities)
-                 if k.viscosity is not None
-                 and k.ref_temp is not None]
+        kvisc = (oil.sub_samples[0]
+                 .physical_properties.kinematic_viscosities)
     except IndexError:  # no subsamples at all!
         return []
 
-    if len(kvisc) > 0:  # use provided kinematic viscosity of it exists
+    if any(k.viscosity is not None and k.ref_temp is not None
+           for k in kvisc):  # use provided kinematic viscosity of it exists
         visc_table = _get_visc_data(kvisc, units, temp_units, shear_rate)
 
     else:  # no kinematic data, try to use dynamic viscosity data
@@ -360,12 +740,10 @@ def get_dynamic_viscosity_data(oil, units="Pas", temp_units="K", shear_rate=None
     :type shear_rate: float or int
 
     """
-    dvisc = [d for d in (oil.sub_samples[0]
-                         .physical_properties.dynamic_viscosities)
-             if d.viscosity is not None
-             and d.ref_temp is not None]
+    dvisc = oil.sub_samples[0].physical_properties.dynamic_viscosities
 
-    if len(dvisc) > 0:
+    if any(d.viscosity is not None and d.ref_temp is not None
+           for d in dvisc):
         visc_table = _get_visc_data(dvisc, units, temp_units, shear_rate)
     else:  # no dynamic, check kinematic
         kvisc = oil.sub_samples[0].physical_properties.kinematic_viscosities
@@ -427,22 +805,10 @@ def get_interfacial_tension_seawater(oil, units="N/m", temp_units="K"):
 
     :param temp_units="K": units you want the reference temperature in
     """
-    interfacial_tensions = [t for t in oil.sub_samples[0].physical_properties.interfacial_tension_seawater
-                 if t.tension is not None
-                 and t.ref_temp is not None]
+    interfacial_tensions = (oil.sub_samples[0]
+                            .physical_properties.interfacial_tension_seawater)
 
-    # create normalized list of interfacial tensions
-    interfacial_tension_table = []
-    for interfacial_tension_point in interfacial_tensions:
-        try:
-            i = interfacial_tension_point.tension.converted_to(units).value
-            t = interfacial_tension_point.ref_temp.converted_to(temp_units).value
-            interfacial_tension_table.append((i, t))
-        except (TypeError, ValueError):
-            # Data not good -- moving on
-            pass
-
-    return interfacial_tension_table
+    return _data_table(*interfacial_tensions.to_arrays(units, temp_units))
 
 
 def get_interfacial_tension_water(oil, units="N/m", temp_units="K"):
@@ -457,22 +823,10 @@ def get_interfacial_tension_water(oil, units="N/m", temp_units="K"):
 
     :param temp_units="K": units you want the reference temperature in
     """
-    interfacial_tensions = [t for t in oil.sub_samples[0].physical_properties.interfacial_tension_water
-                 if t.tension is not None
-                 and t.ref_temp is not None]
+    interfacial_tensions = (oil.sub_samples[0]
+                            .physical_properties.interfacial_tension_water)
 
-    # create normalized list of interfacial tensions
-    interfacial_tension_table = []
-    for interfacial_tension_point in interfacial_tensions:
-        try:
-            i = interfacial_tension_point.tension.converted_to(units).value
-            t = interfacial_tension_point.ref_temp.converted_to(temp_units).value
-            interfacial_tension_table.append((i, t))
-        except (TypeError, ValueError):
-            # Data not good -- moving on
-            pass
-
-    return interfacial_tension_table
+    return _data_table(*interfacial_tensions.to_arrays(units, temp_units))
 
 
 def get_pour_point(oil):
@@ -528,21 +882,13 @@ def get_distillation_cuts(oil, units="fraction", temp_units="K"):
     """
     distillation_cuts = oil.sub_samples[0].distillation_data.cuts
 
-    cuts_table = []
-
-    for cut in distillation_cuts:
-
-        if cut.fraction is None:
-            f = None
-        else:
-            f = sigfigs(cut.fraction.converted_to(units).value, sig=15)
-
-        if cut.vapor_temp is None:
-            t = None
-        else:
-            t = sigfigs(cut.vapor_temp.converted_to(temp_units).value, sig=15)
+    # bad units raise
+    fractions, temps = distillation_cuts.to_arrays(units, temp_units,
+                                                   strict=True)
 
-        cuts_table.append((f, t))
+    cuts_table = [(None if isnan(f) else sigfigs(f, sig=15),
+                   None if isnan(t) else sigfigs(t, sig=15))
+                  for f, t in zip(fractions.tolist(), temps.tolist())]
 
     cuts_table.sort(key=itemgetter(0))
 
@@ -597,7 +943,13 @@ def emul_water(oil):
     return Ymax
 
 
-def bullwinkle_fraction(oil):
+def bullwinkle_fraction(oil, api=None):
+    """
+    The fraction evaporated at which the oil starts to emulsify
+
+    :param api: The API gravity to use.  If None, the API in the
+                metadata of the oil is used.
+    """
     Ni = 0
     Va = 0
 
@@ -632,7 +984,7 @@ def bullwinkle_fraction(oil):
             oil.metadata.product_type != "Bitumen Blend"):
         bullwinkle_fraction = 1.0
     else:
-        oil_api = oil.metadata.API
+        oil_api = oil.metadata.API if api is None else api
 
         if (Ni > 0.0 and Va > 0.0 and Ni + Va > 15.0):
             bullwinkle_fraction = 0.0
@@ -0,0 +1,245 @@
+"""
+Finding the oils in the catalog most like a given oil
+
+When a spilled product isn't in the catalog, we look for substitutes: the
+oils with the most similar behavior.  Each record gets a vector of
+features (see oil_features()):
+
+- the API gravity
+- the kinematic viscosity (log10 of cSt) at a few standard temperatures
+- the pour point
+- the fraction evaporated at a set of distillation temperatures
+- the SARA fractions
+
+The features are stored with the record in the database, (see
+FEATURES_FIELD), so the index of a whole catalog can be built without
+loading the records.
+
+The SimilarityIndex finds the nearest oils by brute force -- a catalog of
+a few thousand oils is a small matrix, and a lot of the records are
+missing a lot of the data, which a KD-tree can't deal with.  Each feature
+is scaled by its standard deviation over the catalog, and the distance is
+the (weighted) root mean square of the differences of the features both
+oils have.  Each group of features has the same weight, so the nine
+distillation temperatures don't outweigh the API.
+"""
+import numpy as np
+
+from .physical_properties import get_distillation_cuts
+
+# the field of a record (in the database) the features are stored in
+FEATURES_FIELD = '_similarity_features'
+
+# the temperatures (C) of the kinematic viscosity features
+KVIS_TEMPS = (0, 15, 40)
+
+# the temperatures (C) of the distillation features
+CUT_TEMPS = (100, 150, 200, 250, 300, 350, 400, 450, 500)
+
+SARA_FIELDS = ('saturates', 'aromatics', 'resins', 'asphaltenes')
+
+# (group, feature names) -- each group has the same weight in the distance
+FEATURE_GROUPS = (
+    ('api', ('api',)),
+    ('kvis', tuple(f'log_kvis_{t}C' for t in KVIS_TEMPS)),
+    ('pour_point', ('pour_point',)),
+    ('distillation', tuple(f'evaporated_{t}C' for t in CUT_TEMPS)),
+    ('sara', SARA_FIELDS),
+)
+
+FEATURE_NAMES = tuple(name
+                      for _group, names in FEATURE_GROUPS
+                      for name in names)
+
+FEATURE_WEIGHTS = np.array([1.0 / len(names)
+                            for _group, names in FEATURE_GROUPS
+                            for _name in names])
+
+# a record is only compared to one that has at least this fraction of its
+# (weighted) features
+MIN_OVERLAP = 0.5
+
+
+def oil_features(oil):
+    """
+    The similarity features of an oil, in a JSON compatible form, to be
+    stored with the record::
+
+        {'api': 28.9, 'log_kvis_15C': 1.23, ...}
+
+    Only the features the record has the data for are included.
+    """
+    features = {}
+
+    for compute in (_api_features,
+                    _kvis_features,
+                    _pour_point_features,
+                    _distillation_features,
+                    _sara_features):
+        try:
+            features.update(compute(oil))
+        except Exception:
+            pass
+
+    return {name: float(value)
+            for name, value in features.items()
+            if value is not None and np.isfinite(value)}
+
+
+def _api_features(oil):
+    try:
+        api = oil.derived.api
+    except Exception:
+        api = oil.metadata.API
+
+    return {'api': api}
+
+
+def _kvis_features(oil):
+    kvis = oil.derived.kinematic_viscosity.at_temp(KVIS_TEMPS,
+                                                   kvis_units='cSt',
+                                                   temp_units='C')
+
+    return {f'log_kvis_{t}C': v
+            for t, v in zip(KVIS_TEMPS, np.log10(kvis))}
+
+
+def _pour_point_features(oil):
+    pour_point = oil.sub_samples[0].physical_properties.pour_point
+    pp = pour_point.measurement.converted_to('C')
+
+    for value in (pp.max_value, pp.value, pp.min_value):
+        if value is not None:
+            return {'pour_point': value}
+
+    return {}
+
+
+def _distillation_features(oil):
+    """
+    The fraction evaporated at the CUT_TEMPS inside the range of the
+    distillation data -- we don't extrapolate.
+    """
+    cuts = sorted((t, f)
+                  for f, t in get_distillation_cuts(oil, temp_units='C')
+                  if f is not None and t is not None)
+
+    if len(cuts) < 2:
+        return {}
+
+    temps, fractions = zip(*cuts)
+
+    return {f'evaporated_{t}C': np.interp(t, temps, fractions)
+            for t in CUT_TEMPS
+            if temps[0] <= t <= temps[-1]}
+
+
+def _sara_features(oil):
+    sara = oil.sub_samples[0].SARA
+
+    return {name: getattr(sara, name).converted_to('fraction').value
+            for name in SARA_FIELDS
+            if getattr(sara, name) is not None}
+
+
+class SimilarityIndex:
+    """
+    A nearest neighbour index over the similarity features of a catalog
+    """
+    def __init__(self, features):
+        """
+        :param features: An iterable of (oil_id, features) pairs, with
+                         the features from oil_features(), or None.
+        """
+        self.oil_ids = []
+        rows = []
+
+        for oil_id, oil_feats in features:
+            self.oil_ids.append(oil_id)
+            rows.append(self._row(oil_feats or {}))
+
+        self._rows = {oil_id: i for i, oil_id in enumerate(self.oil_ids)}
+
+        data = np.array(rows, dtype=np.float64).reshape(-1,
+                                                        len(FEATURE_NAMES))
+        known = ~np.isnan(data)
+
+        count = known.sum(axis=0)
+        filled = np.where(known, data, 0.0)
+
+        self.mean = filled.sum(axis=0) / np.maximum(count, 1)
+        self.std = np.sqrt((np.where(known, data - self.mean, 0.0) ** 2)
+                           .sum(axis=0) / np.maximum(count, 1))
+        self.std[self.std == 0.0] = 1.0
+
+        self._known = known
+        self._data = np.where(known, (data - self.mean) / self.std, 0.0)
+
+    def __len__(self):
+        return len(self.oil_ids)
+
+    def __contains__(self, oil_id):
+        return oil_id in self._rows
+
+    @staticmethod
+    def _row(features):
+        return [features.get(name, np.nan) for name in FEATURE_NAMES]
+
+    def similar(self, oil_id, k=10):
+        """
+        The oils most similar to an oil of the catalog, (not including
+        itself)
+
+        :param oil_id: The oil_id of the oil.
+        :param k=10: The number of oils to return.
+
+        :returns: a list of (oil_id, distance) pairs, nearest first.
+
+        :raises KeyError: if the oil is not in the index
+        """
+        i = self._rows[oil_id]
+
+        return self._nearest(self._data[i], self._known[i], k, exclude=i)
+
+    def nearest(self, features, k=10):
+        """
+        The oils of the catalog most similar to an oil that may not be in
+        it.
+
+        :param features: The features of the oil, (see oil_features())
+        :param k=10: The number of oils to return.
+
+        :returns: a list of (oil_id, distance) pairs, nearest first.
+        """
+        values = np.array(self._row(features), dtype=np.float64)
+        known = ~np.isnan(values)
+
+        return self._nearest(np.where(known, (values - self.mean) / self.std,
+                                      0.0),
+                             known, k)
+
+    def _nearest(self, values, known, k, exclude=None):
+        wanted = (known * FEATURE_WEIGHTS).sum()
+
+        if len(self.oil_ids) == 0 or k <= 0 or wanted == 0.0:
+            return []
+
+        weights = self._known * (known * FEATURE_WEIGHTS)
+        overlap = weights.sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dist = np.sqrt((weights * (self._data - values) ** 2)
+                           .sum(axis=1) / overlap)
+
+        dist[overlap < MIN_OVERLAP * wanted] = np.inf
+
+        if exclude is not None:
+            dist[exclude] = np.inf
+
+        k = min(k, len(dist))
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.argsort(dist[nearest], kind='stable')]
+
+        return [(self.oil_ids[i], float(dist[i]))
+                for i in nearest
+                if np.isfinite(dist[i])]
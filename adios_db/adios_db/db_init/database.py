@@ -7,6 +7,9 @@ import logging
 from pymongo import ASCENDING
 from pymongo.errors import ConnectionFailure
 
+from ..session.text_search import SEARCH_TOKENS_FIELD
+from ..computation.derived_properties import GRID_FIELD
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,11 +28,91 @@ def drop_db(client, db_name):
         raise
 
 
+# All the oil collection queries made by Session.query() that can be sorted
+# are done with this collation, so the indexes used for filtering and
+# sorting need to have it as well.
+QUERY_COLLATION = {'locale': 'en'}
+
+# The full set of managed indexes on the oil collection.
+#
+# oil_id is unique, and used for the single record lookups, which have no
+# collation.  The rest cover the filtering and sorting done by the web
+# client, so those queries can use an index instead of doing a collection
+# scan and an in-memory sort.  Sorted queries always use the oil_id as the
+# final sort key (for keyset paging), so it is part of the sort indexes.
+#
+# The text search is an equality match on the search tokens, so the main
+# search of the web client, (text, sorted by name, a page at a time), has
+# an index of the tokens and then the sort keys.  Text searches sorted by
+# another field are left to an in-memory sort of the matching records,
+# which are few, rather than having an index for every sort field.
+#
+# The property grid has a wildcard index, which covers the range filters
+# over each of its values, (see Session.query(properties=...))
+#
+# Sorting by an array field (metadata.labels, status) is knowingly left
+# unindexed: MongoDB sorts an array by its lowest (or highest) element,
+# which a multikey index can't give it, so those queries always have an
+# in-memory sort.
+OIL_INDEXES = [
+    {'name': 'oil_id_1',
+     'keys': [('oil_id', ASCENDING)],
+     'unique': True},
+    {'name': 'oil_id_1_en',
+     'keys': [('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'search_tokens_1_name_1_oil_id_1_en',
+     'keys': [(SEARCH_TOKENS_FIELD, ASCENDING),
+              ('metadata.name', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'name_1_oil_id_1_en',
+     'keys': [('metadata.name', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'location_1_oil_id_1_en',
+     'keys': [('metadata.location', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'product_type_1_oil_id_1_en',
+     'keys': [('metadata.product_type', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'product_type_1_name_1_oil_id_1_en',
+     'keys': [('metadata.product_type', ASCENDING),
+              ('metadata.name', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'API_1_oil_id_1_en',
+     'keys': [('metadata.API', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'labels_1_en',
+     'keys': [('metadata.labels', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'gnome_suitable_1_en',
+     'keys': [('metadata.gnome_suitable', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'model_completeness_1_oil_id_1_en',
+     'keys': [('metadata.model_completeness', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'sample_date_1_oil_id_1_en',
+     'keys': [('metadata.sample_date', ASCENDING),
+              ('oil_id', ASCENDING)],
+     'collation': QUERY_COLLATION},
+    {'name': 'property_grid_wildcard_en',
+     'keys': [(f'{GRID_FIELD}.$**', ASCENDING)],
+     'collation': QUERY_COLLATION},
+]
+
+
 def create_indices(db):
     print('\ncreating indices on db {}...'.format(db.name))
 
     try:
-        db.oil.create_index([('oil_id', ASCENDING)], unique=True)
+        for spec in OIL_INDEXES:
+            create_index(db.oil, spec)
 
         print('Oil collection indices: {}'
               .format(list(db.oil.index_information().keys())))
@@ -39,3 +122,54 @@ def create_indices(db):
     except Exception:
         print('Failed to create indexes for Oil database!')
         raise
+
+
+def create_index(collection, spec):
+    kwargs = {k: v for k, v in spec.items() if k != 'keys'}
+
+    return collection.create_index(spec['keys'], **kwargs)
+
+
+def verify_indices(db):
+    """
+    Check the indexes on the oil collection against our managed set.
+
+    :returns: a list of the names of the managed indexes that are either
+              missing, or don't match their specification.
+    """
+    info = db.oil.index_information()
+    bad_indexes = []
+
+    for spec in OIL_INDEXES:
+        idx = info.get(spec['name'])
+
+        if idx is None or not _index_matches(spec, idx):
+            bad_indexes.append(spec['name'])
+
+    return bad_indexes
+
+
+def _index_matches(spec, idx):
+    if [tuple(k) for k in idx['key']] != [tuple(k) for k in spec['keys']]:
+        return False
+
+    if bool(idx.get('unique', False)) != spec.get('unique', False):
+        return False
+
+    locale = idx.get('collation', {}).get('locale')
+    if locale != spec.get('collation', {}).get('locale'):
+        return False
+
+    return True
+
+
+def rebuild_indices(db):
+    """
+    Drop all the indexes on the oil collection, and create our managed
+    set from scratch.
+    """
+    logger.info(f'rebuilding indices on db {db.name}...')
+
+    db.oil.drop_indexes()  # this leaves the _id index alone
+
+    create_indices(db)
@@ -10,16 +10,29 @@ They can be converted to other units if need be.
 They can accommodate a single value, or a range of values
 
 They can also accommodate a standard deviation and number of replicates.
+
+Whole lists of measurements can be converted to a numpy array at once,
+(see measurements_to_array()), with a table of the conversions that have
+been used, each of which is (usually) just a scale and an offset from the
+nucos unit tables, (see get_conversion()).
+
+There can be a lot of them (hundreds of thousands in a full catalog), so
+they store their fields in __slots__, and the unit and unit_type strings
+are interned, so all the measurements share a single copy of each.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from functools import lru_cache
 from math import isclose
+from numbers import Number
 import copy
+import sys
 import warnings
 
+import numpy as np
 import nucos
-from nucos import convert
+from nucos import convert, unit_conversion
 
-from ..common.utilities import dataclass_to_json
+from ..common.utilities import dataclass_to_json, add_slots
 
 # why are these oil specific???
 # There should be a project-wide repository for warnings & errors
@@ -48,11 +61,157 @@ __all__ = [
     'Time',
     'Unitless',
     'AnyUnit',
+    'get_conversion',
+    'measurements_to_array',
 ]
 
 
 
+def _intern(string):
+    """
+    intern a string, so that all the measurements share it
+
+    (unit may be some other (invalid) type, so that is passed through)
+    """
+    return sys.intern(string) if type(string) is str else string
+
+
+class UnitConversion:
+    """
+    The conversion of arrays of values from one unit to another
+
+    Most conversions are just a scale, (or a scale and an offset, for
+    temperatures), which are taken from the unit tables of nucos, and
+    applied to a whole numpy array at once, with the same arithmetic as
+    nucos, so the results are exactly the same.  The other conversions,
+    (e.g. to and from API), are left to nucos, (with a whole array at
+    once).
+
+    It is only used for the lists of measurements (see
+    measurements_to_array()) -- a single measurement is converted by
+    nucos itself.
+
+    A UnitConversion can be called with a single value, or with a numpy
+    array of values.
+    """
+    __slots__ = ('unit_type', 'from_unit', 'to_unit', 'factors', 'offsets')
+
+    def __init__(self, unit_type, from_unit, to_unit):
+        self.unit_type = unit_type
+        self.from_unit = from_unit
+        self.to_unit = to_unit
+
+        self.factors = self.offsets = None
+
+        try:
+            converter = unit_conversion.Converters[
+                unit_conversion.Simplify(unit_type)
+            ]
+            from_key = converter.Synonyms[unit_conversion.Simplify(from_unit)]
+            to_key = converter.Synonyms[unit_conversion.Simplify(to_unit)]
+        except (KeyError, AttributeError, TypeError):
+            # an invalid unit or unit type -- left to nucos, which raises
+            # the Exception when it is called.
+            return
+
+        from_data = converter.Convertdata[from_key]
+        to_data = converter.Convertdata[to_key]
+
+        if type(converter) is unit_conversion.TempConverterClass:
+            self.factors = (from_data[0], to_data[0])
+            self.offsets = (from_data[1], to_data[1])
+        elif (type(converter) is unit_conversion.ConverterClass or
+              (type(converter) is unit_conversion.DensityConverterClass and
+               'apidegree' not in (from_key, to_key))):
+            self.factors = (from_data, to_data)
+
+    @property
+    def is_affine(self):
+        """
+        True if the conversion is done with the scale and offset from the
+        nucos unit tables, rather than by nucos
+        """
+        return self.factors is not None
+
+    def __call__(self, values):
+        if self.offsets is not None:
+            # as nucos.unit_conversion.TempConverterClass does it
+            (a1, a2), (b1, b2) = self.factors, self.offsets
+
+            return ((values + b1) * a1 / a2) - b2
+        elif self.factors is not None:
+            # as nucos.unit_conversion.ConverterClass does it
+            return values * self.factors[0] / self.factors[1]
+        else:
+            return convert(self.unit_type, self.from_unit, self.to_unit,
+                           values)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}({self.unit_type!r}, '
+                f'{self.from_unit!r}, {self.to_unit!r})')
+
+
+@lru_cache(maxsize=1024)
+def get_conversion(unit_type, from_unit, to_unit):
+    """
+    The UnitConversion from one unit to another, made the first time it
+    is asked for.
+
+    If the conversion can't be done, nucos raises its Exception when the
+    UnitConversion is called.
+    """
+    return UnitConversion(unit_type, from_unit, to_unit)
+
+
+def measurements_to_array(measurements, unit, attr='value', strict=False):
+    """
+    Convert a sequence of measurements to a numpy array of values in a
+    unit, in one go, without making converted copies of the measurements.
+
+    The measurements are grouped by their unit, and each group is
+    converted all at once.
+
+    :param measurements: A sequence of Measurement objects, or None.
+    :param unit: The unit the values are wanted in.
+    :param attr='value': The attribute of the measurements wanted,
+                         e.g. 'min_value'
+    :param strict=False: If True, the measurements that can't be converted
+                         raise the Exception of the conversion, as
+                         converted_to() does, rather than being NaN.
+
+    :returns: an array of float64, with NaN for the measurements that are
+              None, don't have the attribute set, or can't be converted.
+    """
+    values = np.full(len(measurements), np.nan)
+    groups = {}  # (unit_type, unit): (indexes, values)
+
+    for i, measurement in enumerate(measurements):
+        value = None if measurement is None else getattr(measurement, attr)
+
+        if (isinstance(value, Number) and not isinstance(value, bool)
+                and (strict or isinstance(measurement.unit, str))):
+            idx, vals = groups.setdefault((measurement.unit_type,
+                                           measurement.unit),
+                                          ([], []))
+            idx.append(i)
+            vals.append(value)
+
+    for (unit_type, from_unit), (idx, vals) in groups.items():
+        try:
+            conversion = get_conversion(unit_type, from_unit, unit)
+            values[idx] = conversion(np.array(vals, dtype=np.float64))
+        except (TypeError, ValueError):
+            if strict:
+                raise
+
+            # Data not good -- they stay NaN
+            pass
+
+    return values
+
+
 @dataclass_to_json
+@add_slots
 @dataclass
 class MeasurementDataclass:
     """
@@ -92,21 +251,66 @@ class MeasurementDataclass:
         pass
 
 
+# the slot that holds the unit_type of an instance
+_unit_type_slot = MeasurementDataclass.__dict__['unit_type']
+
+
+class UnitTypeAttribute:
+    """
+    The unit_type attribute of the Measurement classes
+
+    On a class, it is the unit type of the class, e.g. ``Density.unit_type``
+    is "density".  On an instance, it is the instance's own unit_type, which
+    is kept in the unit_type slot.  (A plain class attribute would hide the
+    slot.)
+    """
+    __slots__ = ('class_unit_type',)
+
+    def __init__(self, class_unit_type):
+        self.class_unit_type = class_unit_type
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self.class_unit_type
+
+        return _unit_type_slot.__get__(obj, objtype)
+
+    def __set__(self, obj, value):
+        _unit_type_slot.__set__(obj, value)
+
+
 class MeasurementBase(MeasurementDataclass):
+    __slots__ = ()
+
     # need to add these here, so they won't be overwritten by the
     # decorator
-    unit_type = None
+    # (subclasses can set it to a plain string -- see __init_subclass__)
+    unit_type = UnitTypeAttribute(None)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        unit_type = cls.__dict__.get('unit_type')
+
+        if unit_type is not None and not isinstance(unit_type,
+                                                    UnitTypeAttribute):
+            cls.unit_type = UnitTypeAttribute(_intern(unit_type))
 
     def __post_init__(self):
-        if self.__class__.unit_type is None:
+        class_unit_type = self.__class__.unit_type
+
+        if class_unit_type is None:
             raise NotImplementedError("Can't initialize a measurement "
                                       "with no unit_type")
-        if self.unit_type is None:
-            self.unit_type = self.__class__.unit_type
-        self.unit_type = self.unit_type.lower().replace(" ", "")
-        if self.unit_type != self.__class__.unit_type:
-            raise ValueError(f"unit_type must be: {self.__class__.unit_type}, "
-                             f"not {self.unit_type}")
+        if self.unit_type is not None:
+            unit_type = self.unit_type.lower().replace(" ", "")
+
+            if unit_type != class_unit_type:
+                raise ValueError(f"unit_type must be: {class_unit_type}, "
+                                 f"not {unit_type}")
+
+        self.unit_type = class_unit_type
+        self.unit = _intern(self.unit)
         self._make_all_float()
         self._fix_value_if_min_max()
         super().__post_init__()
@@ -203,6 +407,9 @@ class MeasurementBase(MeasurementDataclass):
                      if k != 'unit_type' and getattr(self, k) is not None]
         return attr_data == []
 
+    def _field_values(self):
+        return tuple(getattr(self, f.name) for f in fields(self))
+
     def py_json(self, sparse=True):
         """
         unit_type is added here, as it's not a settable field
@@ -246,9 +453,10 @@ class MeasurementBase(MeasurementDataclass):
                 new_vals[attr] = new_val
 
         # if this was all successful
-        new_vals['unit'] = new_unit
+        new_vals['unit'] = _intern(new_unit)
 
-        self.__dict__.update(new_vals)
+        for attr, val in new_vals.items():
+            setattr(self, attr, val)
 
         return None
 
@@ -312,6 +520,7 @@ class MeasurementBase(MeasurementDataclass):
 
 
 class Temperature(MeasurementBase):
+    __slots__ = ()
     unit_type = "temperature"
     fixCK = False  # you can monkey-patch this to turn it on.
 
@@ -398,6 +607,8 @@ class Unitless(MeasurementBase):
     """
     This is a type for data with no unit at all.
     """
+    __slots__ = ()
+
     unit_type = "unitless"
 
     def convert_to(self, *args, **kwargs):
@@ -415,31 +626,39 @@ class Dimensionless(MeasurementBase):
     This is a type that can be converted to generic fractional amounts,
     but does not refer to a particular measurable quantity.
     """
+    __slots__ = ()
+
     unit_type = "dimensionless"
 
 
 class Time(MeasurementBase):
+    __slots__ = ()
     unit_type = "time"
 
 
 class Length(MeasurementBase):
+    __slots__ = ()
     unit_type = "length"
 
 
 class Mass(MeasurementBase):
+    __slots__ = ()
     unit_type = "mass"
 
 
 class Concentration(MeasurementBase):
+    __slots__ = ()
     unit_type = 'concentration'
 
 
 class MassFraction(MeasurementBase):
+    __slots__ = ()
     unit_type = "massfraction"
     # add a validator: should be between 0 and 1.0
 
 
 class VolumeFraction(MeasurementBase):
+    __slots__ = ()
     unit_type = "volumefraction"
     # add a validator: should be between 0 and 1.0
 
@@ -464,6 +683,8 @@ class MassOrVolumeFraction(MeasurementBase):
     :param unit_type: the type of unit -- must be "massfraction",
                       "volumefraction" or "concentration"
     """
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         unit_type = kwargs.get("unit_type")
 
@@ -481,10 +702,11 @@ class MassOrVolumeFraction(MeasurementBase):
                 "'massfraction', 'volumefraction', 'concentration'\n"
                 f"args: {args}, kwargs: {kwargs}")
 
-        kwargs['unit_type'] = unit_type
+        kwargs['unit_type'] = _intern(unit_type)
         super().__init__(*args, **kwargs)
 
     def __post_init__(self):
+        self.unit = _intern(self.unit)
         self._make_all_float()
 
     def copy(self):
@@ -501,7 +723,7 @@ class MassOrVolumeFraction(MeasurementBase):
         """
         So as not to be pedantic with the class -- if the values all match
         """
-        return self.__dict__ == other.__dict__
+        return self._field_values() == other._field_values()
 
 
 @dataclass
@@ -509,12 +731,14 @@ class AnyUnit(MeasurementBase):
     """
     This is a type for data that could be any unit_type
     """
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         unit_type = kwargs.get("unit_type")
         if unit_type is None:
             raise TypeError("unit_type must be specified")
         try:
-            self.unit_type = unit_type.lower().replace(" ", "")
+            self.unit_type = _intern(unit_type.lower().replace(" ", ""))
         except AttributeError:
             raise TypeError("unit type must be a valid unit_type string")
         kwargs['unit_type'] = self.unit_type
@@ -524,15 +748,15 @@ class AnyUnit(MeasurementBase):
         """
         We don't need the post_init in this case
 
-        overriding it to disable it
+        overriding it to disable it -- except for interning the unit
         """
-        pass
+        self.unit = _intern(self.unit)
 
     def __eq__(self, other):
         """
         So as not to be pedantic with the class -- if the values all match
         """
-        return self.__dict__ == other.__dict__
+        return self._field_values() == other._field_values()
 
     def validate(self):
         """
@@ -547,26 +771,32 @@ class AnyUnit(MeasurementBase):
 
 
 class Density(MeasurementBase):
+    __slots__ = ()
     unit_type = "density"
 
 
 class DynamicViscosity(MeasurementBase):
+    __slots__ = ()
     unit_type = "dynamicviscosity"
 
 
 class KinematicViscosity(MeasurementBase):
+    __slots__ = ()
     unit_type = "kinematicviscosity"
 
 
 class SayboltViscosity(MeasurementBase):
+    __slots__ = ()
     unit_type = "sayboltviscosity"
 
 
 class Pressure(MeasurementBase):
+    __slots__ = ()
     unit_type = "pressure"
 
 
 class NeedleAdhesion(MeasurementBase):
+    __slots__ = ()
     unit_type = "needleadhesion"
 
     def validate(self):
@@ -577,10 +807,12 @@ class NeedleAdhesion(MeasurementBase):
 
 
 class InterfacialTension(MeasurementBase):
+    __slots__ = ()
     unit_type = "interfacialtension"
 
 
 class AngularVelocity(MeasurementBase):
+    __slots__ = ()
     unit_type = 'angularvelocity'
 
 
@@ -13,12 +13,84 @@ def something(val):
     return ((val == 0) or (val is not None) and val)
 
 
+# Values of these types are written to JSON as they are, so py_json()
+# doesn't need to look for a py_json method on them.
+# (only the exact types -- a subclass could have a py_json method)
+_PLAIN_JSON_TYPES = frozenset((type(None), str, int, float, bool,
+                               list, dict))
+
+
+def _json_fields(cls):
+    """
+    Work out, once per class, how each field of a dataclass is converted
+    to and from JSON.
+
+    Returns a tuple of ``(fieldname, from_json, allow_none, validate)``
+    for each field, where:
+
+    - from_json is the field type's from_py_json, or None if it doesn't
+      have one ("one of ours").
+    - allow_none is whether the field has a default of None.
+    - validate is the field type's validate, or None if it doesn't have one.
+
+    The result is cached on the class itself, so subclasses that are not
+    decorated again (e.g. the Measurement types) get their own.
+    """
+    try:
+        return cls.__dict__['_json_fields_cache']
+    except KeyError:
+        pass
+
+    fields = tuple((fieldname,
+                    getattr(fieldobj.type, 'from_py_json', None),
+                    fieldobj.default is None,
+                    getattr(fieldobj.type, 'validate', None))
+                   for fieldname, fieldobj
+                   in cls.__dataclass_fields__.items())
+
+    cls._json_fields_cache = fields
+
+    return fields
+
+
+def add_slots(cls):
+    """
+    class decorator that makes a dataclass store its fields in __slots__,
+    rather than in an instance __dict__ -- a lot less memory for classes
+    that we have a lot of instances of.
+
+    It does the same as the ``slots=True`` option of the dataclass
+    decorator, which we can't use before Python 3.10.  It must be applied
+    to the result of the dataclass decorator.
+
+    NOTE: subclasses need to set ``__slots__ = ()``, or they will get an
+          instance __dict__ anyway.
+    """
+    field_names = tuple(cls.__dataclass_fields__)
+
+    cls_dict = dict(cls.__dict__)
+    cls_dict['__slots__'] = field_names
+
+    # the defaults are in the generated __init__, and the class attributes
+    # would clash with the slots
+    for name in field_names:
+        cls_dict.pop(name, None)
+
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
 def dataclass_to_json(cls):
     """
     class decorator that adds the ability to save a dataclass as JSON
 
     All fields must be either JSON-able Python types or
     have be a type with a _to_json method
+
+    How each field is handled is worked out once for each class
+    (see _json_fields()), rather than for every object.
     """
     @classmethod
     def from_py_json(cls, py_json, allow_none=False):
@@ -30,26 +102,29 @@ def dataclass_to_json(cls):
         if hasattr(cls, "_pre_from_py_json"):
             py_json = cls._pre_from_py_json(py_json)
 
-        arg_dict = {}
-
         if py_json is None and allow_none is True:
             # the parent object defined an attribute with a default of None
             # We could actually allow other default types, but this one is
             # common
             return py_json
 
-        for fieldname, fieldobj in cls.__dataclass_fields__.items():
+        arg_dict = {}
+
+        for fieldname, from_json, allow_none, _validate in _json_fields(cls):
             if fieldname in py_json:
-                allow_none = True if fieldobj.default is None else False
+                value = py_json[fieldname]
+
+                if from_json is None:
+                    # it's not "one of ours", so we just use the value
+                    arg_dict[fieldname] = value
+                    continue
 
-                try:  # see if it's "one of ours"
-                    arg_dict[fieldname] = (fieldobj.type
-                                           .from_py_json(py_json[fieldname],
-                                                         allow_none=allow_none)
-                                           )
+                try:
+                    arg_dict[fieldname] = from_json(value,
+                                                    allow_none=allow_none)
                 except AttributeError:
-                    # it's not, so we just use the value
-                    arg_dict[fieldname] = py_json[fieldname]
+                    # it couldn't be made, so we just use the value
+                    arg_dict[fieldname] = value
                 except TypeError as err:
                     raise TypeError(f'TypeError in '
                                     f'{cls.__name__}._from_py_json(): '
@@ -57,6 +132,11 @@ def dataclass_to_json(cls):
                                     f'{err.args}')
 
         obj = cls(**arg_dict)
+
+        # if there is a post-processor - run it
+        if hasattr(cls, "_post_from_py_json"):
+            cls._post_from_py_json(obj, py_json)
+
         return obj
 
     def py_json(self, sparse=True):
@@ -68,12 +148,15 @@ def dataclass_to_json(cls):
                             included.
         """
         json_obj = {}
-        for fieldname in self.__dataclass_fields__.keys():
+        for fieldname, _from_json, _allow_none, _validate in _json_fields(
+                self.__class__):
             val = getattr(self, fieldname)
-            try:  # convert to json
-                val = val.py_json(sparse=sparse)
-            except AttributeError:
-                pass
+
+            if type(val) not in _PLAIN_JSON_TYPES:
+                try:  # convert to json
+                    val = val.py_json(sparse=sparse)
+                except AttributeError:
+                    pass
 
             if not sparse:
                 json_obj[fieldname] = val
@@ -100,11 +183,10 @@ def dataclass_to_json(cls):
         else:
             messages = []
 
-        for fieldname, fieldobj in self.__dataclass_fields__.items():
-            value = getattr(self, fieldname)
-            if (hasattr(fieldobj, 'type') and
-                    hasattr(fieldobj.type, 'validate')):
-                messages.extend(fieldobj.type.validate(value))
+        for fieldname, _from_json, _allow_none, validate in _json_fields(
+                self.__class__):
+            if validate is not None:
+                messages.extend(validate(getattr(self, fieldname)))
 
         return sorted(set(messages))
 
@@ -116,7 +198,8 @@ def dataclass_to_json(cls):
                                  f"{self.__class__.__name__}.{name} "
                                  "does not exist")
 
-        self.__dict__[name] = val
+        # not self.__dict__, as there may not be one (see add_slots())
+        object.__setattr__(self, name, val)
 
     def __repr__(self):
         atts = ((att, getattr(self, att))
@@ -136,6 +219,9 @@ def dataclass_to_json(cls):
     cls.__setattr__ = __setattr__
     cls.__repr__ = __repr__
 
+    # resolve the fields now, while we're at it
+    _json_fields(cls)
+
     return cls
 
 
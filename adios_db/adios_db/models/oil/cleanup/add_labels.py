@@ -11,7 +11,7 @@ The criteria follows the ASTM (and others) standards, where we can find them.
 from math import inf
 
 from ..product_type import types_to_labels
-from ....computation.physical_properties import KinematicViscosity
+from ....computation.derived_properties import derived_properties
 
 # # Here are all the Product Types:
 # ('Crude Oil NOS',
@@ -278,7 +278,7 @@ def is_label(oil, label):
     if is_label and ((data['kvis_min'] != -inf) or
                      (data['kvis_max'] != inf)):  # check viscosity limits
         try:
-            KV = KinematicViscosity(oil)
+            KV = derived_properties(oil).kinematic_viscosity
             kvis = KV.at_temp(temp=data['kvis_temp'], kvis_units='cSt',
                               temp_units='C')
             is_label = True if data['kvis_min'] <= kvis < data['kvis_max'] else False
@@ -39,6 +39,7 @@ One Weathered oil:
 import logging
 
 from adios_db.computation.utilities import get_evaporated_subsample
+from adios_db.computation.derived_properties import derived_properties
 
 logger = logging.getLogger(__name__)
 
@@ -122,14 +123,10 @@ class Check_second_density:
         measurement in the set.
         """
         if len(oil.sub_samples) > 0:
-            ss = oil.sub_samples[0]
-            densities = ss.physical_properties.densities
-            temps = [d.ref_temp.converted_to('C').value
-                     for d in densities
-                     if d.ref_temp is not None]
+            temps = derived_properties(oil).density_ref_temps
 
             if len(temps) >= 2:
-                t1, *_, t2 = sorted([t for t in temps if t is not None])
+                t1, *_, t2 = sorted(temps)
                 delta_t = t2 - t1
 
                 if delta_t > 0.0:
@@ -165,17 +162,7 @@ class CheckViscosity:
         score = 0.0
 
         if len(oil.sub_samples) > 0:
-            ss = oil.sub_samples[0]
-            kvis = ss.physical_properties.kinematic_viscosities
-            dvis = ss.physical_properties.dynamic_viscosities
-            temps = []
-
-            for v_i in (kvis, dvis):
-                temps.extend([v.ref_temp.converted_to('C').value
-                              for v in v_i
-                              if v.ref_temp is not None])
-
-            temps = [t for t in temps if t is not None]
+            temps = derived_properties(oil).viscosity_ref_temps
 
             if len(temps) == 1:  # only one measurement
                 score += 1.0
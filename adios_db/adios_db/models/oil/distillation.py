@@ -5,7 +5,8 @@ from dataclasses import dataclass, field
 
 from ..common.utilities import dataclass_to_json, JSON_List
 from ..common.measurement import (Temperature,
-                                  MassOrVolumeFraction)
+                                  MassOrVolumeFraction,
+                                  measurements_to_array)
 
 from ..common.validators import EnumValidator
 from .validation.warnings import WARNINGS
@@ -49,6 +50,24 @@ class DistCutList(JSON_List):
 
         return dcl
 
+    def to_arrays(self, units="fraction", temp_units="K", strict=False):
+        """
+        The fractions and the vapor temperatures of the cuts, as numpy
+        arrays, converted all at once.
+
+        :param units="fraction": units you want the fractions in
+        :param temp_units="K": units you want the temperatures in
+        :param strict=False: If True, the values that can't be converted
+                             raise, (see measurements_to_array())
+
+        :returns: (fractions, temps) arrays, with NaN for the ones that are
+                  missing, or can't be converted.
+        """
+        return (measurements_to_array([c.fraction for c in self], units,
+                                      strict=strict),
+                measurements_to_array([c.vapor_temp for c in self],
+                                      temp_units, strict=strict))
+
 
 @dataclass_to_json
 @dataclass
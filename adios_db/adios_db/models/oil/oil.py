@@ -5,7 +5,6 @@ This maps to the JSON used in the DB
 
 Having a Python class makes it easier to write importing, validating etc, code.
 """
-import copy
 import json
 
 from dataclasses import dataclass, field
@@ -15,10 +14,10 @@ import nucos as uc
 from ..common.utilities import dataclass_to_json
 
 from ...computation.gnome_oil import make_gnome_oil
-from ...computation import physical_properties
+from ...computation.derived_properties import derived_properties, FITS_FIELD
 
 from .metadata import MetaData
-from .sample import SampleList
+from .sample import SampleList, lazy_samples
 from .version import Version
 from .review_status import ReviewStatus
 
@@ -62,6 +61,17 @@ class Oil:
         # arbitrary limit to catch ridiculous ones (UUIDs are 36 chars)
         self._validate_id(self.oil_id)
 
+    @property
+    def derived(self):
+        """
+        The properties derived from the data: the fitted density and
+        viscosity curves, etc.  They are computed when first needed, and
+        kept until the data they depend on changes.
+
+        (see computation.derived_properties)
+        """
+        return derived_properties(self)
+
     def __str__(self):
         """
         need a custom str here, so we don't get a huge dump of the entire tree
@@ -78,13 +88,36 @@ class Oil:
 
         return py_json
 
+    @staticmethod
+    def _post_from_py_json(oil, py_json):
+        # the fits stored with the record in the database
+        fits = py_json.get(FITS_FIELD)
+
+        if fits:
+            oil.derived.load_fits(fits)
+
     @classmethod
-    def from_file(cls, infile):
+    def from_py_json_lazy(cls, py_json):
+        """
+        Like from_py_json(), but the sub-samples are only made into Sample
+        objects when they are used (see sample.lazy_samples()).
+
+        Handy for scripts that go through the whole catalog, but only look
+        at the metadata.
+        """
+        with lazy_samples():
+            return cls.from_py_json(py_json)
+
+    @classmethod
+    def from_file(cls, infile, lazy=False):
         """
         load an Oil object from the passed in JSON file
 
         it can be either a path or an open file object
 
+        :param lazy=False: If True, the sub-samples are loaded lazily
+                           (see from_py_json_lazy())
+
         NOTE: this could be in the decorator -- but we only really need it
               for a full record.
         """
@@ -95,7 +128,10 @@ class Oil:
 
         # py_json = update_json(py_json)
 
-        return cls.from_py_json(py_json)
+        if lazy:
+            return cls.from_py_json_lazy(py_json)
+        else:
+            return cls.from_py_json(py_json)
 
     @staticmethod
     def _validate_id(id):
@@ -119,9 +155,8 @@ class Oil:
             # See if it can be used as a GNOME oil
             # NOTE: This is an odd one, as it puts the information in a
             #       different place
-            # NOTE: Make a copy, as make_gnome_oil might change it in place.
             # NOTE: If it barfs for any reason it's not suitable
-            make_gnome_oil(copy.deepcopy(self))
+            make_gnome_oil(self)
             self.metadata.gnome_suitable = True
         except Exception as ex:
             print(ex)
@@ -136,8 +171,7 @@ class Oil:
         API = self.metadata.API
         if API is not None:
             try:
-                density_at_60F = (physical_properties
-                                  .Density(self).at_temp(60, 'F'))
+                density_at_60F = self.derived.density.at_temp(60, 'F')
 
                 calculatedAPI = uc.convert('kg/m^3', 'API', density_at_60F)
 
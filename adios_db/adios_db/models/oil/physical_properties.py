@@ -17,7 +17,8 @@ from ..common.measurement import (Temperature,
                                   KinematicViscosity,
                                   SayboltViscosity,
                                   AngularVelocity,
-                                  InterfacialTension)
+                                  InterfacialTension,
+                                  measurements_to_array)
 
 
 class RefTempList:
@@ -25,6 +26,38 @@ class RefTempList:
     mixin for all classes that are a list of points with
     reference temperatures
     """
+    @classmethod
+    def data_name(cls):
+        """
+        The name of the attribute of the points with the data,
+        e.g. "density"
+        """
+        for name in ("density", "viscosity", "tension"):
+            if hasattr(cls.item_type, name):
+                return name
+
+        return None
+
+    def to_arrays(self, units, temp_units="K", strict=False):
+        """
+        The values and the reference temperatures of the points, as numpy
+        arrays, converted all at once.
+
+        :param units: units you want the values in
+        :param temp_units="K": units you want the temperatures in
+        :param strict=False: If True, the values that can't be converted
+                             raise, (see measurements_to_array())
+
+        :returns: (values, temps) arrays, with NaN for the ones that are
+                  missing, or can't be converted.
+        """
+        data_name = self.data_name()
+
+        return (measurements_to_array([getattr(p, data_name) for p in self],
+                                      units, strict=strict),
+                measurements_to_array([p.ref_temp for p in self],
+                                      temp_units, strict=strict))
+
     def validate(self):
         """
         validator for anything that has a list of reference temps
@@ -5,6 +5,9 @@ This maps to the JSON used in the DB
 
 Having a Python class makes it easier to write importing, validating etc, code.
 """
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 
 from ..common.utilities import dataclass_to_json, JSON_List
@@ -27,6 +30,33 @@ from .bulk_composition import BulkCompositionList
 from .validation.warnings import WARNINGS
 from .validation.errors import ERRORS
 
+# if set, SampleList.from_py_json() leaves the samples as py_json
+# (see lazy_samples())
+_lazy_samples = ContextVar('lazy_samples', default=False)
+
+
+@contextmanager
+def lazy_samples(lazy=True):
+    """
+    Context manager for loading the sub-samples of records lazily.
+
+    Inside it, SampleList.from_py_json() keeps the samples as the py_json
+    they came in as, and each one is only made into a Sample when it is
+    first used.  Samples that are never used are written back out by
+    py_json() just as they came in.
+
+    Use as such::
+
+        with lazy_samples():
+            oil = Oil.from_py_json(py_json)
+    """
+    token = _lazy_samples.set(lazy)
+
+    try:
+        yield
+    finally:
+        _lazy_samples.reset(token)
+
 
 @dataclass_to_json
 @dataclass
@@ -92,8 +122,105 @@ class Sample:
 
 
 class SampleList(JSON_List):
+    """
+    The list of sub-samples of a record
+
+    It can hold samples that haven't been made into Sample objects yet
+    (see lazy_samples()).  They are stored as py_json, and made into
+    Samples when they are accessed.
+    """
     item_type = Sample
 
+    @classmethod
+    def from_py_json(cls, py_json, allow_none=False):
+        if _lazy_samples.get():
+            return cls(py_json)
+        else:
+            return super().from_py_json(py_json, allow_none=allow_none)
+
+    def py_json(self, sparse=True):
+        if not sparse:
+            # the untouched samples need filling in
+            self.materialize()
+
+        return [item if isinstance(item, dict) else item.py_json(sparse)
+                for item in list.__iter__(self)]
+
+    def _materialize(self, index):
+        item = list.__getitem__(self, index)
+
+        if isinstance(item, dict):
+            item = self.item_type.from_py_json(item)
+            list.__setitem__(self, index, item)
+
+        return item
+
+    def materialize(self):
+        """
+        Make all the samples that are still py_json into Sample objects
+        """
+        for i in range(len(self)):
+            self._materialize(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i)
+                    for i in range(*index.indices(len(self)))]
+        else:
+            return self._materialize(index)
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self._materialize(i)
+            i += 1
+
+    def __reversed__(self):
+        for i in reversed(range(len(self))):
+            yield self._materialize(i)
+
+    def __deepcopy__(self, memo):
+        # no need to make the untouched samples to copy them
+        return self.__class__(copy.deepcopy(item, memo)
+                              for item in list.__iter__(self))
+
+    # these need the Sample objects to compare to
+    def __eq__(self, other):
+        self.materialize()
+        if isinstance(other, SampleList):
+            other.materialize()
+
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __contains__(self, item):
+        self.materialize()
+        return super().__contains__(item)
+
+    def index(self, *args):
+        self.materialize()
+        return super().index(*args)
+
+    def count(self, item):
+        self.materialize()
+        return super().count(item)
+
+    def remove(self, item):
+        self.materialize()
+        return super().remove(item)
+
+    def pop(self, index=-1):
+        self._materialize(index)
+        return super().pop(index)
+
+    def __repr__(self):
+        self.materialize()
+        return super().__repr__()
+
     def validate(self):
         msgs = []
 
@@ -29,6 +29,7 @@ ERRORS = {
     "E061": "Boiling points in distillation cuts are not strictly increasing",
 
     # E09* -- system errors
+    "E097": "Exception Raised while loading the record: {}",
     "E098": "Exception Raised while computing completeness",
     "E099": "Exception Raised while validating"
 }
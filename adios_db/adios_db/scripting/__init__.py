@@ -22,7 +22,7 @@ TEST_DATA_DIR = (Path(__file__)
                  .parent / "test" / "data_for_testing" / "noaa-oil-data")
 
 
-def get_all_records(data_dir):
+def get_all_records(data_dir, lazy=False):
     """
     gets all the records from the JSON data stored in gitLab
 
@@ -30,6 +30,8 @@ def get_all_records(data_dir):
     as record, path pairs
 
     :param data_dir: the directory that holds the data
+    :param lazy=False: If True, the sub-samples of the records are loaded
+                       lazily -- faster if you only need the metadata.
 
     The record returned is an Oil object
 
@@ -45,7 +47,10 @@ def get_all_records(data_dir):
                 print("Something went wrong loading:", fname)
                 raise
 
-        rec = Oil.from_py_json(pyjson)
+        if lazy:
+            rec = Oil.from_py_json_lazy(pyjson)
+        else:
+            rec = Oil.from_py_json(pyjson)
 
         yield rec, fname
 
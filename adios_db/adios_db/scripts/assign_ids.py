@@ -54,7 +54,7 @@ def main():
 
     # Find the max ID in use:
     max_id = 0
-    for oil, pth in get_all_records(base_dir):
+    for oil, pth in get_all_records(base_dir, lazy=True):
         id = oil.oil_id
         if id.startswith(prefix):
             max_id = max(max_id, int(id[len(prefix):]))
@@ -15,6 +15,9 @@ from adios_db.models.oil.oil import Oil
 
 logger = logging.getLogger(__name__)
 
+# collections that are rebuilt from the data, and don't need backing up
+derived_collections = ('counters',)
+
 argp = ArgumentParser(description='Database Backup Arguments:')
 
 argp.add_argument('--config', nargs=1,
@@ -77,6 +80,9 @@ def backup_db(settings, base_path):
     cleanup_folder(base_path)
 
     for collection_name in collections:
+        if collection_name in derived_collections:
+            continue
+
         add_folder(base_path, collection_name)
 
         collection = getattr(db, collection_name)
@@ -0,0 +1,58 @@
+"""
+Build the SQLite file of a read-only catalog, for the stand alone builds
+
+(see adios_db.session.sqlite_session)
+"""
+import sys
+import logging
+from argparse import ArgumentParser
+
+from adios_db.session.memory_session import folder_records
+from adios_db.session.sqlite_session import SQLiteSession
+
+
+logger = logging.getLogger(__name__)
+
+argp = ArgumentParser(description='Build SQLite Catalog Arguments:')
+
+argp.add_argument('--path', nargs=1,
+                  help=('Specify the path to the noaa-oil-data JSON records. '
+                        'If not specified, the default is to use "./data"'))
+
+argp.add_argument('--output', nargs=1,
+                  help=('Specify the SQLite file to write. '
+                        'If not specified, the default is '
+                        '"./oil_database.sqlite"'))
+
+
+def build_sqlite_cmd(argv=sys.argv):
+    logging.basicConfig(level=logging.INFO)
+
+    args = argp.parse_args(argv[1:])
+
+    base_path = args.path[0] if args.path is not None else './data'
+    db_path = (args.output[0] if args.output is not None
+               else './oil_database.sqlite')
+
+    try:
+        build_sqlite(base_path, db_path)
+    except Exception:
+        print('{0}() FAILED\n'.format(build_sqlite.__name__))
+        raise
+
+
+def build_sqlite(base_path, db_path):
+    """
+    Read the oil records from the JSON tree, validating them the same
+    way db_restore does, and write them to the SQLite file.
+
+    :returns: the number of records written
+    """
+    logger.info(f'building {db_path} from {base_path}')
+
+    session = SQLiteSession.create(db_path, folder_records(base_path))
+    count = len(session)
+
+    print(f'\n{count} records written to {db_path}\n')
+
+    return count
@@ -7,8 +7,6 @@ import traceback
 from datetime import datetime
 from argparse import ArgumentParser
 
-from pymongo.errors import DuplicateKeyError
-
 from adios_db.util.term import TermColor as tc
 from adios_db.util.db_connection import connect_mongodb
 from adios_db.util.folder_collection import FolderCollection
@@ -32,6 +30,7 @@ from adios_db.data_sources.exxon_assays import (ExxonDataReader,
 
 from adios_db.models.oil.validation.validate import validate_json
 from adios_db.models.oil.completeness import set_completeness
+from adios_db.session.session import BULK_SUCCESS, BULK_DUPLICATE
 
 logger = logging.getLogger(__name__)
 
@@ -62,8 +61,7 @@ def add_all(settings):
             print('\tPerforming import on dataset: {}'.format(label))
 
             import_records(settings[config],
-                           record_cls, reader_cls, parser_cls, mapper_cls,
-                           overwrite=settings['overwrite'])
+                           record_cls, reader_cls, parser_cls, mapper_cls)
 
 
 menu_items = (['NOAA Filemaker', 'oildb.fm_files',
@@ -100,8 +98,6 @@ argp = ArgumentParser(description='Database Import Arguments:')
 argp.add_argument('--all', action='store_true',
                   help=('Import all datasets, bypassing the menus, and quit '
                         'the application when finished.'))
-argp.add_argument('--overwrite', action='store_true',
-                  help=('Overwrite any duplicate records'))
 argp.add_argument('--config', nargs=1,
                   help=('Specify a *.ini file to supply application settings. '
                         'If not specified, the default is to use a local '
@@ -155,7 +151,6 @@ def get_settings(argv):
 
     _add_datafiles(settings)
 
-    settings['overwrite'] = args.overwrite
     settings['all'] = args.all
 
     return settings
@@ -202,8 +197,7 @@ def import_db(settings):
 
                 begin = datetime.now()
                 import_records(settings[config], oil_collection,
-                               reader_cls, parser_cls, mapper_cls,
-                               overwrite=settings['overwrite'])
+                               reader_cls, parser_cls, mapper_cls)
                 end = datetime.now()
 
                 print('time elapsed: {}'.format(end - begin))
@@ -220,7 +214,8 @@ def init_menu_item_collections(client, settings):
         # our collection will be a filesystem folder
         oil_collection = FolderCollection(settings['path'])
     else:
-        oil_collection = getattr(client, settings['mongodb.database']).oil
+        # the Session does the (bulk) writing to the oil collection
+        oil_collection = client
 
     [i.__setitem__(2, oil_collection)
      for i in menu_items
@@ -253,20 +248,21 @@ def get_chosen_menu_item(choice):
 
 
 def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
-                   overwrite=False):
+                   batch_size=500):
     """
     Add the records from a data source.
     the config value should be a file list.
 
     This is meant to be a generic way of reading the source, parsing the
-    records, and then mapping them to our Oil object.
+    records, and then mapping them to our Oil object.  A record always
+    replaces any existing record with the same oil_id.
 
     :param config: A string representing a list of files separated by
                    newline characters.  These are understood as a list
                    of files containing the data to import.
     :type config: string or unicode
 
-    :param oil_collection: A database oil collection (table)
+    :param oil_collection: A database Session, or a FolderCollection
 
     :param reader_cls: A file reader class capable of iterating the records
                        in a data file of a specified type.
@@ -277,6 +273,9 @@ def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
     :param mapper_cls: A class that can map the data in a particular
                        parser class or storage class into Oil record
                        attributes.
+
+    :param batch_size=500: The number of records written to the database
+                           in a single bulk write.
     """
     for fn in config.split('\n'):
         logger.info('opening file: {0} ...'.format(fn))
@@ -285,6 +284,8 @@ def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
         total_count = 0
         success_count = 0
         error_count = 0
+        batch = []
+
         for record_data in fd.get_records():
             total_count += 1
 
@@ -295,22 +296,7 @@ def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
                 oil = validate_json(oil_pyjson)
                 set_completeness(oil)
 
-                insert_oil(oil_collection, oil.py_json())
-            except DuplicateKeyError as e:
-                if overwrite is True:
-                    try:
-                        oil_collection.replace_one({'_id': oil_mapper.oil_id},
-                                                   oil.py_json())
-                    except Exception as e:
-                        print('Oil update failed for {}: {}'
-                              .format(tc.change(oil_mapper.oil_id, 'red'), e))
-                        error_count += 1
-                    else:
-                        success_count += 1
-                else:
-                    print('Duplicate fields for {}: {}'
-                          .format(tc.change(oil_mapper.oil_id, 'red'), e))
-                    error_count += 1
+                batch.append(oil)
             except (ValueError, TypeError) as e:
                 print('{} for {}: {}'
                       .format(e.__class__.__name__,
@@ -327,12 +313,21 @@ def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
                         print([_trace_item(*i) for i in tb])
 
                 error_count += 1
-            else:
-                success_count += 1
+
+            if len(batch) >= batch_size:
+                succeeded, failed = write_oils(oil_collection, batch)
+                success_count += succeeded
+                error_count += failed
+                batch = []
 
             if total_count % 100 == 0:
                 sys.stderr.write('.')
 
+        if batch:
+            succeeded, failed = write_oils(oil_collection, batch)
+            success_count += succeeded
+            error_count += failed
+
         print('finished!!!  '
               '{} records processed, '
               '{} records succeeded, '
@@ -342,6 +337,45 @@ def import_records(config, oil_collection, reader_cls, parser_cls, mapper_cls,
                       tc.change(error_count, 'bold')))
 
 
+def write_oils(oil_collection, oils):
+    """
+    Write a batch of oil objects to our collection, replacing any existing
+    records with the same oil_id.
+
+    If the collection is a database Session, the batch is written in a
+    single bulk write.  A FolderCollection is written a record at a time.
+
+    :returns: (success_count, error_count)
+    """
+    if isinstance(oil_collection, FolderCollection):
+        for oil in oils:
+            insert_oil(oil_collection, oil.py_json())
+
+        return len(oils), 0
+
+    results = oil_collection.upsert_many(oils, batch_size=len(oils))
+
+    success_count = 0
+    error_count = 0
+
+    for res in results:
+        if res['status'] == BULK_SUCCESS:
+            success_count += 1
+        else:
+            if res['status'] == BULK_DUPLICATE:
+                print('Duplicate fields for {}: {}'
+                      .format(tc.change(res['oil_id'], 'red'),
+                              res['message']))
+            else:
+                print('Oil update failed for {}: {}'
+                      .format(tc.change(res['oil_id'], 'red'),
+                              res['message']))
+
+            error_count += 1
+
+    return success_count, error_count
+
+
 def insert_oil(collection, py_json):
     collection.find_one_and_replace({'oil_id': py_json['oil_id']}, py_json,
                                     upsert=True,)
@@ -7,7 +7,8 @@ from argparse import ArgumentParser
 from adios_db.util.db_connection import connect_mongodb
 from adios_db.util.settings import file_settings, default_settings
 from adios_db.db_init.labels import load_labels, print_all_labels
-from adios_db.db_init.database import drop_db, create_indices
+from adios_db.db_init.database import (drop_db, create_indices,
+                                       verify_indices, rebuild_indices)
 
 from pprint import PrettyPrinter
 pp = PrettyPrinter(indent=2, width=120)
@@ -23,6 +24,16 @@ argp.add_argument('--config', nargs=1,
                   help=('Specify a *.ini file to supply application settings. '
                         'If not specified, the default is to use a local '
                         'MongoDB server.'))
+argp.add_argument('--indices', choices=('verify', 'rebuild'),
+                  help=('Verify, or rebuild, the indexes of an existing '
+                        'database, leaving the data alone.'))
+argp.add_argument('--update',
+                  choices=('search_tokens', 'versions', 'derived_fields',
+                           'all'),
+                  help=('Recompute the fields stored with the records of '
+                        'an existing database: the text search tokens, the '
+                        'version stamps, or the fits, property grid and '
+                        'similarity features, leaving the data alone.'))
 
 
 def init_db_cmd(argv=sys.argv):
@@ -40,6 +51,14 @@ def init_db_cmd(argv=sys.argv):
         print('Using default settings')
         settings = default_settings()
 
+    if args.indices is not None:
+        manage_indices(settings, args.indices)
+        return
+
+    if args.update is not None:
+        update_records(settings, args.update)
+        return
+
     try:
         init_db(settings)
     except Exception:
@@ -89,6 +108,56 @@ def init_db(settings, show_prompt=True):
     print('\nDatabase initialization done!\n')
 
 
+def manage_indices(settings, action='verify'):
+    """
+    Verify or rebuild the indexes of an existing database
+
+    :param action='verify': one of 'verify' or 'rebuild'
+    """
+    client = connect_mongodb(settings)
+    db = client.get_database(settings['mongodb.database'])
+
+    if action == 'rebuild':
+        rebuild_indices(db)
+
+    bad_indexes = verify_indices(db)
+
+    if bad_indexes:
+        print('Missing or invalid indexes: {}'.format(bad_indexes))
+    else:
+        print('All indexes are present and valid.')
+
+    return bad_indexes
+
+
+def update_records(settings, fields='all'):
+    """
+    Recompute the fields the Session stores with the records of an
+    existing database, e.g. for records that were put in the database
+    before the Session stored them.
+
+    :param fields='all': one of 'search_tokens', 'versions',
+                         'derived_fields' or 'all'
+
+    :returns: the number of records updated
+    """
+    session = connect_mongodb(settings)
+
+    updates = (('search_tokens', session.update_search_tokens),
+               ('versions', session.update_versions),
+               ('derived_fields', session.update_derived_fields))
+
+    count = 0
+    for name, update in updates:
+        if fields in (name, 'all'):
+            print('Updating the {} ...'.format(name.replace('_', ' ')))
+            count = update()
+
+    print('{} records updated.'.format(count))
+
+    return count
+
+
 def prompt_drop_db():
     resp = input('This action will permanently delete all data in the '
                  'existing database!\n'
@@ -9,6 +9,7 @@ from adios_db.util.db_connection import connect_mongodb
 from adios_db.util.settings import file_settings, default_settings
 from adios_db.db_init.database import drop_db, create_indices
 from adios_db.models.oil.oil import Oil
+from adios_db.session.session import BULK_SUCCESS
 
 
 logger = logging.getLogger(__name__)
@@ -88,29 +89,61 @@ def restore_db(settings, base_path):
     for collection_name in os.listdir(base_path):
         # filter out dotfiles
         if not collection_name.startswith("."):
-            load_collection(db, base_path, collection_name)
+            load_collection(db, base_path, collection_name,
+                            session=client)
 
     print('\nDatabase restore done!\n')
 
 
-def load_collection(db, base_path, collection_name):
+def load_collection(db, base_path, collection_name, session=None,
+                    batch_size=500):
+    """
+    Load the objects in a collection folder into the database.
+
+    The objects are written in batches.  If a Session is passed in, it is
+    used for the oil collection, so the records get everything the Session
+    adds to them.
+    """
     collection = getattr(db, collection_name)
     collection_path = os.path.join(base_path, collection_name)
 
+    batch = []
+
     for (dirname, _, filenames) in os.walk(collection_path):
         for name in filenames:
             if name.endswith('.json'):
-                obj = get_obj_json(f'{dirname}/{name}', collection_name)
+                batch.append(get_obj(f'{dirname}/{name}', collection_name))
+
+                if len(batch) >= batch_size:
+                    insert_objs(collection, batch, session)
+                    batch = []
+
+    if batch:
+        insert_objs(collection, batch, session)
 
-                collection.insert_one(obj)
 
+def insert_objs(collection, objs, session=None):
+    if session is not None and collection.name == 'oil':
+        results = session.insert_many(objs, batch_size=len(objs))
 
-def get_obj_json(obj_path, collection_name):
+        for res in results:
+            if res['status'] != BULK_SUCCESS:
+                print(f'Restore of {res["oil_id"]} failed: {res["message"]}')
+    else:
+        collection.insert_many([o.py_json() if isinstance(o, Oil) else o
+                                for o in objs],
+                               ordered=False)
+
+
+def get_obj(obj_path, collection_name):
+    """
+    Load an object from its file.  An oil is loaded into an Oil object,
+    so the Session doesn't need to parse it again.
+    """
     obj = json.load(open(obj_path, 'r', encoding='utf-8'))
 
     if collection_name == 'oil':
-        oil = Oil.from_py_json(obj)
-        oil.reset_validation()
-        obj = oil.py_json()
+        obj = Oil.from_py_json(obj)
+        obj.reset_validation()
 
     return obj
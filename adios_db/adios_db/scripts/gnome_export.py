@@ -0,0 +1,118 @@
+"""
+Make the GNOME oils of all the records, and write them to a JSON Lines
+file, or a numpy .npz file
+
+The records are read either from a noaa-oil-data style JSON tree, or
+from the database.  (see adios_db.computation.gnome_oil_batch)
+"""
+import sys
+import logging
+from argparse import ArgumentParser
+
+from adios_db.util.db_connection import connect_mongodb
+from adios_db.util.settings import file_settings, default_settings
+from adios_db.session.memory_session import folder_records
+from adios_db.computation.gnome_oil_batch import (make_gnome_oils,
+                                                  is_load_error,
+                                                  write_jsonl,
+                                                  write_npz)
+
+
+logger = logging.getLogger(__name__)
+
+argp = ArgumentParser(description='GNOME Oil Export Arguments:')
+
+argp.add_argument('--path', nargs=1,
+                  help=('Specify the path to the noaa-oil-data JSON records. '
+                        'If not specified, the records are read from the '
+                        'database.'))
+
+argp.add_argument('--config', nargs=1,
+                  help=('Specify a *.ini file to supply application settings. '
+                        'If not specified, the default is to use a local '
+                        'MongoDB server.'))
+
+argp.add_argument('--output', nargs=1,
+                  help=('Specify the file to write: a numpy .npz file if '
+                        'it ends with ".npz", otherwise JSON Lines. '
+                        'If not specified, the default is '
+                        '"./gnome_oils.jsonl"'))
+
+argp.add_argument('--processes', nargs=1, type=int,
+                  help=('The number of worker processes. '
+                        'If not specified, the number of CPUs is used.'))
+
+argp.add_argument('--chunksize', nargs=1, type=int,
+                  help=('The number of records sent to a worker at once. '
+                        'The default is 16.'))
+
+
+def gnome_export_cmd(argv=sys.argv):
+    logging.basicConfig(level=logging.INFO)
+
+    args = argp.parse_args(argv[1:])
+
+    out_path = (args.output[0] if args.output is not None
+                else './gnome_oils.jsonl')
+    processes = args.processes[0] if args.processes is not None else None
+    chunksize = args.chunksize[0] if args.chunksize is not None else 16
+
+    if args.path is not None:
+        records = folder_records(args.path[0], validate=False)
+    else:
+        if args.config is not None:
+            settings = file_settings(args.config)
+        else:
+            print('Using default settings')
+            settings = default_settings()
+
+        # with the stored fits, so the curves don't need fitting again
+        records, _total = connect_mongodb(settings).query(
+            derived_fields=True
+        )
+
+    try:
+        gnome_export(records, out_path,
+                     processes=processes, chunksize=chunksize)
+    except Exception:
+        print('{0}() FAILED\n'.format(gnome_export.__name__))
+        raise
+
+
+def gnome_export(records, out_path, processes=None, chunksize=16):
+    """
+    Make the GNOME oils of the records, and write them to a JSON Lines,
+    or .npz, file, with the records that aren't suitable for GNOME, and
+    why.
+
+    :returns: the number of GNOME oils written, and the number of errors,
+              (both the records that aren't suitable for GNOME, and the
+              ones that couldn't be loaded)
+    """
+    logger.info(f'writing the GNOME oils to {out_path}')
+
+    if str(out_path).endswith('.npz'):
+        writer, arrays = write_npz, True
+    else:
+        writer, arrays = write_jsonl, False
+
+    load_errors = []
+
+    def results():
+        for oil_id, gnome_oil, error in make_gnome_oils(records,
+                                                        processes=processes,
+                                                        chunksize=chunksize,
+                                                        arrays=arrays):
+            if is_load_error(error):
+                logger.error(f'{oil_id}: {error}')
+                load_errors.append(oil_id)
+
+            yield oil_id, gnome_oil, error
+
+    num_oils, num_errors = writer(results(), out_path)
+
+    print(f'\n{num_oils} GNOME oils written to {out_path}, '
+          f'{num_errors - len(load_errors)} records not suitable for GNOME, '
+          f'{len(load_errors)} records could not be loaded\n')
+
+    return num_oils, num_errors
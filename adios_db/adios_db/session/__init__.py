@@ -1 +1,11 @@
-from .session import Session
+from .base import ReadOnlySessionError
+
+try:
+    from .session import Session
+except ModuleNotFoundError as err:
+    if err.name != 'pymongo':
+        raise
+
+    # pymongo isn't installed, so only the MemorySession and the
+    # SQLiteSession can be used, (e.g. in the stand alone builds)
+    Session = None
@@ -0,0 +1,256 @@
+"""
+The parts of the Session objects that don't need a database
+
+The MongoDB Session, and the read-only MemorySession and SQLiteSession,
+all derive from SessionBase, so they parse the query arguments, and find
+similar oils, the same way.
+
+Nothing here needs pymongo, so the sessions that don't use MongoDB can
+be used without it (e.g. in the stand alone builds).
+"""
+from numbers import Number
+import copy
+import json
+import hashlib
+
+from ..models.oil.oil import Oil
+from ..models.oil.product_type import types_to_labels
+from ..computation.derived_properties import (FITS_FIELD,
+                                              GRID_FIELD,
+                                              GRID_NAMES)
+from ..computation.similarity import FEATURES_FIELD, oil_features
+from .text_search import SEARCH_TOKENS_FIELD
+
+# the sort directions, the same as pymongo's
+ASCENDING = 1
+DESCENDING = -1
+
+
+class ReadOnlySessionError(PermissionError):
+    """
+    Raised by the writing methods of a read-only Session
+    """
+
+
+class CursorWrapper():
+    """
+    Wraps a mongodb cursor to provide an iterator that we can do some
+    filtering on, while not losing all its methods
+
+    At this point, all it's doing is removing the _id key
+
+    Seems like a lot of effort for that, but the alternative is to realize
+    the entire thing into a list -- which may be a bad idea.
+
+    Rant-- Why doesn't a mongo cursor have a __len__ rather than using
+    .count() to make it more like a regular Sequence?
+
+    oh, and now ``count()`` is deprecated as well.
+
+    If the length of the results is already known (e.g. a page of results
+    that has already been fetched), it can be passed in, and we won't need
+    to ask the server for it.  It can also be a function that returns it,
+    which is only called if the length is asked for.
+    """
+    def __init__(self, cursor, length=None, next_token=None):
+        self.cursor = cursor
+        self._iter = iter(cursor)
+        self._length = length
+        self.next_token = next_token
+
+    def __iter__(self):
+        # a cursor is already an iterator, but a page of results is a list
+        self._iter = iter(self.cursor)
+        return self
+
+    def __next__(self):
+        obj = next(self._iter)
+        obj.pop('_id', None)
+        return obj
+
+    def __len__(self):
+        if callable(self._length):
+            self._length = self._length()
+
+        if self._length is not None:
+            return self._length
+
+        try:
+            return self.cursor.explain()['executionStats']['nReturned']
+        except StopIteration:
+            # explain() does this when the cursor has zero items
+            return 0
+
+    def __getitem__(self, idx):
+        return self.cursor[idx]
+
+
+# a stamp of the content of a record, updated whenever it is written.
+VERSION_FIELD = '_version'
+
+# the fields computed from a record that are stored with it, (see
+# SessionBase._derived_fields()).  They are only returned when asked for.
+DERIVED_FIELDS = (FITS_FIELD, GRID_FIELD, FEATURES_FIELD)
+
+
+def record_version(oil_json):
+    """
+    Compute the version stamp of a record (py_json)
+
+    This is a hash of the content of the record, so an unchanged record
+    always gets the same stamp, no matter which process wrote it.
+    """
+    content = {k: v for k, v in oil_json.items()
+               if k not in ('_id', SEARCH_TOKENS_FIELD, VERSION_FIELD)
+               and k not in DERIVED_FIELDS}
+
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str)
+                        .encode('utf-8')).hexdigest()
+
+
+class SessionBase:
+    """
+    The parts of a Session that don't need the database.
+
+    A Session provides ``_similarity_index()``, of all its records, and
+    ``find_one()``, for ``similar()``.
+    """
+    sort_direction = {'asc': ASCENDING,
+                      'ascending': ASCENDING,
+                      'desc': DESCENDING,
+                      'descending': DESCENDING}
+
+    @staticmethod
+    def _derived_fields(oil_obj):
+        """
+        The fits of the density and viscosity curves of a record, its
+        property grid, and its similarity features, to be stored with it,
+        (see computation.derived_properties and computation.similarity)
+
+        If the Oil object was validated, the curves are already computed.
+        """
+        if isinstance(oil_obj, dict):
+            try:
+                # loading it may update the JSON in place
+                oil_obj = Oil.from_py_json(copy.deepcopy(oil_obj))
+            except Exception:
+                return {FITS_FIELD: {}, GRID_FIELD: {}, FEATURES_FIELD: {}}
+
+        return {FITS_FIELD: oil_obj.derived.fits(),
+                GRID_FIELD: oil_obj.derived.property_grid(),
+                FEATURES_FIELD: oil_features(oil_obj)}
+
+    def similar(self, oil_id, k=10):
+        """
+        Find the oils most like an oil, (see computation.similarity)
+
+        :param oil_id: The identifier of the record.
+        :param k=10: The number of oils to return.
+
+        :returns: a list of (oil_id, distance) pairs, nearest first, or
+                  None if there is no such record.
+        """
+        index = self._similarity_index()
+
+        if oil_id not in index:
+            # rebuilding the index is a lot of work, so only for a record
+            # that is newer than it
+            if not self._has_record(oil_id):
+                return None
+
+            index = self._similarity_index(rebuild=True)
+
+            if oil_id not in index:
+                return None
+
+        return index.similar(oil_id, int(k))
+
+    def _has_record(self, oil_id):
+        """
+        Check whether there is a record, (with or without a version stamp)
+        """
+        return self.find_one(oil_id) is not None
+
+    def _sort_options(self, sort):
+        if sort is None:
+            return sort
+        else:
+            return [(opt[0], self.sort_direction.get(opt[1], ASCENDING))
+                    for opt in sort]
+
+    def _parse_interval_arg(self, interval):
+        """
+        An interval argument can be a number, string, or list
+        - If it is a number, we will assume it is a minimum
+        - If it is a list length 1, we will assume it is a minimum
+        - If it is a list greater than 2, we will only use the first 2
+          elements as a min/max
+        - If it is a string, we will try to parse it as a set of comma
+          separated values.
+        """
+        if interval is None:
+            low, high = None, None
+        elif isinstance(interval, Number):
+            low, high = interval, None
+        elif isinstance(interval, str):
+            try:
+                interval = [float(i) for i in interval.split(',')]
+            except Exception:
+                # something non-numeric was passed in
+                interval = [None, None]
+
+            low = interval[0]
+            high = None if len(interval) < 2 else interval[1]
+        else:
+            # assume it is a list
+            low = None if len(interval) < 1 else interval[0]
+            high = None if len(interval) < 2 else interval[1]
+
+        if low is not None and high is not None:
+            if low > high:
+                low, high = high, low
+
+        return low, high
+
+    def _parse_properties_arg(self, properties):
+        """
+        The (name, interval) pairs of a properties argument, which is a
+        dict of intervals, keyed by the names of the property grid.
+
+        :raises ValueError: if a name is not one of the property grid.
+        """
+        if properties is None:
+            return []
+
+        for name in properties:
+            if name not in GRID_NAMES:
+                raise ValueError(f'No property named {name!r}.  The '
+                                 f'properties are: {", ".join(GRID_NAMES)}')
+
+        return list(properties.items())
+
+    def get_labels(self, identifier=None):
+        """
+        Right now we are getting labels and associated product types
+        from the adios_db model code.  But it would be better managed
+        if we eventually migrate this to labels stored in a database
+        collection.
+        """
+        labels = types_to_labels.all_labels_dict
+
+        if identifier is None:
+            return labels
+        else:
+            msg = 'label identifiers are integer >= 0 only'
+            try:
+                identifier = int(identifier)
+            except ValueError as e:
+                raise ValueError(msg) from e
+            if identifier < 0:
+                raise ValueError(msg)
+
+            # Get a single label
+            for label in labels:
+                if label['_id'] == identifier:
+                    return label
+            return None
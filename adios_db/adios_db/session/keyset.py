@@ -0,0 +1,179 @@
+"""
+Support for keyset (a.k.a. cursor) paging of the query results
+
+Paging with skip/limit means the server has to walk past all the records
+before the requested page.  With keyset paging, the client instead passes
+back an opaque token holding the sort key values of the last record it
+got, and the next page is simply the records that sort after it.
+
+To make the order of the records unambiguous, the oil_id is always used
+as the final sort key.
+
+Records without a value for a sort field (missing or None) sort before
+all other values in MongoDB, so they need a bit of special handling.
+
+The array fields can't be keyset paged: MongoDB sorts an array by its
+lowest (or highest) element, which a $gt/$lt on the field doesn't match.
+The results sorted by them are only paged with skip/limit.
+"""
+import base64
+import json
+
+from .base import ASCENDING, DESCENDING
+
+
+ARRAY_FIELDS = ('metadata.labels', 'status')
+
+
+def is_keyset_sort(sort):
+    """
+    Whether the records in this sort order can be keyset paged
+    """
+    return not any(field in ARRAY_FIELDS for field, _direction in sort)
+
+
+def keyset_sort(sort):
+    """
+    Make a sort specification that gives the records a total order.
+
+    :param sort: list of (field, direction) pairs, or None
+    """
+    if sort is None:
+        return [('oil_id', ASCENDING)]
+
+    sort = list(sort)
+
+    if 'oil_id' not in [field for field, _direction in sort]:
+        sort.append(('oil_id', sort[-1][1] if sort else ASCENDING))
+
+    return sort
+
+
+def get_field(record, field):
+    """
+    get the value of a (dotted notation) field of a record
+    """
+    value = record
+
+    for name in field.split('.'):
+        try:
+            value = value[name]
+        except (KeyError, TypeError):
+            return None
+
+    return value
+
+
+def encode_token(sort, record, total=None):
+    """
+    Make a continuation token for the records that come after this one
+
+    :param total: The total number of matching records, if it is to be
+                  passed along to the following pages, so they don't need
+                  to count them again.
+
+    :returns: the token, or None if the sort can't be keyset paged.
+    """
+    if not is_keyset_sort(sort):
+        return None
+
+    token = {'sort': [[field, direction] for field, direction in sort],
+             'values': [get_field(record, field) for field, _ in sort]}
+
+    if total is not None:
+        token['total'] = int(total)
+
+    return (base64.urlsafe_b64encode(json.dumps(token).encode('utf-8'))
+            .decode('ascii'))
+
+
+def decode_token(token, sort):
+    """
+    Get the sort key values out of a continuation token
+
+    :raises ValueError: if the token is not valid, it was made for a
+                        different sort, or the sort can't be keyset paged.
+    """
+    if not is_keyset_sort(sort):
+        raise ValueError('Page tokens can not be used when sorting by '
+                         f'the array fields {ARRAY_FIELDS}')
+
+    try:
+        token = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        token_sort = [tuple(s) for s in token['sort']]
+        values = token['values']
+    except Exception as err:
+        raise ValueError(f'Invalid page token: {token}') from err
+
+    if token_sort != [tuple(s) for s in sort] or len(values) != len(sort):
+        raise ValueError('Page token does not match the requested sort')
+
+    return values
+
+
+def token_total(token):
+    """
+    Get the total number of matching records out of a continuation token
+
+    :returns: the total, or None if the token doesn't have one.
+
+    :raises ValueError: if the token is not valid
+    """
+    try:
+        token = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        total = token.get('total')
+    except Exception as err:
+        raise ValueError(f'Invalid page token: {token}') from err
+
+    return None if total is None else int(total)
+
+
+def keyset_filter(sort, values):
+    """
+    Make a query filter for the records that sort after the given values
+
+    For sort keys k1..kn, this is the OR of, for each key ki, the records
+    that have the same values for the keys before it, and a value for ki
+    that comes after its value in the token.
+
+    :raises ValueError: if the sort can't be keyset paged.
+    """
+    if not is_keyset_sort(sort):
+        raise ValueError('The records sorted by the array fields '
+                         f'{ARRAY_FIELDS} can not be keyset paged')
+
+    branches = []
+
+    for i, (field, direction) in enumerate(sort):
+        after = _after_value(field, direction, values[i])
+
+        if after is not None:
+            branch = [{f: v} for (f, _d), v in zip(sort[:i], values[:i])]
+            branch.append(after)
+
+            branches.append(branch[0] if len(branch) == 1
+                            else {'$and': branch})
+
+    if len(branches) == 0:
+        # nothing comes after the last record
+        return {'oil_id': {'$exists': False}}
+
+    return {'$or': branches}
+
+
+def _after_value(field, direction, value):
+    """
+    filter for the values of a single field that come after value,
+    or None if there can't be any.
+    """
+    if direction == DESCENDING:
+        if value is None:
+            return None  # missing values are the last ones
+        else:
+            return {'$or': [{field: {'$lt': value}},
+                            {field: None}]}
+    else:
+        if value is None:
+            return {field: {'$ne': None}}
+        else:
+            return {field: {'$gt': value}}
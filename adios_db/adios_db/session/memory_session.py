@@ -0,0 +1,539 @@
+"""
+An in-memory, read-only, Session
+
+For a deployment that doesn't edit the data, the whole catalog is small
+enough to keep in memory.  This loads all the records once, either from
+a MongoDB Session, or from a noaa-oil-data style JSON tree, and builds
+simple in-memory indexes for the queries the web API does.
+
+It has the same reading interface as the Session object:
+``find_one()``, ``get_version()``, ``query()`` and ``get_labels()``,
+and it returns the same results, as far as is practical.  In particular,
+strings sort the way the ``{'locale': 'en'}`` collation sorts them
+(ignoring case, lower case first), and missing values sort before
+everything else.
+
+The writing methods raise ReadOnlySessionError.
+
+.. note::
+
+    The records are shared between queries, so callers should not modify
+    the nested parts of the records they get.  The top level of a record
+    is a copy, so popping the ``_id`` (as the web API does) is fine.
+"""
+import os
+import json
+import bisect
+from collections import OrderedDict
+from functools import total_ordering
+from numbers import Number
+
+from ..models.oil.oil import Oil
+from ..computation.derived_properties import GRID_FIELD
+from ..computation.similarity import FEATURES_FIELD, SimilarityIndex
+from .base import (SessionBase,
+                   CursorWrapper,
+                   record_version,
+                   VERSION_FIELD,
+                   DERIVED_FIELDS,
+                   DESCENDING,
+                   ReadOnlySessionError)
+from .text_search import (MAX_TOKEN_LENGTH,
+                          normalize,
+                          searchable_text,
+                          search_tokens)
+from . import keyset
+
+
+def folder_records(base_path, validate=True):
+    """
+    Read the oil records (py_json) of a noaa-oil-data style JSON tree.
+
+    :param base_path: The folder with the ``oil`` folder in it, or
+                      the ``oil`` folder itself.
+    :param validate: If True, the records are validated while loaded,
+                     the same as db_restore does, and the fields the
+                     Session stores with them (fits, property grid and
+                     similarity features) are computed.
+
+    :raises ValueError: if the folder doesn't exist.
+    """
+    oil_path = os.path.join(base_path, 'oil')
+
+    if not os.path.isdir(oil_path):
+        oil_path = base_path
+
+    if not os.path.isdir(oil_path):
+        raise ValueError(f'No path named {base_path}')
+
+    def records():
+        for (dirname, _, filenames) in sorted(os.walk(oil_path)):
+            for name in sorted(filenames):
+                if name.endswith('.json'):
+                    with open(os.path.join(dirname, name),
+                              encoding='utf-8') as infile:
+                        rec = json.load(infile)
+
+                    if validate:
+                        oil = Oil.from_py_json(rec)
+                        oil.reset_validation()
+                        rec = oil.py_json()
+
+                        for field, value in (SessionBase._derived_fields(oil)
+                                             .items()):
+                            if value:
+                                rec[field] = value
+
+                    yield rec
+
+    return records()
+
+
+@total_ordering
+class Descending:
+    """
+    Wraps a sort key so that it sorts in the reverse order
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+class MemorySession(SessionBase):
+    # the number of different sort orders we keep
+    max_sort_orders = 32
+
+    def __init__(self, records):
+        """
+        Initialize a session from the records (py_json) of the catalog
+
+        :param records: An iterable of oil records (py_json).
+        """
+        self._records = {}  # oil_id: record
+        self._versions = {}  # oil_id: version stamp
+
+        for rec in records:
+            rec = dict(rec)
+            rec.pop('_id', None)
+            self._records[rec['oil_id']] = rec
+            self._versions[rec['oil_id']] = record_version(rec)
+
+        self._build_indexes()
+        self._sort_orders = OrderedDict()
+        self._similarity = None
+
+    @classmethod
+    def from_session(cls, session):
+        """
+        Load all the records from another Session (e.g. the MongoDB one)
+        """
+        records, _total = session.query(derived_fields=True)
+
+        return cls(records)
+
+    @classmethod
+    def from_folder(cls, base_path, validate=True):
+        """
+        Load all the records from a noaa-oil-data style JSON tree.
+
+        (see folder_records())
+        """
+        return cls(folder_records(base_path, validate=validate))
+
+    def _build_indexes(self):
+        """
+        Build the lookup tables for the query filters.
+        """
+        self._ids = sorted(self._records.keys())
+
+        self._tokens = {}
+        self._product_types = {}
+        self._labels = {}
+        self._gnome_suitable = {}
+        apis = []
+        grid_values = {}
+
+        for oil_id, rec in self._records.items():
+            meta = rec.get('metadata', {})
+
+            for token in search_tokens(rec):
+                self._tokens.setdefault(token, set()).add(oil_id)
+
+            self._product_types.setdefault(meta.get('product_type'),
+                                           set()).add(oil_id)
+
+            for label in meta.get('labels', None) or []:
+                self._labels.setdefault(label, set()).add(oil_id)
+
+            if isinstance(meta.get('gnome_suitable'), bool):
+                self._gnome_suitable.setdefault(meta['gnome_suitable'],
+                                                set()).add(oil_id)
+
+            api = meta.get('API')
+            if isinstance(api, Number) and not isinstance(api, bool):
+                apis.append((api, oil_id))
+
+            for name, value in (rec.get(GRID_FIELD, None) or {}).items():
+                grid_values.setdefault(name, []).append((value, oil_id))
+
+        self._api_index = self._range_index(apis)
+        self._grid_indexes = {name: self._range_index(values)
+                              for name, values in grid_values.items()}
+
+    @staticmethod
+    def _range_index(values):
+        """
+        A lookup table for range filters: the values, sorted, and the
+        oil_ids that go with them.
+
+        :param values: (value, oil_id) pairs
+        """
+        values = sorted(values)
+
+        return [v[0] for v in values], [v[1] for v in values]
+
+    def _range_ids(self, index, interval):
+        """
+        The oil_ids of a range lookup table (see _range_index()) with
+        values in an interval, or None if the interval is open at both
+        ends.
+        """
+        low, high = self._parse_interval_arg(interval)
+
+        if low is None and high is None:
+            return None
+
+        values, ids = index
+
+        first = (0 if low is None
+                 else bisect.bisect_left(values, low))
+        last = (len(values) if high is None
+                else bisect.bisect_right(values, high))
+
+        return ids[first:last]
+
+    def __len__(self):
+        return len(self._records)
+
+    def find_one(self, oil_id, version=False):
+        """
+        return a single Oil record from the catalog
+
+        :param version=False: If True, the record includes its version
+                              stamp (VERSION_FIELD), (see Session.find_one())
+        """
+        ret = self._records.get(oil_id)
+
+        if ret is None:
+            return None
+
+        ret = self._project(ret, None)
+
+        if version and self._versions.get(oil_id) is not None:
+            ret[VERSION_FIELD] = self._versions[oil_id]
+
+        return ret
+
+    def get_version(self, oil_id):
+        """
+        return the version stamp of a single Oil record, or None if there
+        is no such record
+        """
+        return self._versions.get(oil_id)
+
+    def query(self,
+              oil_id=None,
+              text=None,
+              api=None,
+              labels=None,
+              product_type=None,
+              gnome_suitable=None,
+              properties=None,
+              sort=None,
+              sort_case_sensitive=False,
+              page=None,
+              projection=None,
+              after=None,
+              derived_fields=False,
+              ):
+        """
+        Query the catalog according to various criteria
+
+        Takes the same arguments, and returns the same results, as
+        Session.query()
+        """
+        matches = self._filter_ids(oil_id, text, api, labels,
+                                   product_type, gnome_suitable, properties)
+
+        total = len(self._records) if matches is None else len(matches)
+
+        sort = self._sort_options(sort)
+        start, stop = self._parse_interval_arg(page)
+        start = 0 if start is None else int(start)
+
+        if sort is not None or after is not None:
+            sort = keyset.keyset_sort(sort)
+            keys, ordered = self._sort_order(sort, sort_case_sensitive)
+
+            if after is not None:
+                after_key = self._sort_key(sort,
+                                           keyset.decode_token(after, sort),
+                                           sort_case_sensitive)
+                ordered = ordered[bisect.bisect_right(keys, after_key):]
+        else:
+            ordered = [self._records[i] for i in self._ids]
+
+        if matches is not None:
+            ordered = [r for r in ordered if r['oil_id'] in matches]
+
+        if after is not None:
+            # the page starts right after the token record
+            stop = None if stop is None else int(stop) - start
+            start = 0
+
+        if stop is not None and int(stop) <= start:
+            page_data = []
+        else:
+            page_data = ordered[start:None if stop is None else int(stop)]
+
+        page_data = [self._project(r, projection, sort,
+                                   self._versions[r['oil_id']],
+                                   derived_fields)
+                     for r in page_data]
+
+        next_token = None
+        if sort is not None and len(page_data) > 0:
+            next_token = keyset.encode_token(sort, page_data[-1])
+
+        return (CursorWrapper(page_data, length=len(page_data),
+                              next_token=next_token),
+                total)
+
+    def _filter_ids(self, oil_id, text, api, labels, product_type,
+                    gnome_suitable, properties=None):
+        """
+        The set of oil_ids matching the filter options, or None if there
+        are no filter options.
+        """
+        matches = None
+
+        def narrow(ids):
+            return set(ids) if matches is None else matches.intersection(ids)
+
+        if oil_id is not None:
+            if not isinstance(oil_id, (list, tuple, set)):
+                oil_id = [oil_id]
+
+            matches = narrow([i for i in oil_id if i in self._records])
+
+        if text is not None:
+            for word in text.split():
+                matches = narrow(self._word_ids(word))
+
+        ids = self._range_ids(self._api_index, api)
+        if ids is not None:
+            matches = narrow(ids)
+
+        for name, interval in self._parse_properties_arg(properties):
+            ids = self._range_ids(self._grid_indexes.get(name, ([], [])),
+                                  interval)
+            if ids is not None:
+                matches = narrow(ids)
+
+        if product_type is not None:
+            matches = narrow(self._product_types.get(product_type, ()))
+
+        if labels is not None:
+            if isinstance(labels, str):
+                labels = [l.strip() for l in labels.split(',')]
+
+            if len(labels) > 0:
+                ids = set()
+                for label in labels:
+                    ids.update(self._labels.get(label, ()))
+
+                matches = narrow(ids)
+
+        if gnome_suitable is not None:
+            try:
+                gnome_suitable = gnome_suitable.lower() in ('true', '1')
+            except AttributeError:
+                gnome_suitable = bool(gnome_suitable)
+
+            matches = narrow(self._gnome_suitable.get(gnome_suitable, ()))
+
+        return matches
+
+    def _word_ids(self, word):
+        """
+        The oil_ids of the records matching a single word of search text
+        """
+        word = normalize(word)
+
+        if len(word) <= MAX_TOKEN_LENGTH:
+            return self._tokens.get(word, ())
+        else:
+            return {oil_id
+                    for oil_id in self._tokens.get(word[:MAX_TOKEN_LENGTH], ())
+                    if any(word in normalize(t)
+                           for t in searchable_text(self._records[oil_id]))}
+
+    def _sort_order(self, sort, case_sensitive=False):
+        """
+        All the records, in the order of a sort, along with their sort keys.
+
+        These are cached, as there are only a few sort orders that are
+        commonly used.
+        """
+        cache_key = (tuple(sort), case_sensitive)
+
+        try:
+            self._sort_orders.move_to_end(cache_key)
+            return self._sort_orders[cache_key]
+        except KeyError:
+            pass
+
+        fields = [f for f, _d in sort]
+        keyed = sorted(
+            ((self._sort_key(sort,
+                             [keyset.get_field(r, f) for f in fields],
+                             case_sensitive),
+              r)
+             for r in self._records.values()),
+            key=lambda kr: kr[0]
+        )
+
+        order = ([k for k, _r in keyed], [r for _k, r in keyed])
+
+        self._sort_orders[cache_key] = order
+        if len(self._sort_orders) > self.max_sort_orders:
+            self._sort_orders.popitem(last=False)
+
+        return order
+
+    @classmethod
+    def _sort_key(cls, sort, values, case_sensitive=False):
+        """
+        The sort key of a record, from the values of its sort fields
+        """
+        key = []
+
+        for (_field, direction), value in zip(sort, values):
+            descending = direction == DESCENDING
+
+            if isinstance(value, list):
+                # MongoDB sorts an array by its lowest value when
+                # ascending, and by its highest value when descending.
+                value_keys = [cls._value_key(v, case_sensitive)
+                              for v in value]
+
+                if len(value_keys) == 0:
+                    value_key = cls._value_key(None)
+                elif descending:
+                    value_key = max(value_keys)
+                else:
+                    value_key = min(value_keys)
+            else:
+                value_key = cls._value_key(value, case_sensitive)
+
+            key.append(Descending(value_key) if descending else value_key)
+
+        return tuple(key)
+
+    @staticmethod
+    def _value_key(value, case_sensitive=False):
+        """
+        A sort key for a single value, following MongoDB's ordering of
+        types: null, then numbers, then strings, then everything else.
+        """
+        if value is None:
+            return (0,)
+        elif isinstance(value, bool):
+            return (4, value)
+        elif isinstance(value, Number):
+            return (1, value)
+        elif isinstance(value, str):
+            if case_sensitive:
+                return (2, value)
+            else:
+                return (2, value.lower(), value.swapcase())
+        else:
+            return (3, json.dumps(value, sort_keys=True, default=str))
+
+    def _similarity_index(self, rebuild=False):
+        """
+        The similarity index of the catalog, built the first time it is
+        needed.  (the records don't change, so it is never rebuilt)
+        """
+        if self._similarity is None:
+            self._similarity = SimilarityIndex(
+                (oil_id, self._records[oil_id].get(FEATURES_FIELD))
+                for oil_id in self._ids
+            )
+
+        return self._similarity
+
+    @staticmethod
+    def _project(record, projection, sort=None, version=None,
+                 derived_fields=False):
+        """
+        A copy of a record with only the projected fields (plus the
+        oil_id and the sort fields), like a MongoDB projection.
+
+        The records don't have their version stamp in them, so it is
+        passed in, for a projection that asks for it.
+
+        Without a projection, the fields derived from the record are only
+        included if derived_fields is True, (see Session.query())
+        """
+        if projection is None:
+            if derived_fields:
+                return dict(record)
+            else:
+                return {k: v for k, v in record.items()
+                        if k not in DERIVED_FIELDS}
+
+        sort_fields = [] if sort is None else [f for f, _d in sort]
+        ret = {}
+
+        for field in ['oil_id'] + list(projection) + sort_fields:
+            if field == '_id':
+                continue
+
+            names = field.split('.')
+            src, dst = record, ret
+
+            for name in names[:-1]:
+                src = src.get(name) if isinstance(src, dict) else None
+
+                if not isinstance(src, dict):
+                    break
+
+                dst = dst.setdefault(name, {})
+            else:
+                if isinstance(src, dict) and names[-1] in src:
+                    dst[names[-1]] = src[names[-1]]
+
+        if version is not None and VERSION_FIELD in projection:
+            ret[VERSION_FIELD] = version
+
+        return ret
+
+    # this is a read-only session
+    def _read_only(self, *_args, **_kwargs):
+        raise ReadOnlySessionError('The in-memory Session is read-only')
+
+    insert_one = _read_only
+    replace_one = _read_only
+    delete_one = _read_only
+    insert_many = _read_only
+    upsert_many = _read_only
+    delete_many = _read_only
+    new_oil_id = _read_only
@@ -7,59 +7,41 @@ or other uses that require high performance querying, etc.
 In theory this same Session object could be duck typed to use a
 different back-end: RDBMS, simple file store, etc.
 """
-from numbers import Number
+import functools
+import re
+import time
 import warnings
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ReturnDocument, InsertOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 
-from ..models.oil.product_type import types_to_labels
+from ..computation.derived_properties import GRID_FIELD
+from ..computation.similarity import FEATURES_FIELD, SimilarityIndex
+from ..db_init import database as db_init
+from .text_search import SEARCH_TOKENS_FIELD, add_search_tokens, word_filter
+from .base import (SessionBase,
+                   CursorWrapper,
+                   VERSION_FIELD,
+                   DERIVED_FIELDS,
+                   record_version)
+from . import keyset
 
 
-class CursorWrapper():
-    """
-    Wraps a mongodb cursor to provide an iterator that we can do some
-    filtering on, while not losing all its methods
+# per-record status of the bulk write methods
+BULK_SUCCESS = 'success'
+BULK_DUPLICATE = 'duplicate'
+BULK_ERROR = 'error'
 
-    At this point, all it's doing is removing the _id key
+DUPLICATE_KEY_ERROR_CODE = 11000
 
-    Seems like a lot of effort for that, but the alternative is to realize
-    the entire thing into a list -- which may be a bad idea.
 
-    Rant-- Why doesn't a mongo cursor have a __len__ rather than using
-    .count() to make it more like a regular Sequence?
+class Session(SessionBase):
+    # number of records sent to the server in a single bulk write
+    bulk_batch_size = 500
 
-    oh, and now ``count()`` is deprecated as well.
-    """
-    def __init__(self, cursor):
-        self.cursor = cursor
-
-    def __iter__(self):
-        # this is do-nothing, a cursor is already an iterator
-        # -- but just in case.
-        self.cursor = iter(self.cursor)
-        return self
-
-    def __next__(self):
-        obj = next(self.cursor)
-        obj.pop('_id', None)
-        return obj
-
-    def __len__(self):
-        try:
-            return self.cursor.explain()['executionStats']['nReturned']
-        except StopIteration:
-            # explain() does this when the cursor has zero items
-            return 0
-
-    def __getitem__(self, idx):
-        return self.cursor[idx]
-
-
-class Session():
-    sort_direction = {'asc': ASCENDING,
-                      'ascending': ASCENDING,
-                      'desc': DESCENDING,
-                      'descending': DESCENDING}
+    # the number of seconds the similarity index is used before it is
+    # built again, so it gets the changes made by other processes
+    similarity_index_ttl = 300
 
     def __init__(self, host, port, database):
         """
@@ -74,29 +56,55 @@ class Session():
 
         self._db = getattr(self.mongo_client, database)
         self._oil_collection = self._db.oil  # the oil collection
+        self._counter_collection = self._db.counters  # oil_id counters
+
+        self._similarity = None  # (index, time built)
 
-    def find_one(self, oil_id):
+    def find_one(self, oil_id, version=False):
         """
         return a single Oil object from the collection
+
+        :param version=False: If True, the record includes its version
+                              stamp (VERSION_FIELD), if it has one, so the
+                              stamp is that of this copy of the record.
         """
-        ret = self._oil_collection.find_one({'oil_id': oil_id})
+        projection = self._hidden_fields()
+
+        if version:
+            del projection[VERSION_FIELD]
+
+        ret = self._oil_collection.find_one({'oil_id': oil_id}, projection)
 
         if ret is not None:
             ret.pop('_id', None)
 
         return ret
 
+    def get_version(self, oil_id):
+        """
+        return the version stamp of a single Oil record, or None if there
+        is no such record (or it has no stamp)
+
+        This is much cheaper than getting the whole record, so it can be
+        used to check whether a copy of the record is up to date.
+        """
+        ret = self._oil_collection.find_one({'oil_id': oil_id},
+                                            {VERSION_FIELD: 1, '_id': 0})
+
+        return None if ret is None else ret.get(VERSION_FIELD)
+
     def insert_one(self, oil_obj):
         """
         add a new Oil to the collection
         """
         oil_id = oil_obj.oil_id
-        oil_obj = oil_obj.py_json()
+        oil_obj = self._db_json(oil_obj)
 
         # is this necessary? couldn't we let Mongo make it?
         oil_obj['_id'] = oil_id
 
         self._oil_collection.insert_one(oil_obj)
+        self._sync_oil_id_counters([oil_id])
 
         return oil_id
         # we want to hide Mongo details, including _id
@@ -106,11 +114,240 @@ class Session():
         """
         replace existing Oil object with the same oil_id
         """
-        oil_obj = oil_obj.py_json()
+        oil_obj = self._db_json(oil_obj)
 
         return self._oil_collection.replace_one({'oil_id': oil_obj['oil_id']},
                                                 oil_obj)
 
+    def insert_many(self, oil_objs, batch_size=None):
+        """
+        add a number of new Oils to the collection
+
+        The records are sent to the server in batches, with unordered
+        writes, so one bad record doesn't stop the rest.
+
+        :param oil_objs: an iterable of Oil objects (or their py_json)
+
+        :param batch_size=None: number of records per round trip.
+                                Defaults to ``Session.bulk_batch_size``
+
+        :returns: a list of per-record results, in the order of the
+                  records passed in, of the form::
+
+                    {'oil_id': <oil_id>,
+                     'status': <'success', 'duplicate' or 'error'>,
+                     'message': <error message, or None>}
+        """
+        def make_op(oil_json):
+            oil_json['_id'] = oil_json['oil_id']
+            return InsertOne(oil_json)
+
+        return self._bulk_write(oil_objs, make_op, batch_size)
+
+    def upsert_many(self, oil_objs, batch_size=None):
+        """
+        add a number of Oils to the collection, replacing any existing
+        Oils with the same oil_id
+
+        Parameters and results are the same as ``insert_many()``
+        """
+        def make_op(oil_json):
+            return ReplaceOne({'oil_id': oil_json['oil_id']}, oil_json,
+                              upsert=True)
+
+        return self._bulk_write(oil_objs, make_op, batch_size)
+
+    def delete_many(self, oil_ids, batch_size=None):
+        """
+        delete a number of Oils with the given oil_ids
+
+        :returns: a list of per-record results, as in ``insert_many()``.
+                  oil_ids that were not found have an error status.
+        """
+        results = []
+
+        for batch in self._batches(oil_ids, batch_size):
+            found = {rec['oil_id'] for rec in self._oil_collection.find(
+                {'oil_id': {'$in': batch}}, {'oil_id': 1}
+            )}
+
+            self._oil_collection.delete_many({'oil_id': {'$in': batch}})
+
+            for oil_id in batch:
+                if oil_id in found:
+                    results.append(self._bulk_result(oil_id))
+                else:
+                    results.append(self._bulk_result(oil_id, BULK_ERROR,
+                                                     'oil_id not found'))
+
+        return results
+
+    def _bulk_write(self, oil_objs, make_op, batch_size=None):
+        results = []
+
+        for batch in self._batches(oil_objs, batch_size):
+            oil_jsons = [self._db_json(o) for o in batch]
+            oil_ids = [o['oil_id'] for o in oil_jsons]
+
+            batch_results = [self._bulk_result(oil_id) for oil_id in oil_ids]
+
+            try:
+                self._oil_collection.bulk_write([make_op(o)
+                                                 for o in oil_jsons],
+                                                ordered=False)
+            except BulkWriteError as err:
+                for write_err in err.details.get('writeErrors', []):
+                    idx = write_err['index']
+
+                    if write_err.get('code') == DUPLICATE_KEY_ERROR_CODE:
+                        status = BULK_DUPLICATE
+                    else:
+                        status = BULK_ERROR
+
+                    batch_results[idx] = self._bulk_result(oil_ids[idx],
+                                                           status,
+                                                           write_err['errmsg'])
+
+            self._sync_oil_id_counters([r['oil_id'] for r in batch_results
+                                        if r['status'] == BULK_SUCCESS])
+
+            results.extend(batch_results)
+
+        return results
+
+    def _batches(self, items, batch_size=None):
+        """
+        split an iterable up into lists of batch_size items
+        """
+        if batch_size is None:
+            batch_size = self.bulk_batch_size
+
+        batch = []
+
+        for item in items:
+            batch.append(item)
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _bulk_result(oil_id, status=BULK_SUCCESS, message=None):
+        return {'oil_id': oil_id, 'status': status, 'message': message}
+
+    def _db_json(self, oil_obj):
+        """
+        The py_json of an Oil object, with the extra fields we keep in
+        the database to support searching and caching.
+
+        For the bulk methods, the py_json itself may be passed in.
+        """
+        try:
+            oil_json = oil_obj.py_json()
+        except AttributeError:
+            oil_json = dict(oil_obj)
+            oil_obj = None
+
+        oil_json[VERSION_FIELD] = record_version(oil_json)
+
+        derived = self._derived_fields(oil_json if oil_obj is None
+                                       else oil_obj)
+
+        for field, value in derived.items():
+            if value:
+                oil_json[field] = value
+            else:
+                oil_json.pop(field, None)
+
+        return add_search_tokens(oil_json)
+
+    def update_search_tokens(self):
+        """
+        Recompute the text search tokens for all the records in the
+        collection.
+
+        Only needed for records that were put in the database without
+        going through this Session.
+
+        :returns: the number of records updated
+        """
+        count = 0
+        projection = ['oil_id',
+                      'metadata.name',
+                      'metadata.location',
+                      'metadata.alternate_names']
+
+        for rec in self._oil_collection.find({}, projection):
+            add_search_tokens(rec)
+
+            self._oil_collection.update_one(
+                {'_id': rec['_id']},
+                {'$set': {SEARCH_TOKENS_FIELD: rec[SEARCH_TOKENS_FIELD]}}
+            )
+            count += 1
+
+        return count
+
+    def update_versions(self):
+        """
+        Recompute the version stamps for all the records in the
+        collection.
+
+        Only needed for records that were put in the database without
+        going through this Session.
+
+        :returns: the number of records updated
+        """
+        count = 0
+
+        for rec in self._oil_collection.find({}, {SEARCH_TOKENS_FIELD: 0}):
+            self._oil_collection.update_one(
+                {'_id': rec['_id']},
+                {'$set': {VERSION_FIELD: record_version(rec)}}
+            )
+            count += 1
+
+        return count
+
+    def update_derived_fields(self):
+        """
+        Recompute the fields derived from the records, (the fits, property
+        grid and similarity features), for all the records in the
+        collection.
+
+        Only needed for records that were put in the database without
+        going through this Session, or before it stored these fields.
+        Until then, the property range queries skip the records, and they
+        are never found to be similar.
+
+        :returns: the number of records updated
+        """
+        count = 0
+        projection = {f: 0 for f in (SEARCH_TOKENS_FIELD, VERSION_FIELD)
+                      + DERIVED_FIELDS}
+
+        for rec in self._oil_collection.find({}, projection):
+            _id = rec.pop('_id')
+            derived = self._derived_fields(rec)
+
+            update = {}
+            for field, value in derived.items():
+                if value:
+                    update.setdefault('$set', {})[field] = value
+                else:
+                    update.setdefault('$unset', {})[field] = ''
+
+            self._oil_collection.update_one({'_id': _id}, update)
+            count += 1
+
+        # the features have changed
+        self._similarity = None
+
+        return count
+
     def delete_one(self, oil_id):
         """
         delete a single Oil object with the given oil_id
@@ -119,20 +356,72 @@ class Session():
 
     def new_oil_id(self, id_prefix='XX'):
         """
-        Query the database for the next highest ID with the provided
-        prefix.
+        Get the next available ID with the provided prefix.
 
         :param id_prefix = 'XX': Prefix of new ID
 
-        The current implementation is to walk the oil IDs, filter for the
-        prefix, and choose the max numeric content.
+        We keep a persistent counter for each prefix in the counters
+        collection, and increment it atomically, so this is safe even
+        when several web API workers are adding oils at the same time.
+
+        The first time a prefix is used, its counter is seeded with the
+        highest existing ID with that prefix.
+        """
+        counter = self._increment_oil_id_counter(id_prefix)
+
+        if counter is None:
+            self._seed_oil_id_counter(id_prefix)
+            counter = self._increment_oil_id_counter(id_prefix)
+
+        return f'{id_prefix}{counter["seq"]:05d}'
 
-        Warning: We don't expect a lot of traffic POST'ing a bunch new oils
-                 to the database, it will only happen once in awhile.
-                 But this is not the most effective way to do this.
-                 A persistent incremental counter would be much faster.
-                 In fact, this is a bit brittle, and would fail if the
-                 website suffered a bunch of POST requests at once.
+    def _increment_oil_id_counter(self, id_prefix):
+        return self._counter_collection.find_one_and_update(
+            {'_id': id_prefix},
+            {'$inc': {'seq': 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _seed_oil_id_counter(self, id_prefix):
+        """
+        Set the counter for a prefix to the highest existing ID.
+
+        ``$max`` means a concurrent seeding, or an increment that has
+        already happened, will never be undone.
+        """
+        try:
+            self._counter_collection.update_one(
+                {'_id': id_prefix},
+                {'$max': {'seq': self._max_oil_seq(id_prefix)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # another worker created the counter at the same time
+            pass
+
+    def _sync_oil_id_counters(self, oil_ids):
+        """
+        If oils were added with explicit IDs, make sure the counters
+        for their prefixes (if there are any yet) won't hand out the
+        same IDs.
+        """
+        max_seqs = {}
+
+        for oil_id in oil_ids:
+            prefix, seq = self._split_oil_id(oil_id)
+
+            if prefix is not None:
+                max_seqs[prefix] = max(seq, max_seqs.get(prefix, seq))
+
+        for prefix, seq in max_seqs.items():
+            self._counter_collection.update_one({'_id': prefix},
+                                                {'$max': {'seq': seq}})
+
+    def _max_oil_seq(self, id_prefix):
+        """
+        Walk the oil IDs with the prefix, and find the max numeric content.
+
+        This is slow, so it is only used to seed the counters.
         """
         max_seq = 0
 
@@ -152,9 +441,21 @@ class Session():
 
             max_seq = oil_seq if oil_seq > max_seq else max_seq
 
-        max_seq += 1  # next in the sequence
+        return max_seq
 
-        return f'{id_prefix}{max_seq:05d}'
+    @staticmethod
+    def _split_oil_id(oil_id):
+        """
+        Split an oil_id into its prefix and numeric sequence
+
+        :returns: (prefix, seq), or (None, None) if it's not that kind of ID
+        """
+        match = re.fullmatch(r'(\D+)(\d+)', oil_id)
+
+        if match is None:
+            return None, None
+        else:
+            return match.group(1), int(match.group(2))
 
     def query(self,
               oil_id=None,
@@ -163,10 +464,13 @@ class Session():
               labels=None,
               product_type=None,
               gnome_suitable=None,
+              properties=None,
               sort=None,
               sort_case_sensitive=False,
               page=None,
               projection=None,
+              after=None,
+              derived_fields=False,
               ):
         """
         Query the database according to various criteria
@@ -178,10 +482,17 @@ class Session():
           projection:
             The field names to be returned
 
+          derived_fields:
+            If True, the records include the fields computed from them
+            that are stored with them, (the fits, property grid and
+            similarity features, see DERIVED_FIELDS), so they can be
+            loaded into Oil objects, or another Session, without
+            computing them again.  Only used without a projection.
+
         **query options:**
 
             oil_id:
-                The identifier of a specific record
+                The identifier of a specific record, or a list of them
 
             text:
                 A string that is matched against the oil name, location.
@@ -200,6 +511,13 @@ class Session():
                 gnome_suitable boolean field to filter the results.  A None
                 value means do not filter.
 
+            properties:
+                A dict of ranges of numbers, keyed by the names of the
+                property grid, e.g. ``{'kvis_15C': [100, 500]}``, in which
+                the density (kg/m^3), or kinematic viscosity (cSt), of the
+                oil at a temperature will be filtered.  (see
+                computation.derived_properties.GRID_NAMES)
+
         **sort options:**
 
         A list of options consisting of ``('field_name', 'direction')``
@@ -217,8 +535,37 @@ class Session():
                       'desc',
                       'descending'}
 
-        The Mongodb find() function has a bunch of parameters, but we are
-        mainly interested in ``find(filter=None, orderby, projection=None)``
+        sort_case_sensitive:
+            By default, the query uses the ``{'locale': 'en'}`` collation,
+            which matches the collation of our indexes.  A case sensitive
+            sort uses no collation, and so will not be served by the
+            indexes.
+
+        **paging options:**
+
+            page:
+                An interval ``[start, stop]`` of the (sorted) results to
+                return.  The total number of matching records is returned
+                along with the page, and both are fetched from the server
+                in a single aggregation query.  Without a stop, the results
+                are streamed from a cursor instead, (as they can be more
+                than fits in a single document), and the total is counted
+                separately.
+
+            after:
+                A continuation token, from the ``next_token`` of a previous
+                page of results.  The page then starts right after the last
+                record of that page, rather than at ``start``.  The query
+                must have the same sort as the one the token came from.
+                The token carries the total from the first page, so the
+                following pages are a single bounded find(), with the
+                token position in the indexed match.
+
+        When the results are sorted, the oil_id is added as the final sort
+        key, so the order is always the same, and a page of the returned
+        results has a ``next_token`` attribute, to get the page that
+        follows it.  (It is None when sorting by the status or labels
+        array fields, which are only paged with ``page``.)
 
         .. note::
 
@@ -233,39 +580,319 @@ class Session():
             For this reason, a MongoDB query will not properly sort our
             status and labels array fields, at least not in a simple way.
         """
+        find_args, filter_opts = self._query_args(
+            oil_id, text, api, labels, product_type, gnome_suitable,
+            properties, sort, sort_case_sensitive, page, projection, after,
+            derived_fields
+        )
+
+        _start, stop = self._parse_interval_arg(page)
+        collation = find_args['collation']
+
+        total_results = None
+        if after is not None:
+            # the total was counted with the first page, and passed along
+            # in the token
+            total_results = keyset.token_total(after)
+
+            if total_results is None:
+                total_results = self._count(filter_opts, collation)
+
+        if stop is None:
+            # a whole catalog of records can be a lot of data, so we
+            # stream them from a cursor, rather than fetching them all.
+            if after is None:
+                total_results = self._count(filter_opts, collation)
+                length = max(total_results - find_args['skip'], 0)
+            else:
+                # only counted if it is asked for
+                length = functools.partial(self._count, find_args['filter'],
+                                           collation)
+
+            return (CursorWrapper(self._oil_collection.find(**find_args),
+                                  length=length),
+                    total_results)
+
+        if after is not None:
+            # The records after the token are part of the match, so the
+            # index seeks straight to them, and the page is a single
+            # bounded find()
+            if find_args['limit'] > 0:
+                page_data = list(self._oil_collection.find(**find_args))
+            else:
+                page_data = []
+        else:
+            pipeline = self._paged_pipeline(filter_opts, find_args)
+            kwargs = {} if collation is None else {'collation': collation}
+
+            # the page and the total count come back as a single document
+            res = next(self._oil_collection.aggregate(pipeline, **kwargs))
+
+            page_data = res.get('data', [])
+            total_results = res['total'][0]['count'] if res['total'] else 0
+
+        next_token = None
+        if (sort is not None or after is not None) and len(page_data) > 0:
+            next_token = keyset.encode_token(
+                keyset.keyset_sort(self._sort_options(sort)), page_data[-1],
+                total_results
+            )
+
+        return (CursorWrapper(page_data, length=len(page_data),
+                              next_token=next_token),
+                total_results)
+
+    def _count(self, filter_opts, collation=None):
+        """
+        The number of records matching a filter
+        """
+        kwargs = {} if collation is None else {'collation': collation}
+
+        return self._oil_collection.count_documents(filter_opts, **kwargs)
+
+    def _query_args(self,
+                    oil_id=None,
+                    text=None,
+                    api=None,
+                    labels=None,
+                    product_type=None,
+                    gnome_suitable=None,
+                    properties=None,
+                    sort=None,
+                    sort_case_sensitive=False,
+                    page=None,
+                    projection=None,
+                    after=None,
+                    derived_fields=False):
+        """
+        Build the arguments of the find() of the page of results, and the
+        filter of all the matching records (to count them), for the
+        arguments of query()
+
+        Note: The collation is used whether we are sorting or not, so that
+              all our queries can use the same (collated) indexes.
+        """
         filter_opts = self._filter_options(oil_id, text, api, labels,
-                                           product_type, gnome_suitable)
+                                           product_type, gnome_suitable,
+                                           properties)
 
         sort = self._sort_options(sort)
 
-        if projection is not None:
-            # make sure we always get the oil_id
-            projection = ['oil_id'] + list(projection)
+        start, stop = self._parse_interval_arg(page)
 
-        ret = self._oil_collection.find(filter=filter_opts,
-                                        projection=projection)
+        after_filter = None
+        if sort is not None or after is not None:
+            sort = keyset.keyset_sort(sort)
 
-        if sort is not None:
-            if sort_case_sensitive is False:
-                ret = ret.collation({'locale': 'en'})
+            if after is not None:
+                after_filter = keyset.keyset_filter(
+                    sort, keyset.decode_token(after, sort)
+                )
 
-            ret = ret.sort(sort)
+        find_args = self._page_args(filter_opts, sort, start, stop,
+                                    projection, after_filter, derived_fields)
 
-        start, stop = self._parse_interval_arg(page)
+        if sort_case_sensitive is False:
+            find_args['collation'] = db_init.QUERY_COLLATION
+        else:
+            find_args['collation'] = None
+
+        return find_args, filter_opts
+
+    def explain_query(self, **kwargs):
+        """
+        Get the query plan that the server would use for a query.
+
+        Takes the same arguments as query()
+
+        :returns: the set of stage names in the winning plan(s), e.g.
+                  ``{'FETCH', 'IXSCAN'}``
+        """
+        find_args, _filter_opts = self._query_args(**kwargs)
+
+        explained = self._oil_collection.find(**find_args).explain()
+
+        return set(self._plan_stages(explained))
+
+    def query_uses_index(self, **kwargs):
+        """
+        Check whether a query is served by the indexes, i.e. it needs
+        neither a full collection scan nor an in-memory sort.
+
+        Takes the same arguments as query()
+        """
+        stages = self.explain_query(**kwargs)
+
+        return 'COLLSCAN' not in stages and 'SORT' not in stages
+
+    @classmethod
+    def _plan_stages(cls, explained, in_plan=False):
+        """
+        Walk the output of an explain, and yield the stage names of the
+        winning plans.
+
+        The structure of the output depends a lot on the server version,
+        so we just look everywhere.
+        """
+        if isinstance(explained, dict):
+            for k, v in explained.items():
+                if k == 'stage' and in_plan:
+                    yield v
+                elif k == 'rejectedPlans':
+                    continue
+                else:
+                    yield from cls._plan_stages(v, in_plan or
+                                                k in ('winningPlan',
+                                                      'queryPlan'))
+        elif isinstance(explained, list):
+            for item in explained:
+                yield from cls._plan_stages(item, in_plan)
+
+    def _has_record(self, oil_id):
+        """
+        Check whether there is a record, without fetching it
+        """
+        return self._oil_collection.find_one({'oil_id': oil_id},
+                                             {'_id': 1}) is not None
+
+    def _similarity_index(self, rebuild=False):
+        """
+        The similarity index of all the records, built from their stored
+        features.  It is kept for similarity_index_ttl seconds.
+        """
+        now = time.monotonic()
+
+        if (rebuild or self._similarity is None or
+                now - self._similarity[1] > self.similarity_index_ttl):
+            records = self._oil_collection.find({}, {'oil_id': 1,
+                                                     FEATURES_FIELD: 1,
+                                                     '_id': 0})
+
+            self._similarity = (
+                SimilarityIndex((rec['oil_id'], rec.get(FEATURES_FIELD))
+                                for rec in records),
+                now
+            )
+
+        return self._similarity[0]
+
+    def verify_indices(self):
+        """
+        Check the indexes of the oil collection against the managed set
+
+        :returns: a list of the names of the indexes that are missing,
+                  or don't match their specification.
+        """
+        return db_init.verify_indices(self._db)
+
+    def rebuild_indices(self):
+        """
+        Drop and recreate all the managed indexes of the oil collection
+        """
+        db_init.rebuild_indices(self._db)
+
+    @staticmethod
+    def _paged_pipeline(filter_opts, find_args):
+        """
+        Build an aggregation pipeline that returns a page of matching
+        records along with the total number of matching records.
+
+        Doing it this way, with a ``$facet`` stage, means we only need a
+        single trip to the server, and the query is only executed once.
+        The match and the sort come before the ``$facet``, so they can use
+        the indexes.
+
+        It is only used for a page with a stop, as a document can't be
+        bigger than 16 MB, and all the records of a query easily can be.
+        And it is only used for the first page, as the following (keyset)
+        pages get the total from their continuation token.
+
+        :param find_args: The arguments of the find() of the page,
+                          (see _page_args())
+
+        The pipeline results in a single document::
+
+            {'data': [<records in the page>],
+             'total': [{'count': <number of matching records>}]}
+        """
+        pipeline = [{'$match': filter_opts}]
+
+        if 'sort' in find_args:
+            pipeline.append({'$sort': dict(find_args['sort'])})
 
-        total_results = ret.explain()['executionStats']['nReturned']
+        facets = {'total': [{'$count': 'count'}]}
 
-        return (CursorWrapper(ret[start:stop]), total_results)
+        if find_args['limit'] > 0:
+            data = []
 
-    def _sort_options(self, sort):
-        if sort is None:
-            return sort
+            if find_args['skip'] > 0:
+                data.append({'$skip': find_args['skip']})
+
+            data.append({'$limit': find_args['limit']})
+            data.append({'$project': find_args['projection']})
+
+            facets['data'] = data
+
+        pipeline.append({'$facet': facets})
+
+        return pipeline
+
+    def _page_args(self, filter_opts, sort, start, stop,
+                   projection=None, after_filter=None, derived_fields=False):
+        """
+        Build the arguments of a find() that returns a page of matching
+        records.  (For the first page with a stop, they are used for the
+        ``$facet`` of _paged_pipeline() instead.)
+
+        If there is an after_filter (keyset paging), the page is the first
+        ``stop - start`` records that pass it, rather than skipping
+        ``start`` records.
+
+        A limit of 0 means there is no limit.
+        """
+        if after_filter is not None:
+            filter_opts = ({'$and': [filter_opts, after_filter]}
+                           if filter_opts else after_filter)
+
+        start = 0 if start is None else int(start)
+
+        if projection is not None:
+            # make sure we always get the oil_id, and the sort keys
+            # needed for a continuation token
+            sort_fields = [] if sort is None else [f for f, _d in sort]
+            fields = {f: 1
+                      for f in ['oil_id'] + list(projection) + sort_fields
+                      if f != '_id'}
+            fields['_id'] = 0
         else:
-            return [(opt[0], self.sort_direction.get(opt[1], ASCENDING))
-                    for opt in sort]
+            fields = self._hidden_fields(derived_fields)
+
+        find_args = {'filter': filter_opts,
+                     'projection': fields,
+                     'skip': start if after_filter is None else 0,
+                     'limit': 0 if stop is None else max(int(stop) - start,
+                                                         0)}
+
+        if sort is not None:
+            find_args['sort'] = list(sort)
+
+        return find_args
+
+    @staticmethod
+    def _hidden_fields(derived_fields=False):
+        """
+        The projection of a whole record: all but the fields we keep in
+        the database for searching and caching.
+        """
+        fields = {'_id': 0, SEARCH_TOKENS_FIELD: 0, VERSION_FIELD: 0}
+
+        if not derived_fields:
+            fields.update({f: 0 for f in DERIVED_FIELDS})
+
+        return fields
 
     def _filter_options(self, oil_id, text, api, labels, product_type,
-                        gnome_suitable):
+                        gnome_suitable, properties=None):
         filter_opts = {}
         filter_opts.update(self._id_arg(oil_id))
         filter_opts.update(self._text_arg(text))
@@ -273,21 +900,43 @@ class Session():
         filter_opts.update(self._product_type_arg(product_type))
         filter_opts.update(self._labels_arg(labels))
         filter_opts.update(self._gnome_suitable_arg(gnome_suitable))
+        filter_opts.update(self._properties_arg(properties))
 
         return filter_opts
 
     def _id_arg(self, obj_id):
-        return {} if obj_id is None else {'oil_id': obj_id}
+        if obj_id is None:
+            return {}
+        elif isinstance(obj_id, (list, tuple, set)):
+            return {'oil_id': {'$in': list(obj_id)}}
+        else:
+            return {'oil_id': obj_id}
 
     def _api_arg(self, apis):
-        low, high = self._parse_interval_arg(apis)
+        return self._interval_arg('metadata.API', apis)
+
+    def _properties_arg(self, properties):
+        """
+        Range filters over the property grid, (see
+        computation.derived_properties.property_grid())
+        """
+        filter_opts = {}
+
+        for name, interval in self._parse_properties_arg(properties):
+            filter_opts.update(self._interval_arg(f'{GRID_FIELD}.{name}',
+                                                  interval))
+
+        return filter_opts
+
+    def _interval_arg(self, field, interval):
+        low, high = self._parse_interval_arg(interval)
 
         if low is not None and high is not None:
-            return {'metadata.API': {'$gte': low, '$lte': high}}
+            return {field: {'$gte': low, '$lte': high}}
         elif low is not None:
-            return {'metadata.API': {'$gte': low}}
+            return {field: {'$gte': low}}
         elif high is not None:
-            return {'metadata.API': {'$lte': high}}
+            return {field: {'$lte': high}}
         else:
             return {}
 
@@ -327,80 +976,17 @@ class Session():
         if text_to_match is None:
             return {}
         else:
-            ret = []
+            # uses the indexed search tokens, rather than a regex scan
+            # of the oil_id, name, location and alternate names
+            ret = [word_filter(w) for w in text_to_match.split()]
 
-            for w in text_to_match.split():
-                ret.append(self._make_inclusive([
-                    self._id_filter_arg(w),
-                    self._name_arg(w),
-                    self._location_arg(w),
-                    self._alternate_names_arg(w)
-                ]))
+            if len(ret) == 0:
+                return {}
 
             ret = self._make_exclusive(ret)
 
             return ret
 
-    def _id_filter_arg(self, obj_id):
-        if obj_id is None:
-            return {}
-        else:
-            return {'oil_id': {'$regex': obj_id, '$options': 'i'}}
-
-    def _name_arg(self, name):
-        if name is None:
-            return {}
-        else:
-            return {'metadata.name': {'$regex': name, '$options': 'i'}}
-
-    def _location_arg(self, location):
-        if location is None:
-            return {}
-        else:
-            return {'metadata.location': {'$regex': location, '$options': 'i'}}
-
-    def _alternate_names_arg(self, name):
-        if name is None:
-            return {}
-        else:
-            return {'metadata.alternate_names': {'$elemMatch': {
-                '$regex': name, '$options': 'i'
-            }}}
-
-    def _parse_interval_arg(self, interval):
-        """
-        An interval argument can be a number, string, or list
-        - If it is a number, we will assume it is a minimum
-        - If it is a list length 1, we will assume it is a minimum
-        - If it is a list greater than 2, we will only use the first 2
-          elements as a min/max
-        - If it is a string, we will try to parse it as a set of comma
-          separated values.
-        """
-        if interval is None:
-            low, high = None, None
-        elif isinstance(interval, Number):
-            low, high = interval, None
-        elif isinstance(interval, str):
-            try:
-                interval = [float(i) for i in interval.split(',')]
-            except Exception:
-                # something non-numeric was passed in
-                interval = [None, None]
-
-            low = interval[0]
-            high = None if len(interval) < 2 else interval[1]
-        else:
-            # assume it is a list
-            low = None if len(interval) < 1 else interval[0]
-            high = None if len(interval) < 2 else interval[1]
-
-        if low is not None and high is not None:
-            if low > high:
-                low, high = high, low
-
-        return low, high
-
     def _make_inclusive(self, opts):
         """
         Normally, the filtering options will be exclusive, i. e. if we are
@@ -430,32 +1016,6 @@ class Session():
         else:
             return {'$and': opts}
 
-    def get_labels(self, identifier=None):
-        """
-        Right now we are getting labels and associated product types
-        from the adios_db model code.  But it would be better managed
-        if we eventually migrate this to labels stored in a database
-        collection.
-        """
-        labels = types_to_labels.all_labels_dict
-
-        if identifier is None:
-            return labels
-        else:
-            msg = 'label identifiers are integer >= 0 only'
-            try:
-                identifier = int(identifier)
-            except ValueError as e:
-                raise ValueError(msg) from e
-            if identifier < 0:
-                raise ValueError(msg)
-
-            # Get a single label
-            for label in labels:
-                if label['_id'] == identifier:
-                    return label
-            return None
-
     def list_database_names(self):
         return self.mongo_client.list_database_names()
 
@@ -0,0 +1,625 @@
+"""
+A read-only Session backed by a single SQLite file
+
+This is for the stand alone builds, where running a whole mongod just to
+serve a read-only catalog is a lot to ask of a user's laptop.
+
+The file has a single table of oil records, stored as JSON, along with
+indexed columns for the fields we filter and sort on, tables of the labels
+and the property grid values, and an FTS5 index (with the trigram
+tokenizer) for the text search.  The file is made from the records by
+``SQLiteSession.create()``, (see the ``adios_db_build_sqlite`` script).
+
+The trigram tokenizer needs SQLite 3.34 or later.
+
+It has the same reading interface as the Session object:
+``find_one()``, ``get_version()``, ``query()`` and ``get_labels()``,
+and it returns the same results, as far as is practical.  Strings are
+sorted with a collation that mimics the ``{'locale': 'en'}`` collation
+used with MongoDB.
+
+The writing methods raise ReadOnlySessionError.
+"""
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from numbers import Number
+
+from ..computation.derived_properties import GRID_FIELD
+from ..computation.similarity import FEATURES_FIELD, SimilarityIndex
+from .base import (SessionBase, CursorWrapper, record_version, DESCENDING,
+                   VERSION_FIELD, ReadOnlySessionError)
+from .memory_session import MemorySession
+from .text_search import normalize, searchable_text
+from . import keyset
+
+COLLATION = 'adios_en'
+
+# The trigram tokenizer was added in SQLite 3.34
+MIN_SQLITE_VERSION = (3, 34, 0)
+
+# The words of a text search shorter than this can't use the trigram index
+MIN_TRIGRAM_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE oil (
+    oil_id TEXT PRIMARY KEY,
+    version TEXT,
+    product_type TEXT,
+    api REAL,
+    gnome_suitable INTEGER,
+    record TEXT NOT NULL,
+    name TEXT GENERATED ALWAYS
+        AS (json_extract(record, '$.metadata.name')) STORED,
+    location TEXT GENERATED ALWAYS
+        AS (json_extract(record, '$.metadata.location')) STORED
+);
+CREATE INDEX oil_product_type ON oil (product_type);
+CREATE INDEX oil_api ON oil (api, oil_id COLLATE adios_en);
+
+CREATE INDEX oil_sort_oil_id ON oil (oil_id COLLATE adios_en);
+CREATE INDEX oil_sort_name ON oil (name COLLATE adios_en,
+                                   oil_id COLLATE adios_en);
+CREATE INDEX oil_sort_location ON oil (location COLLATE adios_en,
+                                       oil_id COLLATE adios_en);
+CREATE INDEX oil_sort_product_type ON oil (product_type COLLATE adios_en,
+                                           oil_id COLLATE adios_en);
+
+CREATE TABLE oil_label (
+    label TEXT NOT NULL,
+    oil_id TEXT NOT NULL
+);
+CREATE INDEX oil_label_label ON oil_label (label);
+
+CREATE TABLE oil_property (
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    oil_id TEXT NOT NULL
+);
+CREATE INDEX oil_property_name_value ON oil_property (name, value);
+
+CREATE VIRTUAL TABLE oil_text USING fts5(oil_id UNINDEXED, text,
+                                         tokenize='trigram');
+"""
+
+# The sort fields that have a column of the oil table, (and an index)
+SORT_COLUMNS = {'oil_id': 'oil_id',
+                'metadata.name': 'name',
+                'metadata.location': 'location',
+                'metadata.product_type': 'product_type',
+                'metadata.API': 'api'}
+
+
+def collate_en(a, b):
+    """
+    Compare two strings the way the ``{'locale': 'en'}`` collation
+    (mostly) does: ignoring case, and then lower case first.
+    """
+    a_key = (a.lower(), a.swapcase())
+    b_key = (b.lower(), b.swapcase())
+
+    return (a_key > b_key) - (a_key < b_key)
+
+
+def check_sqlite_version():
+    """
+    Make sure the SQLite library has what the SQLite file needs.
+
+    :raises RuntimeError: if the SQLite library is too old
+    """
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        min_version = '.'.join(str(v) for v in MIN_SQLITE_VERSION)
+
+        raise RuntimeError(f'The SQLite session needs SQLite {min_version} '
+                           'or later, (for the FTS5 trigram tokenizer), '
+                           f'but Python is using SQLite '
+                           f'{sqlite3.sqlite_version}')
+
+
+class SQLiteSession(SessionBase):
+    def __init__(self, db_path):
+        """
+        Initialize a session using an SQLite file made by create()
+
+        :param db_path: The path of the SQLite file.  It is opened read-only.
+
+        :raises RuntimeError: if the SQLite library is too old
+        """
+        check_sqlite_version()
+
+        db_path = Path(db_path).resolve()
+
+        if not db_path.is_file():
+            raise ValueError(f'No SQLite file named {db_path}')
+
+        self.db_path = db_path
+        self._local = threading.local()
+        self._similarity = None
+
+    @classmethod
+    def create(cls, db_path, records):
+        """
+        Create the SQLite file of a catalog.
+
+        The file is written next to the destination, and then moved into
+        place, so an existing file is replaced all at once.
+
+        :param db_path: The path of the SQLite file.
+        :param records: An iterable of oil records (py_json).
+
+        :returns: the session for the new file.
+
+        :raises RuntimeError: if the SQLite library is too old
+        """
+        check_sqlite_version()
+
+        db_path = Path(db_path)
+        tmp_path = db_path.with_name(db_path.name + '.tmp')
+
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(tmp_path)
+        conn.create_collation(COLLATION, collate_en)
+
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+
+                for rec in records:
+                    cls._insert_record(conn, rec)
+
+                conn.execute("INSERT INTO oil_text (oil_text) "
+                             "VALUES ('optimize')")
+
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, db_path)
+
+        return cls(db_path)
+
+    @staticmethod
+    def _insert_record(conn, rec):
+        rec = dict(rec)
+        rec.pop('_id', None)
+
+        oil_id = rec['oil_id']
+        meta = rec.get('metadata', {})
+
+        api = meta.get('API')
+        if not isinstance(api, Number) or isinstance(api, bool):
+            api = None
+
+        gnome_suitable = meta.get('gnome_suitable')
+        if not isinstance(gnome_suitable, bool):
+            gnome_suitable = None
+
+        conn.execute('INSERT INTO oil (oil_id, version, product_type, api, '
+                     'gnome_suitable, record) VALUES (?, ?, ?, ?, ?, ?)',
+                     (oil_id,
+                      record_version(rec),
+                      meta.get('product_type'),
+                      api,
+                      gnome_suitable,
+                      json.dumps(rec)))
+
+        conn.executemany('INSERT INTO oil_label VALUES (?, ?)',
+                         [(label, oil_id)
+                          for label in meta.get('labels', None) or []])
+
+        conn.executemany('INSERT INTO oil_property VALUES (?, ?, ?)',
+                         [(name, value, oil_id)
+                          for name, value
+                          in (rec.get(GRID_FIELD, None) or {}).items()])
+
+        conn.execute('INSERT INTO oil_text VALUES (?, ?)',
+                     (oil_id, '\n'.join(normalize(t)
+                                        for t in searchable_text(rec))))
+
+    @property
+    def _conn(self):
+        """
+        The connection for the current thread
+        """
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.db_path.as_uri() + '?mode=ro',
+                                   uri=True)
+            conn.create_collation(COLLATION, collate_en)
+            self._local.conn = conn
+
+        return conn
+
+    def __len__(self):
+        return self._conn.execute('SELECT count(*) FROM oil').fetchone()[0]
+
+    def find_one(self, oil_id, version=False):
+        """
+        return a single Oil record from the catalog
+
+        :param version=False: If True, the record includes its version
+                              stamp (VERSION_FIELD), (see Session.find_one())
+        """
+        row = self._conn.execute('SELECT record, version FROM oil '
+                                 'WHERE oil_id = ?', (oil_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        ret = MemorySession._project(json.loads(row[0]), None)
+
+        if version and row[1] is not None:
+            ret[VERSION_FIELD] = row[1]
+
+        return ret
+
+    def get_version(self, oil_id):
+        """
+        return the version stamp of a single Oil record, or None if there
+        is no such record
+        """
+        row = self._conn.execute('SELECT version FROM oil WHERE oil_id = ?',
+                                 (oil_id,)).fetchone()
+
+        return None if row is None else row[0]
+
+    def query(self,
+              oil_id=None,
+              text=None,
+              api=None,
+              labels=None,
+              product_type=None,
+              gnome_suitable=None,
+              properties=None,
+              sort=None,
+              sort_case_sensitive=False,
+              page=None,
+              projection=None,
+              after=None,
+              derived_fields=False,
+              ):
+        """
+        Query the catalog according to various criteria
+
+        Takes the same arguments, and returns the same results, as
+        Session.query()
+        """
+        (page_sql, page_params), (count_sql, count_params), sort = \
+            self._query_sql(oil_id, text, api, labels, product_type,
+                            gnome_suitable, properties, sort,
+                            sort_case_sensitive, page, after)
+
+        total = self._conn.execute(count_sql, count_params).fetchone()[0]
+
+        if page_sql is None:
+            page_data = []
+        else:
+            rows = self._conn.execute(page_sql, page_params)
+
+            page_data = [MemorySession._project(json.loads(r[0]),
+                                                projection, sort, r[1],
+                                                derived_fields)
+                         for r in rows]
+
+        next_token = None
+        if sort is not None and len(page_data) > 0:
+            next_token = keyset.encode_token(sort, page_data[-1])
+
+        return (CursorWrapper(page_data, length=len(page_data),
+                              next_token=next_token),
+                total)
+
+    def _query_sql(self,
+                   oil_id=None,
+                   text=None,
+                   api=None,
+                   labels=None,
+                   product_type=None,
+                   gnome_suitable=None,
+                   properties=None,
+                   sort=None,
+                   sort_case_sensitive=False,
+                   page=None,
+                   after=None,
+                   projection=None,
+                   derived_fields=False):
+        """
+        Build the SQL of the page of results, and of the count of all the
+        matching records, for the arguments of query()
+
+        :returns: ((page_sql, params), (count_sql, params), sort), with
+                  page_sql None if the page is empty, and sort the full
+                  sort of the page, (or None)
+        """
+        where, params = self._filter_options(oil_id, text, api, labels,
+                                             product_type, gnome_suitable,
+                                             properties)
+
+        count = (f'SELECT count(*) FROM oil {where}', params)
+
+        sort = self._sort_options(sort)
+        start, stop = self._parse_interval_arg(page)
+        start = 0 if start is None else int(start)
+
+        collation = 'BINARY' if sort_case_sensitive else COLLATION
+
+        if sort is not None or after is not None:
+            sort = keyset.keyset_sort(sort)
+            exprs = [self._sort_expr(f, collation) for f, _d in sort]
+            order_by = ', '.join(
+                f'{expr} {"DESC" if d == DESCENDING else "ASC"}'
+                for (expr, _p), (_f, d) in zip(exprs, sort)
+            )
+            order_params = [p for _e, expr_params in exprs
+                            for p in expr_params]
+
+            if after is not None:
+                after_sql, after_params = self._keyset_filter(
+                    sort, keyset.decode_token(after, sort), collation
+                )
+                where = (f'{where} AND {after_sql}' if where
+                         else f'WHERE {after_sql}')
+                params = params + after_params
+
+                # the page starts right after the token record
+                stop = None if stop is None else int(stop) - start
+                start = 0
+        else:
+            order_by = 'oil_id'
+            order_params = []
+
+        if stop is not None and int(stop) <= start:
+            return (None, []), count, sort
+
+        limit = -1 if stop is None else int(stop) - start
+
+        return ((f'SELECT record, version FROM oil {where} '
+                 f'ORDER BY {order_by} LIMIT ? OFFSET ?',
+                 params + order_params + [limit, start]),
+                count,
+                sort)
+
+    def explain_query(self, **kwargs):
+        """
+        Get the query plan that SQLite would use for the page of a query.
+
+        Takes the same arguments as query()
+
+        :returns: the list of the details of the steps of the plan, e.g.
+                  ``['SEARCH oil USING INDEX oil_api (api>?)']``
+        """
+        (page_sql, page_params), count, _sort = self._query_sql(**kwargs)
+
+        if page_sql is None:
+            page_sql, page_params = count
+
+        return [row[3] for row in
+                self._conn.execute(f'EXPLAIN QUERY PLAN {page_sql}',
+                                   page_params)]
+
+    def query_uses_index(self, **kwargs):
+        """
+        Check whether the page of a query is served by the indexes, i.e.
+        it needs neither a full scan of a table nor a sort.
+
+        Takes the same arguments as query()
+        """
+        for step in self.explain_query(**kwargs):
+            if step.startswith('SCAN') and (
+                    # a full scan of the text index has no index constraints
+                    step.endswith('VIRTUAL TABLE INDEX 0:') or
+                    ('VIRTUAL TABLE' not in step and ' USING ' not in step)):
+                return False
+            elif 'TEMP B-TREE' in step:
+                return False
+
+        return True
+
+    def _filter_options(self, oil_id, text, api, labels, product_type,
+                        gnome_suitable, properties=None):
+        """
+        The WHERE clause, and its parameters, for the filter options
+        """
+        conditions = []
+        params = []
+
+        if oil_id is not None:
+            if isinstance(oil_id, (list, tuple, set)):
+                oil_id = list(oil_id)
+                conditions.append('oil_id IN ({})'
+                                  .format(', '.join('?' * len(oil_id))))
+                params.extend(oil_id)
+            else:
+                conditions.append('oil_id = ?')
+                params.append(oil_id)
+
+        if text is not None:
+            for word in normalize(text).split():
+                if len(word) >= MIN_TRIGRAM_LENGTH:
+                    # a phrase of its trigrams, which matches the word
+                    # anywhere in the text
+                    conditions.append('oil_id IN (SELECT oil_id '
+                                      'FROM oil_text WHERE text MATCH ?)')
+                    params.append('"{}"'.format(word.replace('"', '""')))
+                else:
+                    # a scan of the text
+                    conditions.append('oil_id IN (SELECT oil_id '
+                                      'FROM oil_text WHERE text LIKE ? '
+                                      "ESCAPE '\\')")
+                    params.append(f'%{self._escape_like(word)}%')
+
+        low, high = self._parse_interval_arg(api)
+        if low is not None:
+            conditions.append('api >= ?')
+            params.append(low)
+        if high is not None:
+            conditions.append('api <= ?')
+            params.append(high)
+
+        for name, interval in self._parse_properties_arg(properties):
+            low, high = self._parse_interval_arg(interval)
+            if low is None and high is None:
+                continue
+
+            in_range = ['name = ?']
+            params.append(name)
+
+            if low is not None:
+                in_range.append('value >= ?')
+                params.append(low)
+            if high is not None:
+                in_range.append('value <= ?')
+                params.append(high)
+
+            conditions.append('oil_id IN (SELECT oil_id FROM oil_property '
+                              f'WHERE {" AND ".join(in_range)})')
+
+        if product_type is not None:
+            conditions.append('product_type = ?')
+            params.append(product_type)
+
+        if labels is not None:
+            if isinstance(labels, str):
+                labels = [l.strip() for l in labels.split(',')]
+
+            if len(labels) > 0:
+                conditions.append('oil_id IN (SELECT oil_id FROM oil_label '
+                                  'WHERE label IN '
+                                  f'({", ".join("?" * len(labels))}))')
+                params.extend(labels)
+
+        if gnome_suitable is not None:
+            try:
+                gnome_suitable = gnome_suitable.lower() in ('true', '1')
+            except AttributeError:
+                gnome_suitable = bool(gnome_suitable)
+
+            conditions.append('gnome_suitable = ?')
+            params.append(gnome_suitable)
+
+        if len(conditions) == 0:
+            return '', []
+        else:
+            return f'WHERE {" AND ".join(conditions)}', params
+
+    def _similarity_index(self, rebuild=False):
+        """
+        The similarity index of the catalog, built the first time it is
+        needed.  (the file is read-only, so it is never rebuilt)
+        """
+        if self._similarity is None:
+            rows = self._conn.execute('SELECT oil_id, json_extract(record, ?) '
+                                      'FROM oil ORDER BY oil_id',
+                                      (self._field_path(FEATURES_FIELD),))
+
+            self._similarity = SimilarityIndex(
+                (oil_id, None if features is None else json.loads(features))
+                for oil_id, features in rows
+            )
+
+        return self._similarity
+
+    @staticmethod
+    def _escape_like(word):
+        return (word.replace('\\', '\\\\')
+                .replace('%', '\\%')
+                .replace('_', '\\_'))
+
+    @classmethod
+    def _sort_expr(cls, field, collation):
+        """
+        The SQL expression for sorting on a (dotted notation) field of the
+        records, and its parameters.
+
+        The fields with a column use it, so the sort can use its index.
+        Otherwise the JSON path of the field is passed in as a parameter,
+        (see _field_path())
+        """
+        column = SORT_COLUMNS.get(field)
+
+        if column == 'api':
+            # a number, so the collation doesn't matter, and the index
+            # doesn't have it
+            return column, []
+        elif column is not None:
+            return f'{column} COLLATE {collation}', []
+        else:
+            return (f'json_extract(record, ?) COLLATE {collation}',
+                    [cls._field_path(field)])
+
+    @staticmethod
+    def _field_path(field):
+        return '$.' + '.'.join(f'"{name}"' for name in field.split('.'))
+
+    @classmethod
+    def _keyset_filter(cls, sort, values, collation):
+        """
+        The SQL version of keyset.keyset_filter()
+
+        :returns: the SQL condition and its parameters
+        """
+        branches = []
+        params = []
+
+        for i, (field, direction) in enumerate(sort):
+            value = cls._sql_value(values[i])
+            expr, expr_params = cls._sort_expr(field, collation)
+
+            if direction == DESCENDING:
+                if value is None:
+                    continue
+
+                after, after_params = (f'({expr} < ? OR {expr} IS NULL)',
+                                       expr_params + [value] + expr_params)
+            else:
+                if value is None:
+                    after, after_params = (f'{expr} IS NOT NULL',
+                                           expr_params)
+                else:
+                    after, after_params = (f'{expr} > ?',
+                                           expr_params + [value])
+
+            branch = []
+            for (f, _d), v in zip(sort[:i], values[:i]):
+                prev_expr, prev_params = cls._sort_expr(f, collation)
+                branch.append(f'{prev_expr} IS ?')
+                params.extend(prev_params + [cls._sql_value(v)])
+
+            branch.append(after)
+            params.extend(after_params)
+
+            branches.append(f'({" AND ".join(branch)})')
+
+        if len(branches) == 0:
+            # nothing comes after the last record
+            return '0', []
+
+        return f'({" OR ".join(branches)})', params
+
+    @staticmethod
+    def _sql_value(value):
+        """
+        A token value, as json_extract() would give it to us
+        """
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, separators=(',', ':'),
+                              ensure_ascii=False)
+        else:
+            return value
+
+    # this is a read-only session
+    def _read_only(self, *_args, **_kwargs):
+        raise ReadOnlySessionError('The SQLite Session is read-only')
+
+    insert_one = _read_only
+    replace_one = _read_only
+    delete_one = _read_only
+    insert_many = _read_only
+    upsert_many = _read_only
+    delete_many = _read_only
+    new_oil_id = _read_only
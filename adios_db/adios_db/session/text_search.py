@@ -0,0 +1,106 @@
+"""
+Support for an indexed free-text search of the oil records
+
+The web client search box matches each word typed against the oil_id,
+name, location and alternate names of the records.  A word matches if it
+is found anywhere inside one of those fields, ignoring case.
+
+Doing that with an unanchored ``$regex`` means a full collection scan for
+every query.  So instead, when a record is written to the database, we
+store a list of all the (lower-cased) substrings of the words in those
+fields.  A multikey index on that list turns the search for a word into
+a simple index lookup.
+
+A word in a query never contains whitespace, so any field text it matches
+must be inside a single whitespace separated word of the field.  That means
+the substrings of the field words are all we need to keep the same
+matching behavior we had with the regex search.
+
+To keep the token list a reasonable size, we only store substrings up to
+``MAX_TOKEN_LENGTH`` characters long.  Longer query words are looked up
+by their first ``MAX_TOKEN_LENGTH`` characters, and the candidates are
+then checked with a regex.
+"""
+import re
+
+SEARCH_TOKENS_FIELD = '_search_tokens'
+
+MAX_TOKEN_LENGTH = 20
+
+
+def normalize(text):
+    """
+    Normalize a piece of text for searching
+    """
+    return text.lower()
+
+
+def word_substrings(word, max_length=MAX_TOKEN_LENGTH):
+    """
+    All the substrings of a word, up to max_length characters long
+    """
+    return {word[i:j]
+            for i in range(len(word))
+            for j in range(i + 1, min(i + max_length, len(word)) + 1)}
+
+
+def searchable_text(oil_json):
+    """
+    The text fields of a record (py_json) that are used in a text search
+    """
+    meta = oil_json.get('metadata', {})
+
+    fields = [oil_json.get('oil_id'),
+              meta.get('name'),
+              meta.get('location')]
+    fields.extend(meta.get('alternate_names', []))
+
+    return [f for f in fields if isinstance(f, str)]
+
+
+def search_tokens(oil_json):
+    """
+    Compute the normalized search tokens for a record (py_json)
+
+    :returns: a sorted list of unique tokens
+    """
+    tokens = set()
+
+    for text in searchable_text(oil_json):
+        for word in normalize(text).split():
+            tokens.update(word_substrings(word))
+
+    return sorted(tokens)
+
+
+def add_search_tokens(oil_json):
+    """
+    Add (or update) the search tokens of a record (py_json) in place.
+
+    The record is returned as a convenience.
+    """
+    oil_json[SEARCH_TOKENS_FIELD] = search_tokens(oil_json)
+
+    return oil_json
+
+
+def word_filter(word):
+    """
+    Make a query filter for records matching a single word of search text
+    """
+    word = normalize(word)
+
+    if len(word) <= MAX_TOKEN_LENGTH:
+        return {SEARCH_TOKENS_FIELD: word}
+    else:
+        # too long to be a token -- the index narrows it down, and the
+        # regex does the final check.
+        regex = {'$regex': re.escape(word), '$options': 'i'}
+
+        return {'$and': [
+            {SEARCH_TOKENS_FIELD: word[:MAX_TOKEN_LENGTH]},
+            {'$or': [{'oil_id': regex},
+                     {'metadata.name': regex},
+                     {'metadata.location': regex},
+                     {'metadata.alternate_names': {'$elemMatch': regex}}]}
+        ]}
@@ -0,0 +1,244 @@
+"""
+tests of the properties derived from an oil record
+"""
+import copy
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from adios_db.models.oil.oil import Oil
+from adios_db.computation.physical_properties import (Density,
+                                                      KinematicViscosity,
+                                                      get_density_data)
+from adios_db.computation.derived_properties import (derived_properties,
+                                                     DerivedProperties,
+                                                     FITS_FIELD,
+                                                     GRID_TEMPS,
+                                                     GRID_NAMES)
+
+
+HERE = Path(__file__).parent
+EXAMPLE_DATA_DIR = HERE.parent / "data_for_testing" / "example_data"
+full_oil_filename = EXAMPLE_DATA_DIR / "ExampleFullRecord.json"
+
+TEMPS = [273.15, 288.15, 300.0]
+
+
+def get_full_oil():
+    return Oil.from_file(full_oil_filename)
+
+
+def test_attached_to_oil():
+    oil = get_full_oil()
+
+    assert isinstance(oil.derived, DerivedProperties)
+    assert oil.derived is oil.derived
+    assert derived_properties(oil) is oil.derived
+
+
+def test_oil_unchanged():
+    """
+    having the derived properties doesn't change the oil's data
+    """
+    oil = get_full_oil()
+    pyjs = oil.py_json()
+
+    oil.derived.density
+
+    assert oil == get_full_oil()
+    assert oil.py_json() == pyjs
+
+
+def test_same_as_direct():
+    oil = get_full_oil()
+
+    assert oil.derived.density_data == get_density_data(oil)
+    assert np.all(oil.derived.density.at_temp(TEMPS)
+                  == Density(oil).at_temp(TEMPS))
+    assert np.all(oil.derived.kinematic_viscosity.at_temp(TEMPS)
+                  == KinematicViscosity(oil).at_temp(TEMPS))
+
+
+def test_computed_once():
+    oil = get_full_oil()
+
+    assert oil.derived.density is oil.derived.density
+    assert (oil.derived.kinematic_viscosity
+            is oil.derived.kinematic_viscosity)
+
+
+def test_changed_density():
+    oil = get_full_oil()
+
+    density = oil.derived.density
+    api = oil.derived.api
+
+    dp = oil.sub_samples[0].physical_properties.densities[0]
+    dp.density.value *= 1.01
+
+    assert oil.derived.density is not density
+    assert oil.derived.api != api
+
+    assert np.all(oil.derived.density.at_temp(TEMPS)
+                  == Density(oil).at_temp(TEMPS))
+
+
+def test_changed_product_type():
+    """
+    The default viscosity curve depends on the product type
+    """
+    oil = get_full_oil()
+
+    kvis = oil.derived.kinematic_viscosity
+
+    oil.metadata.product_type = 'Distillate Fuel Oil'
+
+    assert oil.derived.kinematic_viscosity is not kvis
+
+
+def test_removed_data():
+    oil = get_full_oil()
+
+    oil.derived.density
+
+    oil.sub_samples[0].physical_properties.densities.clear()
+
+    with pytest.raises(ValueError):
+        oil.derived.density
+
+
+def test_error_kept():
+    """
+    a computation that fails is not tried again
+    """
+    oil = Oil.from_file(EXAMPLE_DATA_DIR / 'EC00622-no-visc.json')
+
+    with pytest.raises(ValueError) as err1:
+        oil.derived.kinematic_viscosity
+
+    with pytest.raises(ValueError) as err2:
+        oil.derived.kinematic_viscosity
+
+    assert type(err1.value) is type(err2.value)
+    assert str(err1.value) == str(err2.value)
+
+
+def test_error_traceback():
+    """
+    the kept error doesn't collect the tracebacks of everyone that asks
+    """
+    oil = Oil.from_file(EXAMPLE_DATA_DIR / 'EC00622-no-visc.json')
+
+    lengths = []
+    for _i in range(3):
+        with pytest.raises(ValueError) as err:
+            oil.derived.kinematic_viscosity
+
+        lengths.append(len(err.traceback))
+
+    assert lengths[1] == lengths[2]
+
+
+def test_deepcopy():
+    oil = get_full_oil()
+    oil.derived.density
+
+    oil2 = copy.deepcopy(oil)
+
+    assert oil2.derived is not oil.derived
+    assert oil2.derived.oil is oil2
+
+    oil2.sub_samples[0].physical_properties.densities[0].density.value *= 1.01
+
+    assert not np.all(oil2.derived.density.at_temp(TEMPS)
+                      == oil.derived.density.at_temp(TEMPS))
+
+
+def test_ref_temps():
+    oil = get_full_oil()
+
+    phys_props = oil.sub_samples[0].physical_properties
+
+    assert (oil.derived.density_ref_temps
+            == [d.ref_temp.converted_to('C').value
+                for d in phys_props.densities])
+    assert (len(oil.derived.viscosity_ref_temps)
+            == (len(phys_props.kinematic_viscosities)
+                + len(phys_props.dynamic_viscosities)))
+
+
+def test_fits():
+    oil = get_full_oil()
+
+    fits = oil.derived.fits()
+
+    assert fits == {
+        'density': oil.derived.density.fit_coefficients(),
+        'kinematic_viscosity':
+            oil.derived.kinematic_viscosity.fit_coefficients(),
+    }
+
+
+def test_no_fits():
+    oil = Oil.from_file(EXAMPLE_DATA_DIR / 'EC00622-no-visc.json')
+
+    assert 'kinematic_viscosity' not in oil.derived.fits()
+
+
+def test_stored_fits():
+    """
+    the fits stored with a record are used when it's loaded
+    """
+    oil = get_full_oil()
+    pyjs = oil.py_json()
+    pyjs[FITS_FIELD] = oil.derived.fits()
+    pyjs[FITS_FIELD]['density']['k_rho_default'] = -1.0
+
+    oil2 = Oil.from_py_json(pyjs)
+
+    assert oil2.derived.stored_fits == pyjs[FITS_FIELD]
+    assert oil2.derived.density.k_rho_default == -1.0
+    assert (oil2.derived.kinematic_viscosity.at_temp(TEMPS).tolist()
+            == oil.derived.kinematic_viscosity.at_temp(TEMPS).tolist())
+
+    # the stored field isn't part of the record
+    assert oil2 == oil
+    assert FITS_FIELD not in oil2.py_json()
+
+
+def test_stored_fits_changed_data():
+    oil = get_full_oil()
+    pyjs = oil.py_json()
+    pyjs[FITS_FIELD] = oil.derived.fits()
+    pyjs[FITS_FIELD]['density']['k_rho_default'] = -1.0
+
+    oil2 = Oil.from_py_json(pyjs)
+    oil2.sub_samples[0].physical_properties.densities[0].density.value *= 1.01
+
+    assert oil2.derived.density.k_rho_default != -1.0
+
+
+def test_property_grid():
+    oil = get_full_oil()
+
+    grid = oil.derived.property_grid()
+
+    assert list(grid) == list(GRID_NAMES)
+    assert grid['density_15C'] == pytest.approx(
+        oil.derived.density.at_temp(15, unit='C'))
+    assert grid['kvis_15C'] == pytest.approx(
+        oil.derived.kinematic_viscosity.at_temp(15, kvis_units='cSt',
+                                                temp_units='C'))
+
+    # the colder, the thicker
+    assert np.all(np.diff([grid[f'kvis_{t}C'] for t in GRID_TEMPS]) < 0)
+
+
+def test_property_grid_no_visc():
+    oil = Oil.from_file(EXAMPLE_DATA_DIR / 'EC00622-no-visc.json')
+
+    grid = oil.derived.property_grid()
+
+    assert 'density_15C' in grid
+    assert not any(name.startswith('kvis') for name in grid)
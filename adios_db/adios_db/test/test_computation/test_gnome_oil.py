@@ -4,18 +4,28 @@ tests for making a GNOME Oil
 from pathlib import Path
 from math import isclose
 
+import numpy as np
 import pytest
 
 from adios_db.models.oil.oil import Oil
 from adios_db.computation.gnome_oil import (make_gnome_oil,
                                             sara_totals,
-                                            estimate_pour_point)
+                                            estimate_pour_point,
+                                            cut_table,
+                                            stack_cut_tables,
+                                            normalized_cut_values,
+                                            normalized_cut_values_batch,
+                                            component_mass_fractions,
+                                            component_mass_fractions_batch,
+                                            component_inputs,
+                                            pseudo_components_batch)
 
 
 HERE = Path(__file__).parent
 EXAMPLE_DATA_DIR = HERE.parent / "data_for_testing" / "example_data"
 full_oil_filename = EXAMPLE_DATA_DIR / "ExampleFullRecord.json"
 sparse_oil_filename = EXAMPLE_DATA_DIR / "ExampleSparseRecord.json"
+TEST_DATA_DIR = HERE.parent / "data_for_testing" / "noaa-oil-data"
 
 
 # use the function if you're going to change the Oil object.
@@ -50,6 +60,30 @@ def test_metadata():
     # assert data['api'] == FullOil.metadata.API
 
 
+def test_oil_not_changed():
+    """
+    making a GNOME oil doesn't change the oil object
+    """
+    oil = get_sparse_oil()
+    oil.metadata.API = 10.0  # not the same as the API from the density
+    pyjs = oil.py_json()
+
+    data = make_gnome_oil(oil)
+
+    assert oil.py_json() == pyjs
+    assert data['api'] != 10.0
+
+
+def test_api_from_density():
+    """
+    the API in the metadata isn't used for the estimations
+    """
+    oil = get_sparse_oil()
+    oil.metadata.API = 10.0
+
+    assert make_gnome_oil(oil) == make_gnome_oil(get_sparse_oil())
+
+
 def test_physical_properties():
     data = make_gnome_oil(FullOil)
 
@@ -133,3 +167,119 @@ def test_solubility():
     data = make_gnome_oil(FullOil)
 
     assert data['solubility'] == 0
+
+
+def get_gnome_oils():
+    """
+    the test records that are suitable for GNOME
+    """
+    oils = []
+    for filename in sorted(TEST_DATA_DIR.rglob("*.json")):
+        oil = Oil.from_file(filename)
+        try:
+            cut_table(oil, make_gnome_oil(oil)['api'])
+        except ValueError:
+            continue
+        oils.append(oil)
+
+    return oils
+
+
+def test_normalized_cut_values_batch():
+    oils = get_gnome_oils()
+    apis = [oil.derived.api for oil in oils]
+
+    cut_temps, fmass, counts = normalized_cut_values_batch(
+        *stack_cut_tables([cut_table(oil, api)
+                           for oil, api in zip(oils, apis)])
+    )
+
+    assert len(counts) == len(oils) > 2
+
+    for i, (oil, api) in enumerate(zip(oils, apis)):
+        temps_i, fmass_i = normalized_cut_values(oil, api)
+
+        assert np.array_equal(cut_temps[i, :counts[i]], temps_i)
+        assert np.array_equal(fmass[i, :counts[i]], fmass_i)
+        assert np.all(cut_temps[i, counts[i]:] == 0.0)
+        assert np.all(fmass[i, counts[i]:] == 0.0)
+
+        assert isclose(fmass_i.sum(), 1.0)
+
+
+def test_normalized_cut_values_no_cuts():
+    """
+    cuts estimated from the API -- the sparse oil has no distillation data
+    """
+    cut_temps, fmass = normalized_cut_values(SparseOil, 30.0)
+
+    assert np.all(np.diff(cut_temps) > 0)
+    assert isclose(fmass.sum(), 1.0)
+
+
+def test_component_mass_fractions_batch():
+    oils = get_gnome_oils()
+    apis = [oil.derived.api for oil in oils]
+
+    cut_temps, fmass, counts = normalized_cut_values_batch(
+        *stack_cut_tables([cut_table(oil, api)
+                           for oil, api in zip(oils, apis)])
+    )
+
+    sara = [sara_totals(oil) for oil in oils]
+    saturates = [np.nan if oil.sub_samples[0].SARA.saturates is None else s[0]
+                 for oil, s in zip(oils, sara)]
+
+    mass_fractions = component_mass_fractions_batch(cut_temps, fmass, counts,
+                                                    saturates,
+                                                    [s[2] for s in sara],
+                                                    [s[3] for s in sara])
+
+    for i, (oil, api) in enumerate(zip(oils, apis)):
+        mf = component_mass_fractions(oil, api)
+
+        assert np.allclose(mass_fractions[i, :counts[i] * 4], mf,
+                           rtol=0, atol=1e-15)
+        assert np.all(mass_fractions[i, counts[i] * 4:] == 0.0)
+
+        assert isclose(mf.sum(), 1.0)
+
+
+def test_pseudo_components_batch():
+    oils = get_gnome_oils()
+    apis = [oil.derived.api for oil in oils]
+
+    components = pseudo_components_batch([component_inputs(oil, api)
+                                          for oil, api in zip(oils, apis)])
+
+    assert len(components) == len(oils)
+
+    for (cut_temps, mass_fraction), oil, api in zip(components, oils, apis):
+        assert np.array_equal(cut_temps, normalized_cut_values(oil, api)[0])
+        assert np.array_equal(mass_fraction,
+                              component_mass_fractions(oil, api))
+
+
+def test_component_mass_fractions_inerts():
+    """
+    the resins and asphaltenes are all in the last component, and take the
+    place of the aromatics, from the last component back
+    """
+    cut_temps = np.array([[700.0, 800.0, 900.0]])
+    fmass = np.array([[0.2, 0.3, 0.5]])
+
+    mf = component_mass_fractions_batch(cut_temps, fmass, np.array([3]),
+                                        [np.nan], [0.2], [0.1])
+    sat, arom, res, asph = mf.reshape((3, 4)).T
+
+    assert np.array_equal(res, [0.0, 0.0, 0.2])
+    assert np.array_equal(asph, [0.0, 0.0, 0.1])
+    assert isclose(mf.sum(), 1.0)
+
+    # the inerts are more than the last aromatics
+    all_arom = fmass[0] - sat
+
+    assert all_arom[2] < 0.3
+    assert arom[2] == 0.0
+    assert isclose(arom[1], all_arom[1] - (0.3 - all_arom[2]))
+    assert arom[0] == all_arom[0]
@@ -0,0 +1,160 @@
+"""
+tests for making the GNOME oils of a number of records at once
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from adios_db.models.oil.oil import Oil
+from adios_db.session.memory_session import folder_records
+from adios_db.computation.gnome_oil import make_gnome_oil, ARRAY_FIELDS
+from adios_db.computation.gnome_oil_batch import (make_gnome_oils,
+                                                  is_load_error,
+                                                  write_jsonl,
+                                                  write_npz,
+                                                  read_npz)
+
+
+HERE = Path(__file__).parent
+TEST_DATA_DIR = HERE.parent / "data_for_testing" / "noaa-oil-data"
+
+
+def get_records():
+    return list(folder_records(TEST_DATA_DIR, validate=False))
+
+
+def test_same_as_make_gnome_oil():
+    records = get_records()
+
+    results = list(make_gnome_oils(records, processes=1))
+
+    assert [r[0] for r in results] == [rec['oil_id'] for rec in records]
+
+    for rec, (_oil_id, gnome_oil, error) in zip(records, results):
+        try:
+            expected = make_gnome_oil(Oil.from_py_json(rec))
+        except Exception as ex:
+            assert gnome_oil is None
+            assert str(ex) in error
+        else:
+            assert error is None
+            assert gnome_oil == expected
+
+
+def test_errors():
+    good = [rec for (rec, (_oil_id, _gnome_oil, error))
+            in zip(get_records(), make_gnome_oils(get_records(), processes=1))
+            if error is None]
+    records = [dict(good[0], sub_samples=[]), good[1]]
+
+    results = list(make_gnome_oils(records, processes=1))
+
+    assert results[0][1] is None
+    assert "Not GNOME compatible:" in results[0][2]
+    assert not is_load_error(results[0][2])
+    assert results[1][2] is None
+
+
+def test_load_errors():
+    """
+    a record that can't be loaded is not reported as unsuitable for GNOME
+    """
+    records = [{'oil_id': 'XX000001', 'sub_samples': 5},
+               get_records()[0]]
+
+    results = list(make_gnome_oils(records, processes=1))
+
+    assert results[0][0] == 'XX000001'
+    assert results[0][1] is None
+    assert results[0][2].startswith('E097:')
+    assert "Not GNOME compatible:" not in results[0][2]
+    assert is_load_error(results[0][2])
+
+
+def test_arrays_chunks():
+    """
+    the pseudo-components of a chunk of oils are made all at once
+    """
+    records = get_records()
+
+    for (_oil_id, gnome_oil, _error), expected in zip(
+            make_gnome_oils(records, processes=1, chunksize=10, arrays=True),
+            make_gnome_oils(records, processes=1, chunksize=1, arrays=True)):
+        if gnome_oil is None:
+            assert expected[1] is None
+        else:
+            for name in ARRAY_FIELDS:
+                assert np.array_equal(gnome_oil[name], expected[1][name])
+
+
+def test_pool():
+    records = get_records()
+
+    assert (list(make_gnome_oils(records, processes=2, chunksize=4))
+            == list(make_gnome_oils(records, processes=1)))
+
+
+def test_write_jsonl(tmp_path):
+    records = get_records()
+    outfile = tmp_path / "gnome_oils.jsonl"
+
+    num_oils, num_errors = write_jsonl(make_gnome_oils(records, processes=1),
+                                       outfile)
+
+    assert num_oils + num_errors == len(records)
+
+    with open(outfile, encoding='utf-8') as infile:
+        lines = [json.loads(line) for line in infile]
+
+    assert [line['oil_id'] for line in lines] == [r['oil_id'] for r in records]
+    assert len([line for line in lines if 'gnome_oil' in line]) == num_oils
+    assert len([line for line in lines if 'error' in line]) == num_errors
+
+
+def test_arrays():
+    records = get_records()
+
+    for (_id, go_list, _err), (_id, go_array, _err) in zip(
+            make_gnome_oils(records, processes=1),
+            make_gnome_oils(records, processes=1, arrays=True)):
+        if go_list is None:
+            assert go_array is None
+            continue
+
+        for name in ARRAY_FIELDS:
+            assert isinstance(go_array[name], np.ndarray)
+            assert go_array[name].tolist() == list(go_list[name])
+
+
+def test_npz(tmp_path):
+    records = get_records()
+    outfile = tmp_path / "gnome_oils.npz"
+
+    results = list(make_gnome_oils(records, processes=1, arrays=True))
+
+    num_oils, num_errors = write_npz(results, outfile)
+
+    assert num_oils + num_errors == len(records)
+
+    gnome_oils = read_npz(outfile)
+    expected = [go for _oil_id, go, _error in results if go is not None]
+
+    assert len(gnome_oils) == num_oils
+
+    for go, expected_go in zip(gnome_oils, expected):
+        assert go.keys() == expected_go.keys()
+
+        for name, value in go.items():
+            if name in ARRAY_FIELDS:
+                assert np.array_equal(value, expected_go[name])
+            else:
+                assert value == expected_go[name]
+
+
+def test_npz_no_oils(tmp_path):
+    outfile = tmp_path / "gnome_oils.npz"
+
+    assert write_npz([('XX000001', None, 'W100: no good')],
+                     outfile) == (0, 1)
+    assert read_npz(outfile) == []
@@ -15,6 +15,7 @@ from adios_db.models.oil.oil import Oil
 from adios_db.models.oil.sample import Sample
 from adios_db.models.oil.physical_properties import DensityPoint
 
+from adios_db.computation import physical_properties
 from adios_db.computation.physical_properties import bullwinkle_fraction
 from adios_db.computation.physical_properties import (
     get_density_data,
@@ -22,7 +23,10 @@ from adios_db.computation.physical_properties import (
     get_dynamic_viscosity_data,
     KinematicViscosity,
     Density,
+    KinematicViscosityBatch,
+    DensityBatch,
     get_frac_recovered,
+    get_distillation_cuts,
     max_water_fraction_emulsion,
     emul_water,
     get_interfacial_tension_water,
@@ -83,6 +87,18 @@ def test_get_kinematic_viscosity_data_defaults():
     assert isclose(kv[1][1], 288.15, rel_tol=1e-6)  # temp
 
 
+def test_get_dynamic_viscosity_data_bad_unit():
+    """
+    a unit that can't be converted raises, rather than dropping the point
+    """
+    oil = get_full_oil()
+    dvis = oil.sub_samples[0].physical_properties.dynamic_viscosities
+    dvis[0].viscosity.unit = "bogus"
+
+    with pytest.raises(ValueError):
+        get_dynamic_viscosity_data(oil)
+
+
 def test_get_dynamic_viscosity_data_multiple_shear_rates_default():
     oil = Oil.from_file(EXAMPLE_DATA_DIR / "Record_with_viscosity_at_two_shear_rates.json")
     dv = get_dynamic_viscosity_data(oil)
@@ -374,6 +390,34 @@ class TestDensity:
 
         assert D == result
 
+    def test_stored_fit(self):
+        data = [(982, 288), (984, 278), (991, 268)]
+        fit = Density(data).fit_coefficients()
+
+        assert fit['temp_range'] == [268, 288]
+        assert isclose(fit['k_rho_default'], -0.45)
+
+        # the stored fit is used for the same data
+        fit['k_rho_default'] = -0.5
+
+        assert Density(data, fit=fit).k_rho_default == -0.5
+
+        # but not for different data
+        assert isclose(Density(data[:2], fit=fit).k_rho_default, -0.2)
+
+    def test_stored_fit_version(self, monkeypatch):
+        """
+        a fit stored by another version of the fitting code is not used
+        """
+        data = [(982, 288), (984, 278), (991, 268)]
+        fit = Density(data).fit_coefficients()
+        fit['k_rho_default'] = -0.5
+
+        monkeypatch.setattr(physical_properties, 'FIT_VERSION',
+                            physical_properties.FIT_VERSION + 1)
+
+        assert isclose(Density(data, fit=fit).k_rho_default, -0.45)
+
 
 class TestKinematicViscosity:
     kv = KinematicViscosity(FullOil)
@@ -503,6 +547,146 @@ class TestKinematicViscosity:
 
         assert kv._k_v2 == KinematicViscosity.default_kvs[oil.metadata.product_type]
 
+    def test_stored_fit(self):
+        kv = KinematicViscosity(FullOil)
+        fit = kv.fit_coefficients()
+
+        kv2 = KinematicViscosity(FullOil, fit=fit)
+
+        assert kv2._k_v2 == kv._k_v2
+        assert kv2._visc_A == kv._visc_A
+        assert kv2.residuals is None
+        assert kv2.at_temp(300.0) == kv.at_temp(300.0)
+
+    def test_stored_fit_k_v2(self):
+        """
+        the default k_v2 is part of the input of a one point fit
+        """
+        data = [(0.0054, 323.15)]
+        fit = KinematicViscosity(data).fit_coefficients()
+
+        kv = KinematicViscosity(data, k_v2=3000.0, fit=fit)
+
+        assert kv._k_v2 == 3000.0
+
+
+BATCH_OILS = [FullOil,
+              SparseOil,
+              Oil.from_file(EXAMPLE_DATA_DIR / 'SimpleULSFO.json'),
+              Oil.from_file(EXAMPLE_DATA_DIR / 'hoops-blend_EX00026.json'),
+              Oil.from_file(EXAMPLE_DATA_DIR / 'EC00622-no-visc.json')]
+
+BATCH_TEMPS = [250.0, 273.15, 280.0, 288.15, 300.0, 323.15, 400.0]
+
+
+class TestDensityBatch:
+    tables = [[(980.0, 288.15), (990.0, 273.15), (985.0, 280.0)],
+              [(800.0, 288.16)],
+              [(982, 288), (984, 278), (991, 268), (995, 258)],
+              [],  # no data
+              [(980.0, 288.15), (990.0, 288.15)],  # not discreet
+              ]
+
+    def test_same_as_density(self):
+        db = DensityBatch(BATCH_OILS)
+        result = db.at_temp(BATCH_TEMPS)
+
+        assert result.shape == (len(BATCH_OILS), len(BATCH_TEMPS))
+
+        for oil, row in zip(BATCH_OILS, result):
+            assert np.allclose(row, Density(oil).at_temp(BATCH_TEMPS),
+                               rtol=1e-12)
+
+    def test_tables(self):
+        db = DensityBatch(self.tables)
+
+        assert list(db.valid) == [True, True, True, False, False]
+
+        result = db.at_temp(BATCH_TEMPS)
+
+        for table, row in zip(self.tables[:3], result):
+            dc = Density(table)
+            assert np.allclose(row, dc.at_temp(BATCH_TEMPS), rtol=1e-12)
+
+        assert np.all(np.isnan(result[3:]))
+
+    def test_at_known_temps(self):
+        """
+        at the data points, the densities should be exact
+        """
+        db = DensityBatch(self.tables[:1])
+
+        assert np.all(db.at_temp([288.15, 273.15, 280.0])
+                      == [[980.0, 990.0, 985.0]])
+
+    def test_k_rho(self):
+        db = DensityBatch(self.tables[:3])
+
+        assert np.allclose(db.k_rho_default,
+                           [Density(t).k_rho_default
+                            for t in self.tables[:3]])
+
+    def test_scalar(self):
+        db = DensityBatch(BATCH_OILS)
+        result = db.at_temp(15, unit='C')
+
+        assert result.shape == (len(BATCH_OILS),)
+        assert np.allclose(result, [Density(oil).at_temp(15, unit='C')
+                                    for oil in BATCH_OILS])
+
+    def test_empty(self):
+        db = DensityBatch([])
+
+        assert len(db) == 0
+        assert db.at_temp(BATCH_TEMPS).shape == (0, len(BATCH_TEMPS))
+
+
+class TestKinematicViscosityBatch:
+    def test_same_as_kinematic_viscosity(self):
+        kb = KinematicViscosityBatch(BATCH_OILS)
+        result = kb.at_temp(BATCH_TEMPS)
+
+        assert result.shape == (len(BATCH_OILS), len(BATCH_TEMPS))
+        assert list(kb.valid) == [True, True, True, True, False]
+
+        for oil, row in zip(BATCH_OILS[:-1], result):
+            kv = KinematicViscosity(oil)
+            assert np.allclose(row, kv.at_temp(BATCH_TEMPS), rtol=1e-10)
+
+        # no viscosity data
+        assert np.all(np.isnan(result[-1]))
+
+    def test_default_kv2(self):
+        kb = KinematicViscosityBatch(BATCH_OILS[1:3])
+
+        assert list(kb._k_v2) == [KinematicViscosity(oil)._k_v2
+                                  for oil in BATCH_OILS[1:3]]
+
+    def test_tables(self):
+        tables = [[(0.043, 275.15), (0.0054, 323.15)],
+                  [(0.043, 275.15), (0.012, 286.15), (0.0054, 323.15)],
+                  [(0.043, 275.15)]]
+
+        kb = KinematicViscosityBatch(tables, k_v2=3000.0)
+        result = kb.at_temp([2, 20, 50], kvis_units='cSt', temp_units='C')
+
+        for table, row in zip(tables, result):
+            kv = KinematicViscosity(table, k_v2=3000.0)
+            assert np.allclose(row, kv.at_temp([2, 20, 50], kvis_units='cSt',
+                                               temp_units='C'),
+                               rtol=1e-10)
+
+    def test_scalar(self):
+        kb = KinematicViscosityBatch(BATCH_OILS[:-1])
+        result = kb.at_temp(15, kvis_units='cSt', temp_units='C')
+
+        assert result.shape == (len(BATCH_OILS) - 1,)
+        assert np.allclose(result,
+                           [KinematicViscosity(oil).at_temp(15,
+                                                            kvis_units='cSt',
+                                                            temp_units='C')
+                            for oil in BATCH_OILS[:-1]])
+
 
 def test_get_frac_recovered():
     frac_recovered = get_frac_recovered(FullOil)
@@ -514,6 +698,21 @@ def test_get_frac_recovered():
     assert frac_recovered[0] is None
 
 
+def test_get_distillation_cuts():
+    cuts = get_distillation_cuts(FullOil)
+
+    assert len(cuts) == len(FullOil.sub_samples[0].distillation_data.cuts)
+    assert cuts == sorted(cuts)
+
+
+def test_get_distillation_cuts_bad_unit():
+    oil = get_full_oil()
+    oil.sub_samples[0].distillation_data.cuts[0].vapor_temp.unit = "bogus"
+
+    with pytest.raises(ValueError):
+        get_distillation_cuts(oil)
+
+
 def test_max_water_fraction_emulsion():
     y_max = max_water_fraction_emulsion(FullOil)
 
@@ -0,0 +1,98 @@
+"""
+tests of finding similar oils
+"""
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from adios_db.models.oil.oil import Oil
+from adios_db.computation.similarity import (oil_features,
+                                             SimilarityIndex,
+                                             FEATURE_NAMES,
+                                             CUT_TEMPS)
+
+
+HERE = Path(__file__).parent
+EXAMPLE_DATA_DIR = HERE.parent / "data_for_testing" / "example_data"
+full_oil_filename = EXAMPLE_DATA_DIR / "ExampleFullRecord.json"
+
+
+def get_full_oil():
+    return Oil.from_file(full_oil_filename)
+
+
+def test_oil_features():
+    oil = get_full_oil()
+
+    features = oil_features(oil)
+
+    assert set(features) <= set(FEATURE_NAMES)
+    assert features['api'] == pytest.approx(oil.derived.api)
+    assert features['log_kvis_15C'] == pytest.approx(
+        np.log10(oil.derived.kinematic_viscosity.at_temp(15,
+                                                         kvis_units='cSt',
+                                                         temp_units='C'))
+    )
+
+    evaporated = [features[f'evaporated_{t}C'] for t in CUT_TEMPS
+                  if f'evaporated_{t}C' in features]
+
+    assert len(evaporated) > 0
+    assert evaporated == sorted(evaporated)
+
+
+def test_oil_features_no_data():
+    assert oil_features(Oil('XXXXXX')) == {}
+
+
+def make_index():
+    return SimilarityIndex([
+        ('A', {'api': 10.0, 'pour_point': 0.0}),
+        ('B', {'api': 11.0, 'pour_point': 1.0}),
+        ('C', {'api': 30.0, 'pour_point': 20.0}),
+        ('D', {'api': 10.5}),
+        ('E', {'saturates': 0.5}),
+        ('F', None),
+    ])
+
+
+def test_similar():
+    index = make_index()
+
+    assert len(index) == 6
+    assert [oil_id for oil_id, _d in index.similar('A', 10)] == ['D', 'B',
+                                                                  'C']
+
+
+def test_similar_k():
+    index = make_index()
+
+    similar = index.similar('A', 2)
+
+    assert [oil_id for oil_id, _d in similar] == ['D', 'B']
+    assert similar[0][1] <= similar[1][1]
+
+
+def test_similar_no_features():
+    index = make_index()
+
+    assert index.similar('F') == []
+
+
+def test_similar_not_there():
+    with pytest.raises(KeyError):
+        make_index().similar('bogus')
+
+
+def test_nearest():
+    index = make_index()
+
+    assert index.nearest({'api': 29.0, 'pour_point': 19.0}, 1)[0][0] == 'C'
+    assert index.nearest({}) == []
+
+
+def test_empty():
+    index = SimilarityIndex([])
+
+    assert index.nearest({'api': 10.0}) == []
@@ -1,7 +1,10 @@
 import math
 import json
+import copy
+import pickle
 from dataclasses import dataclass
 
+import numpy as np
 import pytest
 
 import nucos
@@ -22,7 +25,9 @@ from adios_db.models.common.measurement import (MeasurementBase,
                                                 NeedleAdhesion,
                                                 InterfacialTension,
                                                 Unitless,
-                                                AnyUnit)
+                                                AnyUnit,
+                                                get_conversion,
+                                                measurements_to_array)
 
 
 def test_str():
@@ -42,6 +47,59 @@ def test_str():
                  "replicates=6, unit_type='mass')")
 
 
+@pytest.mark.parametrize('meas', [
+    Length(value=1.0, unit='m'),
+    MassOrVolumeFraction(value=0.1, unit='fraction', unit_type='massfraction'),
+    AnyUnit(value=1.0, unit='m', unit_type='length'),
+])
+def test_no_instance_dict(meas):
+    """
+    The measurements keep their fields in slots
+    """
+    assert not hasattr(meas, '__dict__')
+
+    with pytest.raises(AttributeError):
+        meas.something_else = 5
+
+
+def test_strings_shared():
+    """
+    The unit and unit_type strings are shared by all the measurements
+    """
+    # make them at run time, so they aren't the same constant
+    unit = ''.join(['kg/', 'm^3'])
+    dens1 = Density(value=900.0, unit=unit,
+                    unit_type=' '.join(['Den', 'sity']))
+    dens2 = Density.from_py_json({'value': 800.0,
+                                  'unit': ''.join(['kg', '/m^3']),
+                                  'unit_type': 'density'})
+
+    assert dens1.unit is dens2.unit
+    assert dens1.unit_type is dens2.unit_type is Density.unit_type
+
+    dens1.convert_to(''.join(['g/', 'cm^3']))
+    dens2.convert_to('g/cm^3')
+
+    assert dens1.unit is dens2.unit
+
+
+def test_class_unit_type():
+    assert Density.unit_type == 'density'
+    assert MeasurementBase.unit_type is None
+
+
+@pytest.mark.parametrize('copier', [copy.copy,
+                                    copy.deepcopy,
+                                    lambda m: pickle.loads(pickle.dumps(m))])
+def test_copy(copier):
+    temp = Temperature(value=15.0, unit='C', standard_deviation=0.5)
+    temp2 = copier(temp)
+
+    assert temp2 == temp
+    assert temp2 is not temp
+    assert temp2.unit_type == 'temperature'
+
+
 def test_empty_py_json():
     """
     test that a measurement with no values has an empty dict as py_json
@@ -981,3 +1039,119 @@ def test_as_text_range():
 
     assert text == "0.1\N{Em Dash}0.3"
 
+
+
+class TestUnitConversion:
+    values = [0.5, 1.5, -40.0, 15.0, 273.15, 939.88, 0.93988, 1234.5678]
+
+    @pytest.mark.parametrize('unit_type, from_unit, to_unit', [
+        ('density', 'kg/m^3', 'g/cm^3'),
+        ('density', 'g/cm^3', 'kg/m^3'),
+        ('density', 'kg/m^3', 'API'),
+        ('temperature', 'C', 'K'),
+        ('temperature', 'K', 'C'),
+        ('temperature', 'F', 'C'),
+        ('temperature', 'K', 'F'),
+        ('kinematicviscosity', 'cSt', 'm^2/s'),
+        ('kinematicviscosity', 'm^2/s', 'cSt'),
+        ('kinematicviscosity', 'mm^2/s', 'cSt'),
+        ('dynamicviscosity', 'mPa s', 'cP'),
+        ('massfraction', '%', 'fraction'),
+    ])
+    def test_same_as_nucos(self, unit_type, from_unit, to_unit):
+        conversion = get_conversion(unit_type, from_unit, to_unit)
+
+        expected = [nucos.convert(unit_type, from_unit, to_unit, v)
+                    for v in self.values]
+
+        assert [conversion(v) for v in self.values] == expected
+        assert conversion(np.array(self.values)).tolist() == expected
+
+    def test_same_as_nucos_many(self):
+        """
+        the values that don't convert exactly, as well as the ones that do
+        """
+        values = np.arange(1, 20001) / 10.0
+        conversion = get_conversion('dynamicviscosity', 'mPa s', 'cP')
+
+        assert conversion.is_affine
+        assert (conversion(values).tolist()
+                == [nucos.convert('dynamicviscosity', 'mPa s', 'cP', v)
+                    for v in values.tolist()])
+
+    def test_api_not_affine(self):
+        assert not get_conversion('density', 'kg/m^3', 'API').is_affine
+
+    def test_convert_to_uses_nucos(self):
+        visc = DynamicViscosity(value=15.7, unit='mPa s').converted_to('cP')
+
+        assert visc.value == nucos.convert('dynamicviscosity', 'mPa s', 'cP',
+                                           15.7)
+
+    def test_scale_and_offset(self):
+        conversion = get_conversion('temperature', 'C', 'K')
+
+        assert conversion.is_affine
+        assert conversion(np.array([0.0, 15.0])).tolist() == [273.15, 288.15]
+
+    def test_cached(self):
+        assert (get_conversion('density', 'kg/m^3', 'g/cm^3')
+                is get_conversion('density', 'kg/m^3', 'g/cm^3'))
+
+    def test_invalid(self):
+        conversion = get_conversion('density', 'kg/m^3', 'g/kg')
+
+        with pytest.raises(nucos.InvalidUnitError):
+            conversion(1.0)
+
+
+class TestMeasurementsToArray:
+    def test_mixed_units(self):
+        densities = [Density(value=900.0, unit='kg/m^3'),
+                     Density(value=0.95, unit='g/cm^3'),
+                     Density(value=910.0, unit='kg/m^3')]
+
+        values = measurements_to_array(densities, 'kg/m^3')
+
+        assert isinstance(values, np.ndarray)
+        assert values.tolist() == [d.converted_to('kg/m^3').value
+                                   for d in densities]
+
+    def test_missing(self):
+        densities = [None,
+                     Density(min_value=900.0, unit='kg/m^3'),
+                     Density(value=900.0, unit='bogus'),
+                     Density(value=900.0, unit='kg/m^3')]
+
+        values = measurements_to_array(densities, 'kg/m^3')
+
+        assert np.isnan(values[:3]).all()
+        assert values[3] == 900.0
+
+    @pytest.mark.parametrize("unit", ['bogus', None])
+    def test_strict(self, unit):
+        densities = [Density(value=900.0, unit='kg/m^3'),
+                     Density(value=900.0, unit=unit)]
+
+        with pytest.raises((TypeError, ValueError)):
+            measurements_to_array(densities, 'kg/m^3', strict=True)
+
+    def test_strict_missing(self):
+        densities = [None,
+                     Density(min_value=900.0, unit='kg/m^3'),
+                     Density(value=900.0, unit='kg/m^3')]
+
+        values = measurements_to_array(densities, 'kg/m^3', strict=True)
+
+        assert np.isnan(values[:2]).all()
+        assert values[2] == 900.0
+
+    def test_attr(self):
+        temps = [Temperature(min_value=10.0, max_value=20.0, unit='C'),
+                 Temperature(value=15.0, unit='C')]
+
+        assert (measurements_to_array(temps, 'K', attr='max_value')[0]
+                == Temperature(value=20.0, unit='C').converted_to('K').value)
+
+    def test_empty(self):
+        assert measurements_to_array([], 'K').shape == (0,)
@@ -4,7 +4,8 @@ NOTE: this really should be more extensivly tested!
 from dataclasses import dataclass, field
 
 from adios_db.models.common.utilities import (JSON_List,
-                                              dataclass_to_json)
+                                              dataclass_to_json,
+                                              add_slots)
 
 import pytest
 
@@ -227,3 +228,64 @@ def test_pre_from_py_json():
 
     scjs = sc.py_json()
     assert scjs == pyjs
+
+
+def test_sparse():
+    rs = ReallySimple(x=0)
+
+    assert rs.py_json() == {'x': 0}
+    assert rs.py_json(sparse=False) == {'x': 0, 'thing': ""}
+
+
+def test_undecorated_subclass():
+    """
+    A subclass that isn't decorated again (like the Measurement types)
+    gets its own fields, and makes objects of its own type
+    """
+    @dataclass
+    class SubClass(ReallySimple):
+        y: float = None
+
+    sc = SubClass.from_py_json({'x': 1, 'y': 2.0})
+
+    assert type(sc) is SubClass
+    assert sc.y == 2.0
+    assert sc.py_json() == {'x': 1, 'y': 2.0}
+
+    # and the base class is unchanged
+    assert ReallySimple.from_py_json({'x': 1, 'y': 2.0}).py_json() == {'x': 1}
+
+
+def test_nested_none():
+    """
+    A nested field with a default of None can be None in the JSON
+    """
+    @dataclass_to_json
+    @dataclass
+    class Nested:
+        rs: ReallySimple = None
+
+    assert Nested.from_py_json({'rs': None}).rs is None
+    assert Nested.from_py_json({'rs': {'x': 3}}).rs == ReallySimple(x=3)
+
+
+def test_add_slots():
+    @dataclass_to_json
+    @add_slots
+    @dataclass
+    class Slotted:
+        x: int = None
+        thing: str = ""
+
+    sl = Slotted(x=3)
+
+    assert not hasattr(sl, '__dict__')
+    assert sl.thing == ""
+    assert Slotted.from_py_json({'x': 3}) == sl
+    assert sl.py_json() == {'x': 3}
+
+    sl.thing = 'fred'
+    assert sl.thing == 'fred'
+
+    with pytest.raises(AttributeError):
+        sl.y = 5
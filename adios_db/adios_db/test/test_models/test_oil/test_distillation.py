@@ -1,3 +1,5 @@
+import numpy as np
+
 from adios_db.models.oil.distillation import DistCut, DistCutList, Distillation
 from adios_db.models.common.measurement import Temperature, Concentration
 
@@ -94,6 +96,21 @@ def test_from_data_arrays():
     assert dct[-1].vapor_temp.converted_to('C').value == 729.0
 
 
+def test_to_arrays():
+    dct = DistCutList.from_data_arrays(fractions=(1.5, 2.8, 12.4),
+                                       frac_unit='%',
+                                       temps=(36.0, 69.0, 119.0),
+                                       temp_unit='C')
+    dct.append(DistCut(vapor_temp=Temperature(value=150.0, unit='C')))
+
+    fractions, temps = dct.to_arrays(temp_units='C')
+
+    assert fractions[:3].tolist() == [c.fraction.converted_to('fraction')
+                                      .value for c in dct[:3]]
+    assert np.isnan(fractions[3])
+    assert temps.tolist() == [36.0, 69.0, 119.0, 150.0]
+
+
 class TestDistillation:
     """
     tests for the higher level distillation object
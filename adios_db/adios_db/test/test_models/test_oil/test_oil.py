@@ -1,6 +1,7 @@
 """
 Tests of the data model class
 """
+import copy
 import json
 from pathlib import Path
 
@@ -348,6 +349,37 @@ def test_from_file():
     assert oil.oil_id == "EC02234"
 
 
+def test_from_file_lazy():
+    oil = Oil.from_file(TEST_DATA_DIR / "EC" / "EC02234.json", lazy=True)
+
+    assert oil.oil_id == "EC02234"
+    assert type(list.__getitem__(oil.sub_samples, 0)) == dict
+
+
+def test_from_py_json_lazy():
+    """
+    A lazily loaded record should look just the same as a fully loaded one
+    """
+    oil = Oil.from_py_json(copy.deepcopy(BIG_RECORD))
+    lazy_oil = Oil.from_py_json_lazy(copy.deepcopy(BIG_RECORD))
+
+    assert lazy_oil.metadata == oil.metadata
+    assert lazy_oil.sub_samples[0] == oil.sub_samples[0]
+    assert lazy_oil == oil
+    assert lazy_oil.validate() == oil.validate()
+
+
+def test_from_py_json_lazy_round_trip():
+    lazy_oil = Oil.from_py_json_lazy(copy.deepcopy(BIG_RECORD))
+    lazy_oil.metadata.comments = 'A new comment'
+
+    pyjs = lazy_oil.py_json()
+
+    assert pyjs['metadata']['comments'] == 'A new comment'
+    assert (Oil.from_py_json(pyjs).sub_samples
+            == Oil.from_py_json(copy.deepcopy(BIG_RECORD)).sub_samples)
+
+
 def test_to_file_name():
     """
     test saving an oil object to a filename
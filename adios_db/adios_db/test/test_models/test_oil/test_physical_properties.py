@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 from adios_db.models.common.measurement import Temperature, Density
@@ -188,6 +189,21 @@ class TestDensityList:
         assert "E044:" in msgs[1]
         assert "-10.0" in msgs[1]
 
+    def test_to_arrays(self):
+        dl = DensityList.from_data([(0.8663, "g/cm³", 15, "C"),
+                                    (0.9012, "g/cm³", 0.0, "C"),
+                                    ])
+        dl.append(DensityPoint(density=Density(value=900, unit='kg/m^3')))
+
+        densities, temps = dl.to_arrays('kg/m^3', temp_units='C')
+
+        assert densities[:2].tolist() == [dp.density.converted_to('kg/m^3')
+                                          .value for dp in dl[:2]]
+        assert temps[:2].tolist() == [0.0, 15.0]
+
+        assert densities[2] == 900.0
+        assert np.isnan(temps[2])
+
 
 class TestDynamicViscosityPoint:
     def test_init_empty(self):
@@ -353,6 +369,16 @@ class TestKinematicViscosityList:
         assert "E042:" in msgs[0]
         assert "KinematicViscosity" in msgs[0]
 
+    def test_to_arrays(self):
+        kvl = KinematicViscosityList.from_data([(100, "cSt", 273.15, "K"),
+                                                (1234.3, "cSt", 15.0, "C"),
+                                                ])
+
+        kvis, temps = kvl.to_arrays('cSt')
+
+        assert kvis.tolist() == [100.0, 1234.3]
+        assert temps.tolist() == [273.15, 288.15]
+
 
 class TestPhysicalProperties:
     def test_init(self):
@@ -1,9 +1,11 @@
+import copy
+
 import pytest
 
 from adios_db.models.common.measurement import (Temperature,
                                                 Density,
                                                 MassFraction)
-from adios_db.models.oil.sample import Sample, SampleList
+from adios_db.models.oil.sample import Sample, SampleList, lazy_samples
 from adios_db.models.oil.metadata import SampleMetaData
 from adios_db.models.oil.ccme import CCME
 from adios_db.models.oil.physical_properties import (PhysicalProperties,
@@ -232,3 +234,90 @@ class TestSampleList:
 
         assert len(sl) == 1
         assert type(sl[0]) == Sample
+
+
+class TestLazySampleList:
+    samples_json = [Sample(metadata=SampleMetaData(name=name)).py_json()
+                    for name in ('Fresh Oil Sample', 'Distillation Cut')]
+
+    def lazy_list(self):
+        with lazy_samples():
+            return SampleList.from_py_json(copy.deepcopy(self.samples_json))
+
+    def test_not_lazy(self):
+        sl = SampleList.from_py_json(self.samples_json)
+
+        assert all(isinstance(s, Sample) for s in list.__iter__(sl))
+
+    def test_raw_until_used(self):
+        sl = self.lazy_list()
+
+        assert len(sl) == 2
+        assert all(isinstance(s, dict) for s in list.__iter__(sl))
+
+        assert sl[1].metadata.name == 'Distillation Cut'
+
+        assert isinstance(list.__getitem__(sl, 0), dict)
+        assert type(list.__getitem__(sl, 1)) == Sample
+
+    def test_same_sample(self):
+        sl = self.lazy_list()
+
+        assert sl[0] is sl[0]
+
+    def test_iter(self):
+        sl = self.lazy_list()
+
+        assert [s.metadata.name for s in sl] == ['Fresh Oil Sample',
+                                                 'Distillation Cut']
+        assert [s.metadata.name for s in reversed(sl)] == ['Distillation Cut',
+                                                           'Fresh Oil Sample']
+
+    def test_slice(self):
+        sl = self.lazy_list()
+
+        assert [type(s) for s in sl[:1]] == [Sample]
+
+    def test_py_json_passes_through(self):
+        sl = self.lazy_list()
+        raw = list.__getitem__(sl, 0)
+
+        assert sl.py_json()[0] is raw
+
+    def test_py_json_modified(self):
+        sl = self.lazy_list()
+        sl[0].metadata.description = 'changed'
+
+        assert sl.py_json()[0]['metadata']['description'] == 'changed'
+        assert sl.py_json() != self.samples_json
+
+    def test_py_json_not_sparse(self):
+        sl = self.lazy_list()
+
+        assert (sl.py_json(sparse=False)
+                == SampleList.from_py_json(self.samples_json)
+                .py_json(sparse=False))
+
+    def test_equal(self):
+        assert self.lazy_list() == SampleList.from_py_json(self.samples_json)
+        assert self.lazy_list() == self.lazy_list()
+
+    def test_deepcopy(self):
+        sl = self.lazy_list()
+        sl2 = copy.deepcopy(sl)
+
+        assert type(list.__getitem__(sl2, 0)) == dict
+        assert list.__getitem__(sl2, 0) is not list.__getitem__(sl, 0)
+        assert sl2 == sl
+
+    def test_validate(self):
+        assert (self.lazy_list().validate()
+                == SampleList.from_py_json(self.samples_json).validate())
+
+    def test_lazy_not_left_on(self):
+        with lazy_samples():
+            pass
+
+        sl = SampleList.from_py_json(self.samples_json)
+
+        assert type(list.__getitem__(sl, 0)) == Sample
@@ -0,0 +1,117 @@
+"""
+Tests of the keyset paging support
+
+These don't need a running database
+"""
+import pytest
+
+from adios_db.session.keyset import (keyset_sort,
+                                     get_field,
+                                     encode_token,
+                                     decode_token,
+                                     keyset_filter,
+                                     is_keyset_sort,
+                                     token_total)
+
+
+def test_keyset_sort_none():
+    assert keyset_sort(None) == [('oil_id', 1)]
+
+
+def test_keyset_sort_adds_oil_id():
+    assert keyset_sort([('metadata.name', -1)]) == [('metadata.name', -1),
+                                                    ('oil_id', -1)]
+
+
+def test_keyset_sort_already_has_oil_id():
+    assert keyset_sort([('oil_id', 1)]) == [('oil_id', 1)]
+
+
+def test_get_field():
+    rec = {'oil_id': 'AD00001', 'metadata': {'name': 'an oil'}}
+
+    assert get_field(rec, 'metadata.name') == 'an oil'
+    assert get_field(rec, 'metadata.API') is None
+    assert get_field(rec, 'bogus.field') is None
+
+
+def test_token_round_trip():
+    sort = [('metadata.API', 1), ('oil_id', 1)]
+    rec = {'oil_id': 'AD00001', 'metadata': {'API': 32.5}}
+
+    token = encode_token(sort, rec)
+
+    assert isinstance(token, str)
+    assert decode_token(token, sort) == [32.5, 'AD00001']
+
+
+def test_token_total():
+    sort = [('metadata.API', 1), ('oil_id', 1)]
+    rec = {'oil_id': 'AD00001', 'metadata': {'API': 32.5}}
+
+    assert token_total(encode_token(sort, rec, total=26)) == 26
+    assert token_total(encode_token(sort, rec)) is None
+
+    # the total doesn't get in the way of the sort values
+    assert decode_token(encode_token(sort, rec, total=26),
+                        sort) == [32.5, 'AD00001']
+
+
+def test_token_wrong_sort():
+    rec = {'oil_id': 'AD00001', 'metadata': {'API': 32.5}}
+    token = encode_token([('metadata.API', 1), ('oil_id', 1)], rec)
+
+    with pytest.raises(ValueError):
+        decode_token(token, [('metadata.name', 1), ('oil_id', 1)])
+
+
+def test_token_garbage():
+    with pytest.raises(ValueError):
+        decode_token('not a token', [('oil_id', 1)])
+
+
+@pytest.mark.parametrize('field', ['metadata.labels', 'status'])
+def test_array_sort(field):
+    """
+    An array sorts by its lowest (or highest) element, so there is no
+    keyset paging for them.
+    """
+    sort = [(field, 1), ('oil_id', 1)]
+    rec = {'oil_id': 'AD00001',
+           'metadata': {'labels': ['Crude Oil', 'Medium Crude']},
+           'status': ['W001: a warning']}
+    token = encode_token([('oil_id', 1)], rec)
+
+    assert is_keyset_sort(sort) is False
+    assert encode_token(sort, rec) is None
+
+    with pytest.raises(ValueError):
+        decode_token(token, sort)
+
+    with pytest.raises(ValueError):
+        keyset_filter(sort, [['Crude Oil'], 'AD00001'])
+
+
+def test_keyset_filter_ascending():
+    filt = keyset_filter([('metadata.API', 1), ('oil_id', 1)],
+                         [32.5, 'AD00001'])
+
+    assert filt == {'$or': [
+        {'metadata.API': {'$gt': 32.5}},
+        {'$and': [{'metadata.API': 32.5}, {'oil_id': {'$gt': 'AD00001'}}]},
+    ]}
+
+
+def test_keyset_filter_descending_none():
+    """
+    Nothing comes after a missing value in a descending sort, except
+    records with the same (missing) value.
+    """
+    filt = keyset_filter([('metadata.API', -1), ('oil_id', -1)],
+                         [None, 'AD00001'])
+
+    assert filt == {'$or': [
+        {'$and': [{'metadata.API': None},
+                  {'$or': [{'oil_id': {'$lt': 'AD00001'}},
+                           {'oil_id': None}]}]},
+    ]}
@@ -0,0 +1,281 @@
+"""
+Tests of the in-memory Session
+
+These don't need a running database
+"""
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+import adios_db.session
+from adios_db.session.base import (VERSION_FIELD, DERIVED_FIELDS,
+                                   ReadOnlySessionError)
+from adios_db.session.memory_session import MemorySession
+from adios_db.session.keyset import get_field
+from adios_db.computation.derived_properties import GRID_FIELD
+
+
+here = Path(__file__).resolve().parent
+test_data = here.parent / "data_for_testing" / "noaa-oil-data"
+
+
+@pytest.fixture(scope='module')
+def session():
+    return MemorySession.from_folder(test_data)
+
+
+def test_load(session):
+    assert len(session) == 26
+
+
+def test_load_bad_path():
+    with pytest.raises(ValueError):
+        MemorySession.from_folder(here / 'bogus')
+
+
+def test_find_one(session):
+    rec = session.find_one('AD00020')
+
+    assert rec['oil_id'] == 'AD00020'
+    assert rec['metadata']['name'] == 'ALASKA NORTH SLOPE'
+
+    assert session.find_one('bogus') is None
+
+
+def test_get_version(session):
+    assert session.get_version('AD00020') is not None
+    assert session.get_version('bogus') is None
+
+
+def test_find_one_version(session):
+    rec = session.find_one('AD00020', version=True)
+
+    assert rec[VERSION_FIELD] == session.get_version('AD00020')
+    assert VERSION_FIELD not in session.find_one('AD00020')
+
+
+def test_query(session):
+    recs, total = session.query()
+
+    assert len(recs) == total == 26
+
+
+def test_query_by_ids(session):
+    recs, total = session.query(oil_id=['AD00020', 'EC02713', 'bogus'])
+
+    assert total == 2
+    assert {rec['oil_id'] for rec in recs} == {'AD00020', 'EC02713'}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('alaska', ['AD00020', 'AD01987', 'EC00561', 'EC02713']),
+    ('ALASKA north', ['AD00020', 'AD01987', 'EC02713']),
+    ('ad0002', ['AD00020', 'AD00024', 'AD00025']),
+    ('bogus', []),
+])
+def test_query_by_text(session, text, expected):
+    recs, total = session.query(text=text)
+
+    assert [r['oil_id'] for r in recs] == expected
+    assert total == len(expected)
+
+
+@pytest.mark.parametrize('api, expected', [
+    (10, 25),
+    ([None, 15], 2),
+    ('10, 15', 2),
+    ([15, 10], 2),
+])
+def test_query_by_api(session, api, expected):
+    _recs, total = session.query(api=api)
+
+    assert total == expected
+
+
+@pytest.mark.parametrize('labels, expected', [
+    ('Crude Oil', 21),
+    ('Crude Oil, Fuel Oil', 24),
+    (['Jet Fuel'], 1),
+    ('bogus', 0),
+])
+def test_query_by_labels(session, labels, expected):
+    _recs, total = session.query(labels=labels)
+
+    assert total == expected
+
+
+def test_query_by_gnome_suitable(session):
+    _recs, total = session.query(gnome_suitable='false')
+
+    assert total == 2
+
+
+@pytest.mark.parametrize('properties', [
+    {'kvis_15C': [None, 50]},
+    {'kvis_15C': '10, 100'},
+    {'density_15C': 900},
+    {'density_15C': [800, 900], 'kvis_40C': [None, 5]},
+    {'kvis_15C': [None, None]},
+])
+def test_query_by_properties(session, properties):
+    recs, total = session.query(properties=properties)
+    all_recs, _total = session.query(derived_fields=True)
+
+    def in_range(rec, name, interval):
+        low, high = session._parse_interval_arg(interval)
+        value = rec.get(GRID_FIELD, {}).get(name)
+
+        return (low is None and high is None) or (
+            value is not None and
+            (low is None or value >= low) and
+            (high is None or value <= high)
+        )
+
+    expected = [r['oil_id'] for r in all_recs
+                if all(in_range(r, name, interval)
+                       for name, interval in properties.items())]
+
+    assert [r['oil_id'] for r in recs] == expected
+    assert total == len(expected)
+
+
+def test_query_by_properties_bad_name(session):
+    with pytest.raises(ValueError):
+        session.query(properties={'kvis_16C': 100})
+
+
+def test_derived_fields(session):
+    """
+    The fields derived from the records are only returned when asked for
+    """
+    assert all(GRID_FIELD in r
+               for r in session.query(derived_fields=True)[0])
+
+    assert not any(field in r
+                   for r in session.query()[0]
+                   for field in DERIVED_FIELDS)
+    assert not any(field in session.find_one('AD00020')
+                   for field in DERIVED_FIELDS)
+
+
+def test_similar(session):
+    similar = session.similar('AD00020', 5)
+
+    assert 0 < len(similar) <= 5
+    assert 'AD00020' not in [oil_id for oil_id, _d in similar]
+
+    assert session.similar('bogus') is None
+
+
+def test_query_with_projection(session):
+    recs, _total = session.query(projection=['metadata.name'], page=[0, 1])
+
+    assert recs[0] == {'oil_id': 'AD00005',
+                       'metadata': {'name': recs[0]['metadata']['name']}}
+
+
+def test_query_version(session):
+    """
+    The records don't have their version stamp in them, but it can be
+    projected, like with the database (e.g. for memoize_oil_arg)
+    """
+    recs, _total = session.query(projection=[VERSION_FIELD])
+
+    for rec in recs:
+        assert rec[VERSION_FIELD] == session.get_version(rec['oil_id'])
+
+    assert VERSION_FIELD not in session.find_one('AD00020')
+
+
+@pytest.mark.parametrize('field, direction', [
+    ('metadata.name', 'asc'),
+    ('metadata.name', 'desc'),
+    ('metadata.API', 'asc'),
+    ('metadata.API', 'desc'),
+])
+def test_query_sort(session, field, direction):
+    recs, _total = session.query(sort=[(field, direction)])
+
+    values = [get_field(r, field) for r in recs]
+    values = [v for v in values if v is not None]
+
+    if field == 'metadata.name':
+        values = [v.lower() for v in values]
+
+    assert values == sorted(values, reverse=(direction == 'desc'))
+
+
+@pytest.mark.parametrize('field, direction', [
+    ('oil_id', 'asc'),
+    ('metadata.name', 'desc'),
+    ('metadata.API', 'asc'),
+])
+def test_query_keyset_paging(session, field, direction):
+    sort = [(field, direction)]
+
+    all_recs, _total = session.query(sort=sort)
+    all_ids = [r['oil_id'] for r in all_recs]
+
+    paged_ids = []
+    recs, _total = session.query(sort=sort, page=[0, 5])
+
+    while len(recs) > 0:
+        paged_ids.extend(r['oil_id'] for r in recs)
+        recs, _total = session.query(sort=sort, page=[0, 5],
+                                     after=recs.next_token)
+
+    assert paged_ids == all_ids
+
+
+def test_query_array_sort_paging(session):
+    """
+    The array fields are only paged with skip/limit
+    """
+    sort = [('metadata.labels', 'asc')]
+
+    recs, _total = session.query(sort=sort, page=[0, 5])
+    assert recs.next_token is None
+
+    recs, _total = session.query(sort=[('oil_id', 'asc')], page=[0, 5])
+
+    with pytest.raises(ValueError):
+        session.query(sort=sort, page=[0, 5], after=recs.next_token)
+
+
+def test_get_labels(session):
+    assert len(session.get_labels()) > 0
+    assert session.get_labels(0)['_id'] == 0
+
+
+@pytest.mark.parametrize('method', ['insert_one', 'replace_one',
+                                    'delete_one', 'insert_many',
+                                    'upsert_many', 'delete_many',
+                                    'new_oil_id'])
+def test_read_only(session, method):
+    with pytest.raises(ReadOnlySessionError):
+        getattr(session, method)()
+
+
+def test_session_import_errors(monkeypatch):
+    """
+    Without pymongo there is no (MongoDB) Session, but any other error
+    importing it is raised
+    """
+    try:
+        with monkeypatch.context() as m:
+            m.setitem(sys.modules, 'adios_db.session.session', None)
+
+            with pytest.raises(ModuleNotFoundError):
+                importlib.reload(adios_db.session)
+
+        with monkeypatch.context() as m:
+            m.delitem(sys.modules, 'adios_db.session.session', raising=False)
+            m.setitem(sys.modules, 'pymongo', None)
+
+            importlib.reload(adios_db.session)
+
+            assert adios_db.session.Session is None
+    finally:
+        importlib.reload(adios_db.session)
@@ -17,6 +17,10 @@ else:
     from adios_db.util.db_connection import connect_mongodb
     from adios_db.scripts.db_initialize import init_db
     from adios_db.scripts.db_restore import restore_db
+    from adios_db.session.session import VERSION_FIELD
+    from adios_db.session.base import DERIVED_FIELDS
+    from adios_db.computation.derived_properties import (FITS_FIELD,
+                                                         GRID_FIELD)
 
 
 here = Path(__file__).resolve().parent
@@ -121,6 +125,14 @@ class TestSessionQuery(SessionTestBase):
         assert len(recs) == 1
         assert recs[0]['oil_id'] == 'AD00020'
 
+    def test_query_by_ids(self):
+        session = connect_mongodb(self.settings)
+
+        recs, total = session.query(oil_id=['AD00020', 'EC02713', 'bogus'])
+
+        assert total == 2
+        assert {rec['oil_id'] for rec in recs} == {'AD00020', 'EC02713'}
+
     def test_query_by_name_location(self):
         session = connect_mongodb(self.settings)
 
@@ -244,6 +256,167 @@ class TestSessionQuery(SessionTestBase):
 
         assert len(recs) == expected
 
+    def test_query_page_with_total(self):
+        session = connect_mongodb(self.settings)
+
+        recs, total = session.query(page=[0, 10],
+                                    sort=[('metadata.name', 'asc')])
+
+        assert total == 26  # all matching records, not just the page
+        assert len(recs) == 10
+        assert len(list(recs)) == 10
+
+        for rec in recs:
+            assert '_id' not in rec
+
+    def test_query_no_page(self):
+        """
+        Without a page, the records are streamed from a cursor, rather
+        than coming back in one document, which can't be over 16 MB
+        """
+        session = connect_mongodb(self.settings)
+
+        recs, total = session.query(sort=[('metadata.name', 'asc')])
+
+        assert not isinstance(recs.cursor, list)
+        assert len(recs) == total == 26
+        assert len(list(recs)) == 26
+
+    def test_query_page_single_document(self):
+        """
+        A page with a stop comes back with the total in a single document
+        """
+        session = connect_mongodb(self.settings)
+
+        find_args, filter_opts = session._query_args(page=[5, 10])
+        pipeline = session._paged_pipeline(filter_opts, find_args)
+
+        assert '$facet' in pipeline[-1]
+
+        recs, total = session.query(sort=[('metadata.name', 'asc')],
+                                    page=[5, 10])
+
+        assert isinstance(recs.cursor, list)
+        assert len(recs) == 5
+        assert total == 26
+
+    @pytest.mark.parametrize('field, direction', [
+        ('oil_id', 'asc'),
+        ('metadata.name', 'asc'),
+        ('metadata.name', 'desc'),
+        ('metadata.location', 'asc'),
+        ('metadata.product_type', 'asc'),
+        ('metadata.API', 'asc'),
+        ('metadata.API', 'desc'),
+        ('metadata.sample_date', 'asc'),
+    ])
+    def test_query_keyset_paging(self, field, direction):
+        """
+        Paging through the results with continuation tokens should get
+        the same records in the same order as getting them all at once.
+        """
+        session = connect_mongodb(self.settings)
+        sort = [(field, direction)]
+
+        all_recs, total = session.query(sort=sort, projection=['oil_id'])
+        all_ids = [r['oil_id'] for r in all_recs]
+
+        paged_ids = []
+        recs, page_total = session.query(sort=sort, page=[0, 5],
+                                         projection=['oil_id'])
+
+        while len(recs) > 0:
+            assert page_total == total
+
+            paged_ids.extend(r['oil_id'] for r in recs)
+            recs, page_total = session.query(sort=sort, page=[0, 5],
+                                             projection=['oil_id'],
+                                             after=recs.next_token)
+
+        assert paged_ids == all_ids
+
+    def test_query_keyset_paging_bad_token(self):
+        session = connect_mongodb(self.settings)
+
+        recs, _total = session.query(sort=[('metadata.name', 'asc')],
+                                     page=[0, 5])
+
+        with pytest.raises(ValueError):
+            session.query(sort=[('metadata.API', 'asc')],
+                          page=[0, 5],
+                          after=recs.next_token)
+
+    @pytest.mark.parametrize('field', ['metadata.labels', 'status'])
+    def test_query_array_sort_paging(self, field):
+        """
+        An array sorts by its lowest element, which a keyset filter can't
+        follow, so these are only paged with skip/limit.
+        """
+        session = connect_mongodb(self.settings)
+
+        recs, _total = session.query(sort=[(field, 'asc')], page=[0, 5])
+        assert recs.next_token is None
+
+        recs, _total = session.query(sort=[('oil_id', 'asc')], page=[0, 5])
+
+        with pytest.raises(ValueError):
+            session.query(sort=[(field, 'asc')], page=[0, 5],
+                          after=recs.next_token)
+
+
+class TestSessionIndexes(SessionTestBase):
+    def test_verify_indices(self):
+        session = connect_mongodb(self.settings)
+
+        assert session.verify_indices() == []
+
+    def test_rebuild_indices(self):
+        session = connect_mongodb(self.settings)
+
+        session.rebuild_indices()
+
+        assert session.verify_indices() == []
+
+    @pytest.mark.parametrize('query', [
+        {'sort': [('metadata.name', 'asc')], 'page': [0, 20]},
+        {'sort': [('metadata.name', 'desc')], 'page': [20, 40]},
+        {'sort': [('oil_id', 'asc')], 'page': [0, 20]},
+        {'sort': [('metadata.API', 'asc')], 'api': [10, 30]},
+        {'sort': [('metadata.name', 'asc')], 'product_type': 'Crude Oil NOS'},
+        {'text': 'Alaska'},
+        {'text': 'Alaska', 'sort': [('metadata.name', 'asc')],
+         'page': [0, 20]},
+        {'text': 'Alaska North', 'sort': [('metadata.name', 'desc')],
+         'page': [20, 40]},
+        {'properties': {'kvis_15C': [100, 500]}},
+    ])
+    def test_query_uses_index(self, query):
+        """
+        The queries the web client makes most often should not need a
+        collection scan, or an in-memory sort
+        """
+        session = connect_mongodb(self.settings)
+
+        stages = session.explain_query(**query)
+
+        assert 'COLLSCAN' not in stages
+        assert 'SORT' not in stages
+        assert session.query_uses_index(**query)
+
+    @pytest.mark.parametrize('query', [
+        {'sort': [('metadata.labels', 'asc')], 'page': [0, 20]},
+        {'sort': [('status', 'desc')], 'page': [0, 20]},
+    ])
+    def test_query_unindexed_sort(self, query):
+        """
+        The sorts by an array field are knowingly left to an in-memory
+        sort, (see db_init.database.OIL_INDEXES)
+        """
+        session = connect_mongodb(self.settings)
+
+        assert 'SORT' in session.explain_query(**query)
+        assert not session.query_uses_index(**query)
+
 
 class TestSessionCRUD(SessionTestBase):
     """
@@ -258,6 +431,30 @@ class TestSessionCRUD(SessionTestBase):
         assert oil_id[:2] == 'XX'
         assert oil_id[2:].isdigit()
 
+    def test_new_oil_id_increments(self):
+        session = connect_mongodb(self.settings)
+
+        ids = [session.new_oil_id('AD') for _i in range(3)]
+
+        seqs = [int(i[2:]) for i in ids]
+        assert seqs[1] == seqs[0] + 1
+        assert seqs[2] == seqs[1] + 1
+
+        # seeded from the existing records
+        assert session.find_one(ids[0]) is None
+        assert session.find_one(f'AD{seqs[0] - 1:05d}') is not None
+
+    def test_new_oil_id_after_explicit_insert(self):
+        session = connect_mongodb(self.settings)
+
+        ID = session.new_oil_id()
+        seq = int(ID[2:])
+
+        # somebody adds an oil with an ID ahead of the counter
+        session.insert_one(Oil(f'XX{seq + 5:05d}'))
+
+        assert session.new_oil_id() == f'XX{seq + 6:05d}'
+
     def test_insert_one(self):
         session = connect_mongodb(self.settings)
 
@@ -314,6 +511,156 @@ class TestSessionCRUD(SessionTestBase):
         assert oil_json['oil_id'] == ID
         assert oil_json['metadata']['name'] == new_name
 
+    def test_get_version(self):
+        session = connect_mongodb(self.settings)
+
+        ID = session.new_oil_id()
+        oil = Oil(ID)
+        oil.metadata.name = 'original name'
+
+        session.insert_one(oil)
+        orig_version = session.get_version(ID)
+
+        assert orig_version is not None
+        assert VERSION_FIELD not in session.find_one(ID)
+        assert (session.find_one(ID, version=True)[VERSION_FIELD] ==
+                orig_version)
+
+        # writing the same content gets the same version
+        session.replace_one(oil)
+
+        assert session.get_version(ID) == orig_version
+
+        oil.metadata.name = 'new name'
+        session.replace_one(oil)
+
+        assert session.get_version(ID) != orig_version
+
+    def test_stored_fits(self):
+        session = connect_mongodb(self.settings)
+
+        oil = Oil.from_file(here.parent / "data_for_testing" / "example_data"
+                            / "ExampleFullRecord.json")
+        oil.oil_id = session.new_oil_id()
+
+        session.insert_one(oil)
+        orig_version = session.get_version(oil.oil_id)
+
+        assert FITS_FIELD not in session.find_one(oil.oil_id)
+
+        recs, _total = session.query(oil_id=oil.oil_id, derived_fields=True)
+        oil_json = list(recs)[0]
+
+        assert oil_json[FITS_FIELD] == oil.derived.fits()
+        assert set(oil_json[FITS_FIELD]) == {'density', 'kinematic_viscosity'}
+
+        new_oil = Oil.from_py_json(oil_json)
+
+        assert new_oil.derived.stored_fits == oil_json[FITS_FIELD]
+
+        # the fits are not part of the version
+        session.replace_one(new_oil)
+
+        assert session.get_version(oil.oil_id) == orig_version
+
+    def test_property_grid(self):
+        session = connect_mongodb(self.settings)
+
+        oil = Oil.from_file(here.parent / "data_for_testing" / "example_data"
+                            / "ExampleFullRecord.json")
+        oil.oil_id = session.new_oil_id()
+
+        session.insert_one(oil)
+
+        assert GRID_FIELD not in session.find_one(oil.oil_id)
+
+        recs, _total = session.query(oil_id=oil.oil_id, derived_fields=True)
+        grid = list(recs)[0][GRID_FIELD]
+
+        assert grid == oil.derived.property_grid()
+
+        recs, _total = session.query(
+            properties={'kvis_15C': [grid['kvis_15C'] - 1,
+                                     grid['kvis_15C'] + 1],
+                        'density_15C': grid['density_15C']},
+            derived_fields=True
+        )
+
+        assert oil.oil_id in [r['oil_id'] for r in recs]
+
+        for rec in recs:
+            assert rec[GRID_FIELD]['density_15C'] >= grid['density_15C']
+
+    def test_similar(self):
+        session = connect_mongodb(self.settings)
+
+        similar = session.similar('AD00020', 5)
+
+        assert 0 < len(similar) <= 5
+        assert 'AD00020' not in [oil_id for oil_id, _d in similar]
+
+        assert session.similar('bogus') is None
+
+    def test_similar_unknown_oil(self):
+        """
+        An oil that isn't in the index is only a reason to rebuild it if
+        it exists
+        """
+        session = connect_mongodb(self.settings)
+        session.similar('AD00020')  # the index is built
+
+        index = session._similarity
+
+        assert session.similar('bogus') is None
+        assert session._similarity is index
+
+    def test_similar_new_oil(self):
+        session = connect_mongodb(self.settings)
+        session.similar('AD00020')  # the index is built
+
+        oil = Oil.from_file(here.parent / "data_for_testing" / "example_data"
+                            / "ExampleFullRecord.json")
+        oil.oil_id = session.new_oil_id()
+
+        session.insert_one(oil)
+
+        assert len(session.similar(oil.oil_id, 5)) > 0
+
+    def test_similar_no_version(self):
+        """
+        Records written before the versions were stamped have neighbours
+        """
+        session = connect_mongodb(self.settings)
+        session._oil_collection.update_one({'oil_id': 'AD00020'},
+                                           {'$unset': {VERSION_FIELD: ''}})
+
+        assert len(session.similar('AD00020', 5)) > 0
+
+    def test_update_derived_fields(self):
+        """
+        Records written without the derived fields get them
+        """
+        session = connect_mongodb(self.settings)
+        query = {'properties': {'kvis_15C': [10, 100]}}
+
+        recs, total = session.query(**query)
+        assert total > 0
+
+        session._oil_collection.update_many(
+            {}, {'$unset': {f: '' for f in DERIVED_FIELDS}}
+        )
+
+        assert session.query(**query)[1] == 0
+
+        assert session.update_derived_fields() == session.query()[1]
+        assert session.query(**query)[1] == total
+        assert len(session.similar('AD00020', 5)) > 0
+
+    def test_get_version_not_found(self):
+        session = connect_mongodb(self.settings)
+
+        assert session.get_version('bogus') is None
+
     def test_delete_one(self):
         session = connect_mongodb(self.settings)
 
@@ -337,6 +684,73 @@ class TestSessionCRUD(SessionTestBase):
         assert oil_json is None
 
 
+class TestSessionBulk(SessionTestBase):
+    """
+    Testing the bulk write operations of our session class
+    """
+    def make_oils(self, session, num):
+        oils = []
+
+        for i in range(num):
+            oil = Oil(session.new_oil_id())
+            oil.metadata.name = f'bulk oil {i}'
+            oils.append(oil)
+
+        return oils
+
+    def test_insert_many(self):
+        session = connect_mongodb(self.settings)
+
+        oils = self.make_oils(session, 5)
+
+        results = session.insert_many(oils, batch_size=2)
+
+        assert [r['oil_id'] for r in results] == [o.oil_id for o in oils]
+        assert all(r['status'] == 'success' for r in results)
+
+        for oil in oils:
+            assert session.find_one(oil.oil_id)['metadata']['name'] == oil.metadata.name
+
+    def test_insert_many_duplicate(self):
+        session = connect_mongodb(self.settings)
+
+        oils = self.make_oils(session, 3)
+        session.insert_one(oils[1])
+
+        results = session.insert_many(oils)
+
+        assert [r['status'] for r in results] == ['success',
+                                                  'duplicate',
+                                                  'success']
+        assert results[1]['message'] is not None
+
+    def test_upsert_many(self):
+        session = connect_mongodb(self.settings)
+
+        oils = self.make_oils(session, 3)
+        session.insert_one(oils[0])
+
+        oils[0].metadata.name = 'a new name'
+        results = session.upsert_many(oils)
+
+        assert all(r['status'] == 'success' for r in results)
+        assert session.find_one(oils[0].oil_id)['metadata']['name'] == 'a new name'
+
+    def test_delete_many(self):
+        session = connect_mongodb(self.settings)
+
+        oils = self.make_oils(session, 3)
+        session.insert_many(oils)
+
+        ids = [o.oil_id for o in oils] + ['XX99999']
+        results = session.delete_many(ids)
+
+        assert [r['status'] for r in results] == ['success'] * 3 + ['error']
+
+        for oil in oils:
+            assert session.find_one(oil.oil_id) is None
+
+
 class TestSessionGetLabels(SessionTestBase):
     def test_init(self):
         session = connect_mongodb(self.settings)
@@ -0,0 +1,183 @@
+"""
+Tests of the SQLite Session
+
+These don't need a running database.  The results should be the same as
+the ones from the in-memory Session.
+"""
+from pathlib import Path
+
+import pytest
+
+from adios_db.session.base import VERSION_FIELD, ReadOnlySessionError
+from adios_db.session.memory_session import MemorySession
+from adios_db.session import sqlite_session
+from adios_db.session.sqlite_session import SQLiteSession
+from adios_db.scripts.db_build_sqlite import build_sqlite
+
+
+here = Path(__file__).resolve().parent
+test_data = here.parent / "data_for_testing" / "noaa-oil-data"
+
+
+@pytest.fixture(scope='module')
+def memory_session():
+    return MemorySession.from_folder(test_data)
+
+
+@pytest.fixture(scope='module')
+def session(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp('sqlite') / 'oil_database.sqlite'
+
+    assert build_sqlite(test_data, db_path) == 26
+
+    return SQLiteSession(db_path)
+
+
+def test_open_bad_path():
+    with pytest.raises(ValueError):
+        SQLiteSession(here / 'bogus.sqlite')
+
+
+def test_old_sqlite(monkeypatch, tmp_path):
+    monkeypatch.setattr(sqlite_session.sqlite3, 'sqlite_version_info',
+                        (3, 31, 1))
+
+    with pytest.raises(RuntimeError):
+        SQLiteSession.create(tmp_path / 'oil_database.sqlite', [])
+
+
+def test_find_one(session, memory_session):
+    assert session.find_one('AD00020') == memory_session.find_one('AD00020')
+    assert (session.find_one('AD00020', version=True) ==
+            memory_session.find_one('AD00020', version=True))
+    assert session.find_one('bogus') is None
+
+
+def test_get_version(session, memory_session):
+    assert (session.get_version('AD00020') ==
+            memory_session.get_version('AD00020'))
+    assert session.get_version('bogus') is None
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'oil_id': 'AD00020'},
+    {'oil_id': ['AD00020', 'EC02713', 'bogus']},
+    {'text': 'alaska'},
+    {'text': 'ALASKA north'},
+    {'text': 'ad0002'},
+    {'text': 'a'},
+    {'text': 'al north'},
+    {'text': '[2003]'},
+    {'text': '100%'},
+    {'api': [10, 15]},
+    {'api': 10},
+    {'labels': 'Crude Oil, Fuel Oil'},
+    {'labels': ['Jet Fuel']},
+    {'gnome_suitable': 'false'},
+    {'product_type': 'Crude Oil NOS'},
+    {'text': 'crude', 'api': [20, 30], 'page': [2, 4]},
+    {'projection': ['metadata.name', 'metadata.API']},
+    {'projection': ['metadata.name', VERSION_FIELD]},
+    {'derived_fields': True},
+    {'properties': {'kvis_15C': [10, 100]}},
+    {'properties': {'density_15C': [800, 900], 'kvis_40C': [None, 5]}},
+])
+def test_query(session, memory_session, query):
+    recs, total = session.query(**query)
+    expected, expected_total = memory_session.query(**query)
+
+    assert total == expected_total
+    assert list(recs) == list(expected)
+
+
+@pytest.mark.parametrize('oil_id', ['AD00020', 'EC02713', 'bogus'])
+def test_similar(session, memory_session, oil_id):
+    assert (session.similar(oil_id, 5) ==
+            memory_session.similar(oil_id, 5))
+
+
+@pytest.mark.parametrize('field', ['oil_id',
+                                   'metadata.name',
+                                   'metadata.location',
+                                   'metadata.product_type',
+                                   'metadata.API',
+                                   'metadata.sample_date'])
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_query_sort(session, memory_session, field, direction):
+    sort = [(field, direction)]
+
+    recs, _total = session.query(sort=sort, projection=['metadata.name'])
+    expected, _total = memory_session.query(sort=sort,
+                                            projection=['metadata.name'])
+
+    assert list(recs) == list(expected)
+
+
+@pytest.mark.parametrize('text', ['alaska', 'ALASKA north', 'ad0002'])
+def test_text_search_uses_index(session, text):
+    plan = session.explain_query(text=text)
+
+    text_steps = [step for step in plan if 'oil_text' in step]
+
+    assert len(text_steps) > 0
+    # the index constraints of a trigram MATCH, not a full scan
+    assert all(step.endswith('INDEX 0:M1') for step in text_steps)
+
+
+@pytest.mark.parametrize('field', ['oil_id',
+                                   'metadata.name',
+                                   'metadata.location',
+                                   'metadata.product_type',
+                                   'metadata.API'])
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_query_sort_uses_index(session, field, direction):
+    assert session.query_uses_index(sort=[(field, direction)], page=[0, 20])
+
+
+@pytest.mark.parametrize('field, direction', [
+    ('oil_id', 'asc'),
+    ('metadata.name', 'desc'),
+    ('metadata.API', 'asc'),
+    ('metadata.API', 'desc'),
+])
+def test_query_keyset_paging(session, field, direction):
+    sort = [(field, direction)]
+
+    all_recs, _total = session.query(sort=sort)
+    all_ids = [r['oil_id'] for r in all_recs]
+
+    paged_ids = []
+    recs, _total = session.query(sort=sort, page=[0, 5])
+
+    while len(recs) > 0:
+        paged_ids.extend(r['oil_id'] for r in recs)
+        recs, _total = session.query(sort=sort, page=[0, 5],
+                                     after=recs.next_token)
+
+    assert paged_ids == all_ids
+
+
+def test_query_array_sort_paging(session):
+    sort = [('metadata.labels', 'asc')]
+
+    recs, _total = session.query(sort=sort, page=[0, 5])
+    assert recs.next_token is None
+
+    recs, _total = session.query(sort=[('oil_id', 'asc')], page=[0, 5])
+
+    with pytest.raises(ValueError):
+        session.query(sort=sort, page=[0, 5], after=recs.next_token)
+
+
+def test_get_labels(session):
+    assert session.get_labels(0)['_id'] == 0
+
+
+@pytest.mark.parametrize('method', ['insert_one', 'replace_one',
+                                    'delete_one', 'insert_many',
+                                    'upsert_many', 'delete_many',
+                                    'new_oil_id'])
+def test_read_only(session, method):
+    with pytest.raises(ReadOnlySessionError):
+        getattr(session, method)()
@@ -0,0 +1,63 @@
+"""
+Tests of the text search tokens
+
+These don't need a running database
+"""
+import pytest
+
+from adios_db.session.text_search import (SEARCH_TOKENS_FIELD,
+                                          MAX_TOKEN_LENGTH,
+                                          word_substrings,
+                                          search_tokens,
+                                          add_search_tokens,
+                                          word_filter)
+
+
+oil_json = {'oil_id': 'AD00020',
+            'metadata': {'name': 'Alaska North Slope',
+                         'location': 'Alaska, USA',
+                         'alternate_names': ['ANS Crude']}}
+
+
+def test_word_substrings():
+    assert word_substrings('abc') == {'a', 'b', 'c', 'ab', 'bc', 'abc'}
+
+
+def test_word_substrings_max_length():
+    subs = word_substrings('x' * (MAX_TOKEN_LENGTH + 5))
+
+    assert max(len(s) for s in subs) == MAX_TOKEN_LENGTH
+
+
+@pytest.mark.parametrize('word', ['alaska', 'ALASKA', 'north', 'lope',
+                                  'ad000', '00020', 'usa', 'ans', 'crude'])
+def test_search_tokens(word):
+    assert word.lower() in search_tokens(oil_json)
+
+
+@pytest.mark.parametrize('word', ['north slope', 'bogus', 'ad00021'])
+def test_search_tokens_no_match(word):
+    assert word not in search_tokens(oil_json)
+
+
+def test_search_tokens_missing_fields():
+    tokens = search_tokens({'oil_id': 'XX00001', 'metadata': {}})
+
+    assert 'xx00001' in tokens
+
+
+def test_add_search_tokens():
+    rec = add_search_tokens(dict(oil_json))
+
+    assert rec[SEARCH_TOKENS_FIELD] == search_tokens(oil_json)
+
+
+def test_word_filter():
+    assert word_filter('Slope') == {SEARCH_TOKENS_FIELD: 'slope'}
+
+
+def test_word_filter_long_word():
+    word = 'y' * (MAX_TOKEN_LENGTH + 1)
+    filt = word_filter(word)
+
+    assert filt['$and'][0] == {SEARCH_TOKENS_FIELD: word[:MAX_TOKEN_LENGTH]}
@@ -6,11 +6,19 @@ import datetime
 
 import json
 
-from adios_db.session import Session
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from adios_db.session.memory_session import MemorySession
+from adios_db.session.sqlite_session import SQLiteSession
 
 from pyramid.config import Configurator
 from pyramid.response import Response, FileResponse
 from pyramid.renderers import JSON as JSONRenderer
+from pyramid.settings import asbool
+from pyramid.threadlocal import get_current_request
 
 from .common.views import cors_policy
 
@@ -30,12 +38,8 @@ def load_cors_origins(settings, key):
 
 
 def attach_pymongo(config, settings):
-    host = settings['mongodb.host'].strip()
-    port = int(settings['mongodb.port'])
-    db_name = settings['mongodb.database']
-
-    # build mongo client and attach to request registry
-    config.registry.db = Session(host=host, port=port, database=db_name)
+    # build the session and attach to request registry
+    config.registry.db = make_session(settings)
 
     # add request method
     def add_db(_request):
@@ -44,6 +48,55 @@ def attach_pymongo(config, settings):
     config.add_request_method(add_db, 'adb_session', reify=True)
 
 
+def make_session(settings):
+    """
+    Make the session that serves the requests.
+
+    A read-only deployment (caps.can_modify_db = false) can use:
+
+    - an SQLite file made by adios_db_build_sqlite, with the setting
+      session.sqlite_path
+
+    - the whole catalog in memory, with the setting
+      session.in_memory = true.  The records are loaded from the
+      noaa-oil-data JSON tree at session.data_path if it is set,
+      otherwise from the mongodb database.
+    """
+    sqlite_path = settings.get('session.sqlite_path')
+    in_memory = asbool(settings.get('session.in_memory', False))
+
+    if ((sqlite_path or in_memory) and
+            asbool(settings.get('caps.can_modify_db', False))):
+        raise ValueError('The SQLite and in-memory sessions are read-only, '
+                         'caps.can_modify_db must be false')
+
+    if sqlite_path:
+        print(f'using the SQLite session: {sqlite_path}')
+        return SQLiteSession(sqlite_path)
+    elif in_memory:
+        data_path = settings.get('session.data_path')
+
+        if data_path:
+            print(f'loading the in-memory session from: {data_path}')
+            return MemorySession.from_folder(data_path)
+        else:
+            print('loading the in-memory session from the database')
+            return MemorySession.from_session(mongodb_session(settings))
+    else:
+        return mongodb_session(settings)
+
+
+def mongodb_session(settings):
+    # imported here, so the SQLite and in-memory sessions don't need pymongo
+    from adios_db.session.session import Session
+
+    host = settings['mongodb.host'].strip()
+    port = int(settings['mongodb.port'])
+    db_name = settings['mongodb.database']
+
+    return Session(host=host, port=port, database=db_name)
+
+
 def get_json(request):
     return json.loads(request.text, ensure_ascii=False)
 
@@ -97,13 +150,64 @@ def default_not_found_response(_request):
 
 def json_datetime_part(o):
     '''
-        This is only necessary if we are using the builtin json module
-        ujson and orjson have no problems with datetime content.
+        The builtin json module can't handle datetimes.  orjson can, but
+        we have it pass them through to here, so the output is the same
+        whichever one we use (see json_dumps())
     '''
     if isinstance(o, datetime.datetime):
         return o.isoformat()
 
 
+def pretty_requested(request):
+    """
+    The client can ask for an indented, sorted, response with a
+    ``pretty`` GET parameter, e.g. ``/oils/AD00020?pretty=1``
+    """
+    if request is None:
+        return False
+
+    return (request.GET.get('pretty', 'false').lower()
+            not in ('', '0', 'false', 'no'))
+
+
+def json_dumps(value, pretty=False):
+    """
+    Serialize a response to JSON
+
+    By default, the output is compact, using orjson if it is available.
+    Pretty output is the old sorted and indented form.
+
+    orjson handles datetimes itself, but we pass them through to
+    json_datetime_part so they come out the same either way.
+    """
+    if pretty:
+        return json.dumps(value, default=json_datetime_part,
+                          sort_keys=True, indent=4)
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(value,
+                                default=json_datetime_part,
+                                option=(orjson.OPT_PASSTHROUGH_DATETIME |
+                                        orjson.OPT_NON_STR_KEYS)
+                                ).decode('utf-8')
+        except TypeError:
+            # e.g. an integer too big for orjson, the builtin can do it.
+            pass
+
+    return json.dumps(value, default=json_datetime_part,
+                      separators=(',', ':'))
+
+
+def json_serializer(value, **_kw):
+    """
+    The serializer for our JSON renderer
+
+    The renderer doesn't pass in the request, so we get it from pyramid.
+    """
+    return json_dumps(value, pretty=pretty_requested(get_current_request()))
+
+
 def main(_global_config, **settings):
 
     print("*****running main of API****")
@@ -114,10 +218,7 @@ def main(_global_config, **settings):
     attach_pymongo(config, settings)
 
     config.add_request_method(get_json, 'json', reify=True)
-    renderer = JSONRenderer(
-        serializer=lambda v, **_kw: json.dumps(v, default=json_datetime_part,
-                                               sort_keys=True, indent=4)
-    )
+    renderer = JSONRenderer(serializer=json_serializer)
 
     config.add_renderer('json', renderer)
 
@@ -129,6 +230,11 @@ def main(_global_config, **settings):
     print("adding all the API rest services")
     from .views import oil
     config.add_cornice_service(oil.oil_api)
+    cache_opts = {'max_size': settings.get('cache.max_size')}
+    if 'cache.ttl' in settings:
+        cache_opts['ttl'] = settings['cache.ttl']
+
+    oil.memoized_results.configure(**cache_opts)
 
     from .views.label import label_api
     config.add_cornice_service(label_api)
@@ -142,6 +248,9 @@ def main(_global_config, **settings):
     from .views.vocabulary import vocabulary_api
     config.add_cornice_service(vocabulary_api)
 
+    from .views.cache import cache_api
+    config.add_cornice_service(cache_api)
+
     # from .views.query import query_api
     # config.add_cornice_service(query_api)
 
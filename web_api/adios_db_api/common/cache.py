@@ -0,0 +1,162 @@
+"""
+A simple in-process cache for the results computed from oil records
+
+The cache is bounded, with least recently used (LRU) eviction, and the
+entries can optionally expire after a time-to-live (TTL).
+
+The web server may be running a number of worker processes, each with
+its own cache, so a record can be changed by a different process than the
+one holding a cached result for it.  To deal with that, each entry can be
+stored with a version stamp of the record it was computed from (see
+adios_db.session.base.VERSION_FIELD).  Looking up an entry with a
+different version is a miss, and the stale entry is dropped.
+
+Hits, misses, evictions, etc. are counted, so we can see how well the
+cache is working.  All the named caches are reported by the /cache
+endpoint.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+named_caches = {}  # all the caches that report their stats
+
+_UNCHANGED = object()  # for the options of configure() that aren't given
+
+
+class LRUCache:
+    """
+    A bounded, least recently used, cache
+
+    :param max_size: The maximum number of entries.
+    :param ttl: The number of seconds an entry is good for.
+                None means they don't expire.
+    :param name: If given, the cache is registered under this name,
+                 so its stats are reported by the /cache endpoint.
+    :param timer: function returning the current time in seconds.
+    """
+    def __init__(self, max_size=1000, ttl=None, name=None,
+                 timer=time.monotonic):
+        self._entries = OrderedDict()  # key: (value, version, timestamp)
+        self._lock = threading.RLock()
+        self._timer = timer
+
+        self.configure(max_size, ttl)
+        self.reset_stats()
+
+        self.name = name
+        if name is not None:
+            named_caches[name] = self
+
+    def configure(self, max_size=None, ttl=_UNCHANGED):
+        """
+        Change the size limit and/or TTL of the cache
+
+        Only the options that are given are changed.  A ttl of None
+        (or '') means the entries don't expire.
+
+        Entries over the new size limit are evicted.
+        """
+        if max_size is not None:
+            max_size = int(max_size)
+
+            if max_size < 1:
+                raise ValueError(f'Invalid cache size: {max_size}')
+
+            self.max_size = max_size
+
+        if ttl is not _UNCHANGED:
+            self.ttl = None if ttl in (None, '') else float(ttl)
+
+        with self._lock:
+            self._evict()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def stats(self):
+        """
+        The current size and counters of the cache
+        """
+        lookups = self.hits + self.misses
+
+        return {'size': len(self),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale': self.stale}
+
+    def get(self, key, version=None, default=None):
+        """
+        Get the value cached for a key, or default if it's not there.
+
+        If the entry has expired, or was stored with a different version,
+        it is dropped, and we return the default.
+        """
+        with self._lock:
+            try:
+                value, entry_version, timestamp = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if self.ttl is not None and self._timer() - timestamp > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            if entry_version != version:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def put(self, key, value, version=None):
+        """
+        Cache a value, evicting the least recently used entries if we
+        are over the size limit.
+        """
+        with self._lock:
+            self._entries[key] = (value, version, self._timer())
+            self._entries.move_to_end(key)
+
+            self._evict()
+
+    def pop(self, key, default=None):
+        """
+        Remove an entry, returning its value, or default if it's not there
+        """
+        with self._lock:
+            try:
+                return self._entries.pop(key)[0]
+            except KeyError:
+                return default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
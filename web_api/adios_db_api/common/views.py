@@ -9,6 +9,8 @@ import ujson
 
 from pyramid.httpexceptions import HTTPForbidden
 
+from adios_db.session import ReadOnlySessionError
+
 cors_policy = {'credentials': True}
 
 logger = logging.getLogger(__name__)
@@ -52,10 +54,16 @@ def cors_response(request, response):
 def can_modify_db(func):
     """
     Decorator function to test if database modification is allowed.
+
+    It is also forbidden if the session turns out to be read-only.
     """
     def wrapper_func(request):
         if request.registry.settings['caps.can_modify_db'].lower() == 'true':
-            return func(request)
+            try:
+                return func(request)
+            except ReadOnlySessionError as e:
+                logger.error(e)
+                raise HTTPForbidden('Access Forbidden')
         else:
             raise HTTPForbidden('Access Forbidden')
 
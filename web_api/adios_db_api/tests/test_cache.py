@@ -0,0 +1,117 @@
+"""
+Tests of the searchable fields cache
+"""
+import pytest
+
+from adios_db_api.common.cache import LRUCache, named_caches
+
+# NOTE: testapp coming from conftest.py
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_put():
+    cache = LRUCache(max_size=2)
+
+    assert cache.get('a') is None
+
+    cache.put('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_size=2)
+
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')  # b is now the least recently used
+    cache.put('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl():
+    timer = FakeTimer()
+    cache = LRUCache(ttl=10, timer=timer)
+
+    cache.put('a', 1)
+    timer.now = 5.0
+
+    assert cache.get('a') == 1
+
+    timer.now = 11.0
+
+    assert cache.get('a') is None
+    assert 'a' not in cache
+    assert cache.stats()['expirations'] == 1
+
+
+def test_version():
+    cache = LRUCache()
+
+    cache.put('a', 1, version='v1')
+
+    assert cache.get('a', 'v1') == 1
+    assert cache.get('a', 'v2') is None
+    assert 'a' not in cache
+    assert cache.stats()['stale'] == 1
+
+
+def test_configure_smaller():
+    cache = LRUCache(max_size=3)
+
+    for k in 'abc':
+        cache.put(k, k)
+
+    cache.configure(max_size=1)
+
+    assert len(cache) == 1
+    assert 'c' in cache
+
+
+def test_configure_keeps_ttl():
+    cache = LRUCache(max_size=3, ttl=10)
+
+    cache.configure(max_size=5)
+
+    assert cache.max_size == 5
+    assert cache.ttl == 10
+
+    cache.configure(ttl=None)
+
+    assert cache.max_size == 5
+    assert cache.ttl is None
+
+
+def test_configure_invalid():
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)
+
+
+def test_named_cache():
+    cache = LRUCache(name='test_cache')
+
+    assert named_caches['test_cache'] is cache
+
+
+def test_get_cache_stats(testapp):
+    testapp.get('/oils/', params={'limit': 10})
+    testapp.get('/oils/', params={'limit': 10})
+
+    stats = testapp.get('/cache/').json_body['searchable_fields']
+
+    assert 0 < stats['size'] <= stats['max_size']
+    assert stats['hits'] >= 10
@@ -0,0 +1,103 @@
+"""
+Functional tests of the API served from the in-memory session
+"""
+import pytest
+from webtest import TestApp
+
+from adios_db.test.test_session.test_session import test_data
+from adios_db.session.base import DERIVED_FIELDS, VERSION_FIELD
+from adios_db_api import main
+
+from .conftest import TEST_SETTINGS
+
+
+@pytest.fixture(scope='module')
+def memory_app():
+    settings = dict(TEST_SETTINGS)
+    settings.update({'caps.can_modify_db': 'false',
+                     'session.in_memory': 'true',
+                     'session.data_path': str(test_data)})
+
+    return TestApp(main(None, **settings))
+
+
+def test_must_be_read_only():
+    settings = dict(TEST_SETTINGS)
+    settings.update({'session.in_memory': 'true',
+                     'session.data_path': str(test_data)})
+
+    with pytest.raises(ValueError):
+        main(None, **settings)
+
+
+def test_read_only_session_forbidden(memory_app, monkeypatch):
+    memory_app.delete('/oils/AD00020/', status=403)
+
+    # even if the settings allowed it, (see make_session()),
+    # the session is read-only
+    monkeypatch.setitem(memory_app.app.registry.settings,
+                        'caps.can_modify_db', 'true')
+
+    memory_app.delete('/oils/AD00020/', status=403)
+
+
+def test_get_list(memory_app):
+    resp = memory_app.get('/oils/', params={'limit': 10,
+                                            'sort': 'metadata.name'})
+    res = resp.json_body
+
+    assert len(res['data']) == 10
+    assert res['meta']['total'] == 26
+
+    next_page = memory_app.get(res['links']['next']).json_body
+
+    assert len(next_page['data']) == 10
+
+
+def test_get_valid_id(memory_app):
+    resp = memory_app.get('/oils/AD00020')
+
+    assert resp.json_body['data']['_id'] == 'AD00020'
+
+    # the fields only kept for searching and caching
+    attributes = resp.json_body['data']['attributes']
+    assert not any(field in attributes for field in DERIVED_FIELDS)
+    assert VERSION_FIELD not in attributes
+
+    memory_app.get('/oils/AD00020',
+                   headers={'If-None-Match': resp.headers['ETag']},
+                   status=304)
+
+
+def test_get_invalid_id(memory_app):
+    memory_app.get('/oils/bogus/', status=404)
+
+
+def test_post_forbidden(memory_app):
+    memory_app.post_json('/oils/', params={}, status=403)
+
+
+def test_get_list_by_property(memory_app):
+    resp = memory_app.get('/oils/', params={'qKvis15C': '10,100',
+                                            'qDensity15C': '',
+                                            'limit': 100})
+    res = resp.json_body
+
+    assert 0 < res['meta']['total'] < 26
+    assert len(res['data']) == res['meta']['total']
+
+
+def test_get_similar(memory_app):
+    res = memory_app.get('/oils/AD00020/similar', params={'k': 5}).json_body
+
+    assert 0 < len(res['data']) <= 5
+    assert 'AD00020' not in [rec['_id'] for rec in res['data']]
+
+    distances = [rec['meta']['distance'] for rec in res['data']]
+    assert distances == sorted(distances)
+
+
+def test_get_similar_invalid_id(memory_app):
+    memory_app.get('/oils/bogus/similar/', status=404)
+    memory_app.get('/oils/AD00020/similar', params={'k': 'x'}, status=400)
+    memory_app.get('/oils/AD00020/similar', params={'k': 101}, status=400)
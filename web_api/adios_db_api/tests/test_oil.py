@@ -90,6 +90,40 @@ class OilTests(OilTestBase):
                 # we are only expecting searchable fields
                 assert k in rec['attributes']
 
+    def test_get_list_searchable_fields_only(self):
+        params = {'limit': 20}
+        resp = self.testapp.get('/oils/', params=params)
+        res = resp.json_body
+
+        searchable_meta = {'name', 'location', 'product_type', 'API',
+                           'sample_date', 'labels', 'model_completeness',
+                           'gnome_suitable'}
+
+        for rec in res['data']:
+            assert set(rec['attributes'].keys()) == {'metadata', 'status'}
+            assert set(rec['attributes']['metadata'].keys()) == searchable_meta
+            assert rec['attributes']['metadata']['name'] is not None
+
+    def test_get_with_keyset_paging(self):
+        params = {'limit': 10, 'sort': 'metadata.name'}
+        res = self.testapp.get('/oils/', params=params).json_body
+
+        assert res['meta']['next'] is not None
+        assert 'next' in res['links']
+
+        next_page = self.testapp.get(res['links']['next']).json_body
+
+        params['page'] = 1
+        skip_page = self.testapp.get('/oils/', params=params).json_body
+
+        assert ([r['_id'] for r in next_page['data']] ==
+                [r['_id'] for r in skip_page['data']])
+        assert next_page['meta']['total'] == res['meta']['total']
+
+    def test_get_with_bad_page_token(self):
+        params = {'limit': 10, 'sort': 'metadata.name', 'after': 'bogus'}
+        self.testapp.get('/oils/', params=params, status=400)
+
     def test_get_valid_with_invalid_paging(self):
         params = {'limit': -1, 'page': -1}
         self.testapp.get('/oils/', params=params, status=400)
@@ -100,6 +134,34 @@ class OilTests(OilTestBase):
         params = {'limit': -1, 'page': 1}
         self.testapp.get('/oils/', params=params, status=400)
 
+    def test_get_etag(self):
+        resp = self.testapp.get('/oils/AD00020')
+        etag = resp.headers['ETag']
+
+        resp = self.testapp.get('/oils/AD00020',
+                                headers={'If-None-Match': etag},
+                                status=304)
+
+        assert resp.body == b''
+        assert resp.headers['ETag'] == etag
+
+    def test_get_etag_no_match(self):
+        resp = self.testapp.get('/oils/AD00020',
+                                headers={'If-None-Match': '"bogus"'})
+
+        assert resp.status_code == 200
+        assert resp.json_body['data']['_id'] == 'AD00020'
+
+    def test_get_pretty(self):
+        compact = self.testapp.get('/oils/AD00020')
+        pretty = self.testapp.get('/oils/AD00020', params={'pretty': 1})
+
+        assert '\n' not in compact.text
+        assert '\n    ' in pretty.text
+        assert len(compact.body) < len(pretty.body)
+
+        assert compact.json_body == pretty.json_body
+
     def test_get_valid_id(self):
         """
         Note: We are basing our tests on webtest(unittest), so
@@ -330,6 +392,23 @@ class OilTestCRUD(OilTestBase):
 
         print(f"get {oil_json['oil_id']} worked after updating")
 
+    def test_update_changes_etag(self):
+        oil_json = copy.deepcopy(basic_noaa_fm)
+        self.testapp.post_json('/oils/',
+                               params=self.jsonapi_request(oil_json))
+
+        url = '/oils/{0}'.format(oil_json['oil_id'])
+        etag = self.testapp.get(url).headers['ETag']
+
+        oil_json['metadata']['API'] = 33.0
+        self.testapp.put_json('/oils/', params=self.jsonapi_request(oil_json))
+
+        resp = self.testapp.get(url, headers={'If-None-Match': etag})
+
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+        assert self.jsonapi_to_oil(resp.json_body)['metadata']['API'] == 33.0
+
     def test_update_temp_id(self):
 
         oil_json = copy.deepcopy(basic_noaa_fm)
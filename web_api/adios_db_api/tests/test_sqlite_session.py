@@ -0,0 +1,44 @@
+"""
+Functional tests of the API served from an SQLite file
+"""
+import pytest
+from webtest import TestApp
+
+from adios_db.test.test_session.test_session import test_data
+from adios_db.scripts.db_build_sqlite import build_sqlite
+from adios_db_api import main
+
+from .conftest import TEST_SETTINGS
+
+
+@pytest.fixture(scope='module')
+def sqlite_app(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp('sqlite') / 'oil_database.sqlite'
+    build_sqlite(test_data, db_path)
+
+    settings = dict(TEST_SETTINGS)
+    settings.update({'caps.can_modify_db': 'false',
+                     'session.sqlite_path': str(db_path)})
+
+    return TestApp(main(None, **settings))
+
+
+def test_get_list(sqlite_app):
+    resp = sqlite_app.get('/oils/', params={'limit': 10,
+                                            'sort': 'metadata.name',
+                                            'q': 'alaska'})
+    res = resp.json_body
+
+    assert 0 < len(res['data']) <= 10
+    assert res['meta']['total'] >= len(res['data'])
+
+
+def test_get_valid_id(sqlite_app):
+    resp = sqlite_app.get('/oils/AD00020')
+
+    assert resp.json_body['data']['_id'] == 'AD00020'
+    assert 'ETag' in resp.headers
+
+
+def test_get_invalid_id(sqlite_app):
+    sqlite_app.get('/oils/bogus/', status=404)
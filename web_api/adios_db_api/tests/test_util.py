@@ -1,7 +1,49 @@
 """
 Test the utility functions found in this project
 
-Note: Currently, all utility functions that were previously here have been
-      moved to the adios_db module.  Keeping this around for the possibility
-      that we add something new in the future.
+Note: Most of the utility functions that were previously here have been
+      moved to the adios_db module.  What is left is the JSON rendering of
+      the responses.
 """
+import datetime
+
+import pytest
+
+from adios_db_api import json_dumps, pretty_requested
+
+
+class FakeRequest:
+    def __init__(self, **params):
+        self.GET = params
+
+
+def test_json_dumps_compact():
+    assert json_dumps({'b': [1, 2], 'a': 'x'}) == '{"b":[1,2],"a":"x"}'
+
+
+def test_json_dumps_pretty():
+    assert json_dumps({'b': 1, 'a': 2}, pretty=True) == ('{\n'
+                                                         '    "a": 2,\n'
+                                                         '    "b": 1\n'
+                                                         '}')
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+def test_json_dumps_datetime(pretty):
+    dt = datetime.datetime(2020, 1, 2, 3, 4, 5)
+
+    assert '"2020-01-02T03:04:05"' in json_dumps({'date': dt}, pretty=pretty)
+
+
+@pytest.mark.parametrize('params, expected', [({}, False),
+                                              ({'pretty': '1'}, True),
+                                              ({'pretty': 'true'}, True),
+                                              ({'pretty': '0'}, False),
+                                              ({'pretty': 'false'}, False),
+                                              ])
+def test_pretty_requested(params, expected):
+    assert pretty_requested(FakeRequest(**params)) is expected
+
+
+def test_pretty_requested_no_request():
+    assert pretty_requested(None) is False
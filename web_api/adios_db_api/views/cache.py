@@ -0,0 +1,25 @@
+import logging
+
+from cornice import Service
+
+from adios_db_api.common.views import cors_policy
+from adios_db_api.common.cache import named_caches
+
+
+logger = logging.getLogger(__name__)
+
+cache_api = Service(name='cache', path='/cache/',
+                    description=('Report the size, hits, misses, etc. '
+                                 'of the server caches'),
+                    cors_policy=cors_policy)
+
+
+@cache_api.get()
+def get_cache_stats(_request):
+    """
+    returns the stats of all the named caches
+
+    Note: these are the caches of the worker process that handled the
+          request.
+    """
+    return {name: cache.stats() for name, cache in named_caches.items()}
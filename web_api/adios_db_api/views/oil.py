@@ -4,6 +4,7 @@ Cornice Oil services.
 import sys
 import logging
 import traceback
+from urllib.parse import urlencode
 
 import ujson
 
@@ -11,13 +12,22 @@ from cornice import Service
 from pyramid.httpexceptions import (HTTPBadRequest,
                                     HTTPNotFound,
                                     HTTPNoContent,
+                                    HTTPNotModified,
                                     HTTPConflict,
                                     HTTPUnsupportedMediaType,
                                     HTTPInternalServerError)
 
-from pymongo.errors import DuplicateKeyError
+try:
+    from pymongo.errors import DuplicateKeyError
+except ImportError:
+    # the read-only sessions (e.g. the stand alone builds) don't need
+    # pymongo, and can't raise it.
+    class DuplicateKeyError(Exception):
+        pass
 
 from adios_db.models.oil.oil import Oil
+from adios_db.session.base import VERSION_FIELD, ReadOnlySessionError
+from adios_db.computation.derived_properties import GRID_NAMES
 from adios_db.models.oil.completeness import set_completeness
 from adios_db.models.oil.validation.validate import validate
 from adios_db.models.oil.validation.errors import ERRORS
@@ -25,6 +35,7 @@ from adios_db.models.oil.validation.errors import ERRORS
 from adios_db_api.common.views import (cors_policy,
                                        obj_id_from_url,
                                        can_modify_db)
+from adios_db_api.common.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -32,22 +43,51 @@ oil_api = Service(name='oil', path='/oils/*obj_id',
                   description="List All Oils", cors_policy=cors_policy)
 
 
-memoized_results = {}  # so it is visible to other functions
+# The only fields of an oil record needed for the searchable fields.
+# The listing asks the database for just these.
+searchable_fields = ('metadata.name',
+                     'metadata.location',
+                     'metadata.product_type',
+                     'metadata.API',
+                     'metadata.sample_date',
+                     'metadata.labels',
+                     'metadata.model_completeness',
+                     'metadata.gnome_suitable',
+                     'status',
+                     VERSION_FIELD)
+
+# the most similar oils that can be asked for
+MAX_SIMILAR = 100
+
+# so it is visible to other functions
+# (the size and TTL are set from the app settings in main())
+memoized_results = LRUCache(name='searchable_fields')
 temp_oils = {}  # we need to persist our temporary oils somewhere
 
 
 def memoize_oil_arg(func):
     """
     Decorator function to cache function results by oil_id
+
+    The results are stored with the version stamp of the oil record, so a
+    record that was changed (by any process) is not served from the cache.
+    A record without a version stamp (e.g. a temporary oil) is not cached.
     """
     def memoized_func(oil):
         key = oil['oil_id']
+        version = oil.get(VERSION_FIELD)
+
+        if version is None:
+            return func(oil)
 
-        if key not in memoized_results:
+        res = memoized_results.get(key, version)
+
+        if res is None:
             logger.info('loading Key: "{}"'.format(key))
-            memoized_results[key] = func(oil)
+            res = func(oil)
+            memoized_results.put(key, res, version)
 
-        return memoized_results[key]
+        return res
 
     return memoized_func
 
@@ -58,6 +98,12 @@ def get_oils(request):
     We will do one of two possible things here.
     1. Return the searchable fields for all oils in JSON format.
     2. Return the JSON record of a particular oil.
+
+    A particular oil is returned with its version stamp as the ETag, and
+    if the client already has that version (If-None-Match), we return
+    a 304 Not Modified without fetching the record.  Otherwise the record
+    is fetched with its stamp, so the ETag is always that of the record
+    that is sent.
     """
     obj_id = obj_id_from_url(request)
 
@@ -65,11 +111,26 @@ def get_oils(request):
 
     adb_session = request.adb_session
 
+    if request.matchdict.get('obj_id', ())[1:] == ('similar',):
+        return get_similar_oils(request, obj_id)
+
     if obj_id is not None:
-        res = adb_session.find_one(obj_id)
+        if 'If-None-Match' in request.headers:
+            version = adb_session.get_version(obj_id)
+
+            if version is not None and version in request.if_none_match:
+                raise HTTPNotModified(headers={'ETag': f'"{version}"'})
+
+        # the ETag is the version of the copy we send
+        res = adb_session.find_one(obj_id, version=True)
 
         if res is None:
             res = temp_oils.get(obj_id, None)
+        else:
+            version = res.pop(VERSION_FIELD, None)
+
+            if version is not None:
+                request.response.etag = version
 
         if res is not None:
             return get_oil_all_fields(res)
@@ -91,16 +152,86 @@ def get_oils(request):
         search_opts = get_search_params(request)
         sort = get_sort_params(request)
 
+        # keyset paging: continue on from the end of a previous page
+        after = request.GET.get('after') or None
+        if after is not None:
+            start, stop = 0, limit
+
         try:
-            return json_api_results(*adb_session.query(page=[start, stop],
-                                                       sort=sort,
-                                                       **search_opts))
+            results, total = adb_session.query(page=[start, stop],
+                                               sort=sort,
+                                               projection=searchable_fields,
+                                               after=after,
+                                               **search_opts)
+        except ValueError as e:
+            # a bad page token
+            logger.error(e)
+            raise HTTPBadRequest(str(e))
         except Exception as e:
             logger.error(e)
             raise HTTPInternalServerError(e)
 
+        # only a full page can have another page after it
+        if 0 < limit <= len(results):
+            next_token = results.next_token
+        else:
+            next_token = None
+
+        return json_api_results(results, total,
+                                next_token=next_token,
+                                next_link=get_next_link(request, next_token))
 
-def json_api_results(results, total):
+
+def get_similar_oils(request, oil_id):
+    """
+    The oils most like an oil: GET /oils/<oil_id>/similar?k=<number>
+
+    They are returned like a page of the searchable fields, nearest first,
+    with the distance in the meta of each one.  At most MAX_SIMILAR can be
+    asked for.
+    """
+    try:
+        k = int(request.GET.get('k', '10'))
+
+        if not 0 <= k <= MAX_SIMILAR:
+            raise ValueError(f'Invalid number of oils: {k}')
+    except Exception as e:
+        logger.error(e)
+        raise HTTPBadRequest("Could not determine the number of oils")
+
+    adb_session = request.adb_session
+
+    try:
+        similar = adb_session.similar(oil_id, k)
+    except Exception as e:
+        logger.error(e)
+        raise HTTPInternalServerError(e)
+
+    if similar is None:
+        raise HTTPNotFound()
+
+    distances = dict(similar)
+
+    try:
+        # all of them at once
+        results, _total = adb_session.query(oil_id=list(distances),
+                                            projection=searchable_fields)
+    except Exception as e:
+        logger.error(e)
+        raise HTTPInternalServerError(e)
+
+    # the query doesn't keep the order of the ids
+    results = sorted(results, key=lambda r: distances[r['oil_id']])
+
+    data = [dict(get_oil_searchable_fields(rec),
+                 meta={'distance': distances[rec['oil_id']]})
+            for rec in results]
+
+    return {'data': data,
+            'meta': {'total': len(data)}}
+
+
+def json_api_results(results, total, next_token=None, next_link=None):
     page_size = len(results)  # .count()
     pages = total / page_size if page_size > 0 else 1
 
@@ -108,12 +239,30 @@ def json_api_results(results, total):
 
     ret = {'data': data,
            'meta': {'total': total,
-                    'totalPages': pages}
+                    'totalPages': pages,
+                    'next': next_token}
            }
 
+    if next_link is not None:
+        ret['links'] = {'next': next_link}
+
     return ret
 
 
+def get_next_link(request, next_token):
+    """
+    The URL of the next page, using keyset paging,
+    or None if there isn't one.
+    """
+    if next_token is None:
+        return None
+
+    params = {k: v for k, v in request.GET.items() if k != 'page'}
+    params['after'] = next_token
+
+    return f'{request.path_url}?{urlencode(params)}'
+
+
 def get_search_params(request):
     """
     Process the incoming search directives and convert them into search
@@ -127,6 +276,15 @@ def get_search_params(request):
     - qType: The type of oil to match when filtering the results.
     - qLabels: A list of label strings that will be matched against the oil
                labels to filter the results.
+    - qDensity15C, qKvis15C, etc.: A range of numbers in which the density
+                                   (kg/m^3), or kinematic viscosity (cSt),
+                                   of the oil at a temperature will be
+                                   filtered.  There is one for each of the
+                                   names of the property grid, (see
+                                   property_param())
+
+    (The paging options, 'limit', 'page' and 'after', are handled in
+    get_oils())
     """
     query_out = {}
     xform_opts = {'q': 'text',
@@ -136,13 +294,30 @@ def get_search_params(request):
                   'qGnomeSuitable': 'gnome_suitable'
                   }
 
+    property_opts = {property_param(name): name for name in GRID_NAMES}
+
     for k, v in request.GET.items():
-        if k in xform_opts and v not in (None, ''):
+        if v in (None, ''):
+            continue
+
+        if k in xform_opts:
             query_out[xform_opts[k]] = v
+        elif k in property_opts:
+            query_out.setdefault('properties', {})[property_opts[k]] = v
 
     return query_out
 
 
+def property_param(name):
+    """
+    The query parameter of a name of the property grid,
+    e.g. 'kvis_15C' -> 'qKvis15C'
+    """
+    name = name.replace('_', '')
+
+    return f'q{name[0].upper()}{name[1:]}'
+
+
 def get_sort_params(request):
     """
     Note: Most of the fields that we want to sort on are now found in the
@@ -208,6 +383,8 @@ def insert_oil(request):
     except DuplicateKeyError as e:
         logger.error(e)
         raise HTTPConflict('Insert failed: Duplicate Key')
+    except ReadOnlySessionError:
+        raise  # (see can_modify_db)
     except Exception as e:
         logger.error(e)
         raise HTTPUnsupportedMediaType("Unknown Error")
@@ -252,6 +429,8 @@ def update_oil(request):
             memoized_results.pop(oil.oil_id, None)
 
             logger.info(f'Update oil with ID: {oil.oil_id}')
+    except ReadOnlySessionError:
+        raise  # (see can_modify_db)
     except Exception as e:
         logger.error(e)
         raise HTTPUnsupportedMediaType()
@@ -392,9 +571,12 @@ def get_oil_searchable_fields(oil):
 
     However, searching on bad records being bad is, well, OK.
     As long as it doesn't crash
+
+    The oil can be a full record, or one with only the searchable fields
+    (see searchable_fields)
     """
     try:
-        meta = oil['metadata']
+        meta = oil.get('metadata', {})
 
         # id, type, & attributes are required top-level attributes in order to
         # comply with the JSON API specification for a resource object.
@@ -417,7 +599,7 @@ def get_oil_searchable_fields(oil):
                 }
     except Exception:
         logger.info('oil failed searchable fields {}: {}'
-                    .format(oil['oil_id'], oil['name']))
+                    .format(oil.get('oil_id'), meta.get('name')))
         raise
 
 
@@ -80,6 +80,11 @@ if settings.get('standalone'):
     # assume the client path is realtive to main settings file
     settings['client_path'] = str((settings_path /
                                    settings.pop('client_path')).resolve())
+    # the SQLite file is also relative to the main settings file
+    if settings.get('session.sqlite_path'):
+        settings['session.sqlite_path'] = str(
+            (settings_path / settings['session.sqlite_path']).resolve()
+        )
     # Set up CORS policy for stand alone
     # This assures the we're using the right ports, etc.
     # it will override anything in the settings JSON file